@@ -1,15 +1,21 @@
 """
 认证相关功能
+
+jose、werkzeug 在首次登录 / 验证令牌时才导入，不增加应用启动时间
 """
+import os
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from pydantic import BaseModel
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 from datetime import datetime, timedelta
-from werkzeug.security import check_password_hash, generate_password_hash
 from typing import Optional
 
-from .database import get_db
+from core.result_cache import ResultCache
+from .database import AsyncSessionLocal, get_async_db
 from .models import AdminUser
 
 # JWT 配置
@@ -19,19 +25,32 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7天
 
 security = HTTPBearer()
 
+# 令牌解码和用户查询的缓存有效期（秒）。缓存在进程内，其他进程修改用户后最多延迟该时间生效
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = 1024
+
+token_cache = ResultCache(max_entries=AUTH_CACHE_SIZE, ttl_seconds=AUTH_CACHE_TTL)
+user_cache = ResultCache(max_entries=AUTH_CACHE_SIZE, ttl_seconds=AUTH_CACHE_TTL)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
+    from werkzeug.security import check_password_hash
+    
     return check_password_hash(hashed_password, plain_password)
 
 
 def get_password_hash(password: str) -> str:
     """生成密码哈希"""
+    from werkzeug.security import generate_password_hash
+    
     return generate_password_hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """创建访问令牌"""
+    from jose import jwt
+    
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -44,6 +63,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def verify_token(token: str) -> Optional[dict]:
     """验证令牌"""
+    from jose import JWTError, jwt
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -51,13 +72,120 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 
+def decode_token_cached(token: str) -> Optional[dict]:
+    """
+    验证令牌（带缓存）
+
+    已验证的令牌在缓存有效期内不再重复解码，但每次仍检查过期时间
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        if payload is None:
+            return None
+        token_cache.put(token, payload)
+    expire = payload.get("exp")
+    if expire is not None and expire <= time.time():
+        token_cache.invalidate(token)
+        return None
+    return payload
+
+
+class CurrentUser(BaseModel):
+    """当前登录用户（从数据库读取后缓存的快照）"""
+    id: int
+    username: str
+    is_active: int
+
+
+def invalidate_user(username: str) -> None:
+    """使用户缓存失效（禁用用户、修改密码等之后调用）"""
+    user_cache.invalidate(username)
+
+
+def clear_auth_cache() -> None:
+    """清空令牌和用户缓存"""
+    token_cache.clear()
+    user_cache.clear()
+
+
+# 会话中待失效的用户名（session.info 的键），提交后统一失效
+_PENDING_INVALIDATION = "auth_invalidate_usernames"
+
+
+@event.listens_for(AdminUser, "after_update")
+@event.listens_for(AdminUser, "after_delete")
+def _record_changed_user(mapper, connection, target):
+    """
+    通过 ORM 修改或删除管理员用户时，记录其用户名（包括修改前的用户名）
+
+    flush 时事务尚未提交，此时失效的话，并发请求可能在提交前重新读到旧数据并写回缓存，
+    因此只记录下来，提交后再失效
+    """
+    session = object_session(target)
+    if session is None:
+        return
+    history = inspect(target).attrs.username.history
+    pending = session.info.setdefault(_PENDING_INVALIDATION, set())
+    for username in [target.username, *(history.deleted or ())]:
+        if username:
+            pending.add(username)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    """事务提交后使记录的用户缓存失效"""
+    for username in session.info.pop(_PENDING_INVALIDATION, ()):
+        invalidate_user(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidation(session):
+    """事务回滚后修改未生效，丢弃记录"""
+    session.info.pop(_PENDING_INVALIDATION, None)
+
+
+async def load_active_user(username: str, db: AsyncSession) -> Optional[CurrentUser]:
+    """按用户名读取启用状态的用户（带缓存），不存在或已禁用时返回 None"""
+    user = user_cache.get(username)
+    if user is None:
+        result = await db.execute(select(AdminUser).where(AdminUser.username == username))
+        record = result.scalars().first()
+        if record is not None and record.is_active == 1:
+            user = CurrentUser(id=record.id, username=record.username, is_active=record.is_active)
+            user_cache.put(username, user)
+    return user
+
+
+async def authenticate_token(token: str) -> Optional[CurrentUser]:
+    """
+    验证令牌并返回当前用户，无效时返回 None（不抛出异常）
+
+    供依赖注入之外的场景使用（如中间件），需要时自行打开数据库会话
+    """
+    payload = decode_token_cached(token)
+    username = payload.get("sub") if payload is not None else None
+    if username is None:
+        return None
+    user = user_cache.get(username)
+    if user is not None:
+        return user
+    async with AsyncSessionLocal() as db:
+        return await load_active_user(username, db)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取当前用户"""
+    """
+    获取当前用户
+
+    令牌解码结果和用户查询结果均在进程内缓存 AUTH_CACHE_TTL 秒，
+    管理页面并发请求时无需每次查询数据库
+    """
     token = credentials.credentials
-    payload = verify_token(token)
+    payload = decode_token_cached(token)
     
     if payload is None:
         raise HTTPException(
@@ -74,12 +202,12 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(AdminUser).filter(AdminUser.username == username).first()
-    if user is None or user.is_active != 1:
+    user = await load_active_user(username, db)
+    
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户不存在或已被禁用",
         )
     
     return user
-
@@ -1,32 +1,148 @@
 """
 数据库配置和连接
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from functools import partial
+from pathlib import Path
 import os
 
+from core.metrics import metrics
+from .pool import PoolStats, instrumented_pool_class, pool_metric_samples
+
+# 数据库类型：postgresql（默认）或 sqlite（单机部署、测试）
+DB_BACKEND = os.getenv("DB_BACKEND", "postgresql")
+
 # 数据库连接配置（从环境变量读取，如果没有则使用默认值）
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "123456")
 DB_NAME = os.getenv("DB_NAME", "postgres")
+# SQLite 数据库文件路径（":memory:" 为内存数据库）
+SQLITE_PATH = os.getenv(
+    "SQLITE_PATH",
+    str(Path(__file__).resolve().parent.parent / "data" / "autopresales.db")
+)
+
+# 连接池配置：连接数、溢出连接数、等待超时（秒）、回收时间（秒）、是否在签出前检查连接
+# 默认不做 pre-ping（每次签出多一次往返），依靠 pool_recycle 和断线后自动失效重连
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+DB_ECHO = False  # 是否打印 SQL 语句（生产环境设为 False）
+
+# 启动时数据库版本落后是否自动迁移；多 worker 部署建议先执行 python -m admin.migrations 并关闭
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+
+def default_database_url() -> str:
+    """根据 DB_BACKEND 构建同步驱动的数据库 URL"""
+    if DB_BACKEND == "sqlite":
+        if SQLITE_PATH == ":memory:":
+            return "sqlite://"
+        return f"sqlite:///{SQLITE_PATH}"
+    return f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def to_async_url(url: str) -> str:
+    """将同步驱动的 URL 转换为对应的异步驱动（asyncpg / aiosqlite）"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    raise ValueError(f"不支持的数据库类型: {backend}")
+
+
+# 数据库 URL：可通过 DATABASE_URL 直接指定。同步驱动用于初始化和后台批处理，异步驱动用于请求处理
+DATABASE_URL = os.getenv("DATABASE_URL") or default_database_url()
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# 连接池签出统计
+sync_pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+def engine_options(url: str, queue_pool, stats: PoolStats) -> dict:
+    """根据数据库类型生成引擎参数"""
+    parsed = make_url(url)
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            # 内存数据库只能共享同一个连接
+            options["poolclass"] = StaticPool
+            return options
+        Path(parsed.database).parent.mkdir(parents=True, exist_ok=True)
+    options.update(
+        poolclass=instrumented_pool_class(queue_pool, stats),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """SQLite 连接参数：WAL 模式允许读写并发，忙等待代替立即报错"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
 
-# 构建数据库 URL（PostgreSQL）
-DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 # 创建数据库引擎
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # 连接前检查连接是否有效
-    pool_recycle=3600,   # 连接回收时间（秒）
-    echo=False            # 是否打印 SQL 语句（生产环境设为 False）
-)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, QueuePool, sync_pool_stats))
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步引擎和会话工厂：路由处理函数中的查询不阻塞事件循环
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_stats)
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+for _engine in (engine, async_engine.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _configure_sqlite)
+
+# 连接池指标（/metrics），按 pool 标签区分同步（sync）和异步（async）连接池
+_metric_pools = {
+    "sync": (engine, sync_pool_stats),
+    "async": (async_engine.sync_engine, async_pool_stats),
+}
+for _name, _field, _help in (
+    ("db_pool_size", "size", "连接池常驻连接数（pool_size）"),
+    ("db_pool_capacity", "capacity", "连接池最大连接数（pool_size + max_overflow）"),
+    ("db_pool_checked_out", "checkedout", "已签出（使用中）的连接数"),
+    ("db_pool_overflow", "overflow", "使用中的溢出连接数"),
+    ("db_pool_utilization", "utilization", "连接池利用率（已签出连接数 / 最大连接数）"),
+):
+    metrics.gauge_callback(_name, _help, partial(pool_metric_samples, _metric_pools, _field))
+for _name, _field, _help in (
+    ("db_pool_checkouts_total", "checkouts", "从连接池签出连接的次数"),
+    ("db_pool_timeouts_total", "timeouts", "等待连接超时的次数"),
+    ("db_pool_wait_seconds_total", "wait_seconds", "签出连接的累计等待时间（秒）"),
+):
+    metrics.counter_callback(_name, _help, partial(pool_metric_samples, _metric_pools, _field))
+
 # 创建基类
 Base = declarative_base()
 
@@ -40,40 +156,13 @@ def get_db():
         db.close()
 
 
-def init_db():
-    """初始化数据库（创建表）"""
-    try:
-        # 导入所有模型，确保表被注册
-        from .models import ToolAccess, ToolStatistic, ToolVideo, AdminUser
-        Base.metadata.create_all(bind=engine)
-        
-        # 创建默认管理员账号（如果不存在）
-        db = SessionLocal()
-        try:
-            from werkzeug.security import generate_password_hash
-            
-            # 检查是否已有管理员
-            admin = db.query(AdminUser).filter(AdminUser.username == 'admin').first()
-            if not admin:
-                # 创建默认管理员：用户名 admin，密码 admin123
-                default_password = generate_password_hash('admin123')
-                admin = AdminUser(
-                    username='admin',
-                    password=default_password,
-                    is_active=1
-                )
-                db.add(admin)
-                db.commit()
-                print("=" * 50)
-                print("默认管理员账号已创建")
-                print("用户名: admin")
-                print("密码: admin123")
-                print("=" * 50)
-        except Exception as e:
-            print(f"创建默认管理员账号失败: {e}")
-            db.rollback()
-        finally:
-            db.close()
-    except Exception as e:
-        print(f"数据库初始化失败: {e}")
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 
+def init_db():
+    """初始化数据库（执行版本化迁移），返回本次执行的迁移版本号"""
+    from .migrations import upgrade
+    return upgrade(engine)
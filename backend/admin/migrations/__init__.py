@@ -0,0 +1,92 @@
+"""
+数据库版本化迁移
+
+每个迁移模块（mNNNN_*.py）定义 version、description 和 upgrade(connection)，
+已执行的版本记录在 schema_version 表中。迁移内的表结构和数据处理固定为该版本的定义
+（显式的 Table / Index / SQL），不引用 models.py 或业务模块，模型后续修改不会改变已发布的迁移。
+迁移在一个事务中按版本顺序执行：
+- PostgreSQL 上先获取 advisory lock，多个进程同时启动时只有一个执行迁移，
+  其余进程等待后发现已是最新版本，直接返回
+- 部署时可先执行 `python -m admin.migrations`，worker 启动时只检查版本（一次查询）
+"""
+from typing import List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import (
+    m0001_initial_schema,
+    m0002_access_indexes,
+    m0003_access_rollups,
+    m0004_default_admin,
+    m0005_partition_tool_access,
+)
+
+MIGRATIONS = [
+    m0001_initial_schema,
+    m0002_access_indexes,
+    m0003_access_rollups,
+    m0004_default_admin,
+    m0005_partition_tool_access,
+]
+HEAD_VERSION = MIGRATIONS[-1].version
+
+# 迁移锁（PostgreSQL advisory lock 键）
+MIGRATION_LOCK_KEY = 0x6d696772  # "migr"
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+class SchemaVersionError(RuntimeError):
+    """数据库版本落后于代码且未启用自动迁移"""
+
+
+def current_version(connection: Connection) -> int:
+    """数据库当前版本，未执行过迁移时为 0"""
+    if not inspect(connection).has_table(schema_version.name):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """执行尚未执行的迁移，返回本次执行的版本号"""
+    target = HEAD_VERSION if target is None else target
+    applied = []
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        schema_version.create(connection, checkfirst=True)
+        version = current_version(connection)
+        for migration in MIGRATIONS:
+            if migration.version <= version or migration.version > target:
+                continue
+            migration.upgrade(connection)
+            connection.execute(schema_version.insert().values(
+                version=migration.version,
+                description=migration.description
+            ))
+            applied.append(migration.version)
+    return applied
+
+
+def ensure_schema(engine: Engine, auto_migrate: bool = True) -> List[int]:
+    """
+    启动时检查数据库版本
+
+    已是最新版本时只有一次查询；落后时自动迁移，或在禁用自动迁移时抛出 SchemaVersionError
+    """
+    with engine.connect() as connection:
+        version = current_version(connection)
+    if version >= HEAD_VERSION:
+        return []
+    if not auto_migrate:
+        raise SchemaVersionError(
+            f"数据库版本 {version} 落后于 {HEAD_VERSION}，请先执行 python -m admin.migrations"
+        )
+    return upgrade(engine)
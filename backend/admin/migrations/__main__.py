@@ -0,0 +1,35 @@
+"""
+执行数据库迁移（部署时运行一次）
+
+用法（在 backend 目录下）：
+    python -m admin.migrations          # 迁移到最新版本
+    python -m admin.migrations --check  # 只检查版本，落后时返回非零退出码
+"""
+import argparse
+import sys
+
+from ..database import engine
+from . import HEAD_VERSION, current_version, upgrade
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="数据库迁移")
+    parser.add_argument("--check", action="store_true", help="只检查数据库版本")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        version = current_version(connection)
+    print(f"数据库版本: {version}，最新版本: {HEAD_VERSION}")
+    if args.check:
+        return 0 if version >= HEAD_VERSION else 1
+
+    applied = upgrade(engine)
+    if applied:
+        print(f"已执行迁移: {', '.join(str(v) for v in applied)}")
+    else:
+        print("数据库已是最新版本")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
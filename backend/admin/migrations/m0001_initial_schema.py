@@ -0,0 +1,67 @@
+"""
+初始表结构：访问记录、工具统计、演示视频、管理员用户
+
+表结构固定为该版本的定义，不随 models.py 变化；之后的结构变更在新的迁移中完成。
+已有部署中这些表已由旧版本的 create_all 创建，checkfirst 跳过已存在的表
+"""
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, Text, func
+from sqlalchemy.engine import Connection
+
+version = 1
+description = "初始表结构"
+
+# SQLite 只有 INTEGER PRIMARY KEY 才会自增
+BigIntegerKey = BigInteger().with_variant(Integer, "sqlite")
+
+metadata = MetaData()
+
+Table(
+    "tool_access",
+    metadata,
+    Column("id", BigIntegerKey, primary_key=True, index=True, autoincrement=True),
+    Column("tool_id", String(100), nullable=False, index=True, comment="工具ID"),
+    Column("tool_name", String(200), nullable=False, comment="工具名称"),
+    Column("access_time", DateTime, nullable=False, server_default=func.now(), index=True, comment="访问时间"),
+    Column("ip_address", String(50), nullable=True, comment="IP地址"),
+    Column("user_agent", Text, nullable=True, comment="用户代理"),
+    Column("path", String(500), nullable=True, comment="访问路径"),
+)
+
+Table(
+    "tool_statistic",
+    metadata,
+    Column("id", BigIntegerKey, primary_key=True, index=True, autoincrement=True),
+    Column("tool_id", String(100), nullable=False, unique=True, index=True, comment="工具ID"),
+    Column("tool_name", String(200), nullable=False, comment="工具名称"),
+    Column("access_count", Integer, nullable=False, comment="访问次数"),
+    Column("last_access_time", DateTime, nullable=True, comment="最后访问时间"),
+    Column("update_time", DateTime, nullable=False, server_default=func.now(), comment="更新时间"),
+)
+
+Table(
+    "tool_video",
+    metadata,
+    Column("id", BigIntegerKey, primary_key=True, index=True, autoincrement=True),
+    Column("tool_id", String(100), nullable=False, unique=True, index=True, comment="工具ID"),
+    Column("tool_name", String(200), nullable=False, comment="工具名称"),
+    Column("video_path", String(500), nullable=False, comment="视频路径（相对于 /public/videos/）"),
+    Column("video_url", String(500), nullable=True, comment="视频URL（可选，用于外部视频链接）"),
+    Column("description", Text, nullable=True, comment="视频描述"),
+    Column("upload_time", DateTime, nullable=False, server_default=func.now(), comment="上传时间"),
+    Column("update_time", DateTime, nullable=False, server_default=func.now(), comment="更新时间"),
+)
+
+Table(
+    "admin_user",
+    metadata,
+    Column("id", BigIntegerKey, primary_key=True, index=True, autoincrement=True),
+    Column("username", String(50), nullable=False, unique=True, index=True, comment="用户名"),
+    Column("password", String(255), nullable=False, comment="密码（加密后）"),
+    Column("is_active", Integer, nullable=False, comment="是否激活（1=激活，0=禁用）"),
+    Column("create_time", DateTime, nullable=False, server_default=func.now(), comment="创建时间"),
+    Column("last_login_time", DateTime, nullable=True, comment="最后登录时间"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,38 @@
+"""
+访问记录游标分页的复合索引 (access_time, id) 和 (tool_id, access_time, id)
+
+复合索引已覆盖按时间和按工具的查询，删除 m0001 的 tool_id / access_time 单列索引，
+减少每次写入访问记录时维护的索引数量
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect
+from sqlalchemy.engine import Connection
+
+version = 2
+description = "访问记录复合索引"
+
+# 只声明索引用到的列
+tool_access = Table(
+    "tool_access",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("tool_id", String(100)),
+    Column("access_time", DateTime),
+)
+
+INDEXES = (
+    Index("ix_tool_access_time_id", tool_access.c.access_time, tool_access.c.id),
+    Index("ix_tool_access_tool_time_id", tool_access.c.tool_id, tool_access.c.access_time, tool_access.c.id),
+)
+
+# 被复合索引取代的单列索引
+REDUNDANT_INDEXES = ("ix_tool_access_tool_id", "ix_tool_access_access_time")
+
+
+def upgrade(connection: Connection) -> None:
+    for index in INDEXES:
+        index.create(connection, checkfirst=True)
+
+    existing = {index["name"] for index in inspect(connection).get_indexes("tool_access")}
+    for name in REDUNDANT_INDEXES:
+        if name in existing:
+            connection.exec_driver_sql(f"DROP INDEX {name}")
@@ -0,0 +1,113 @@
+"""
+工具访问小时 / 日汇总表，并根据已有访问记录回填统计表和汇总表
+
+回填逻辑复制自该版本的 statistics.rebuild_tool_statistics，不随其后续修改变化
+"""
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Integer, MetaData, String, Table, UniqueConstraint, select,
+)
+from sqlalchemy.engine import Connection
+
+version = 3
+description = "访问小时 / 日汇总表"
+
+# 回填时每次读取的原始记录数
+CHUNK_SIZE = 10000
+
+BigIntegerKey = BigInteger().with_variant(Integer, "sqlite")
+
+metadata = MetaData()
+
+
+def _rollup_table(name: str, bucket_comment: str, last_comment: str) -> Table:
+    return Table(
+        name,
+        metadata,
+        Column("id", BigIntegerKey, primary_key=True, index=True, autoincrement=True),
+        Column("tool_id", String(100), nullable=False, comment="工具ID"),
+        Column("tool_name", String(200), nullable=False, comment="工具名称"),
+        Column("bucket_start", DateTime, nullable=False, index=True, comment=bucket_comment),
+        Column("access_count", Integer, nullable=False, comment="访问次数"),
+        Column("last_access_time", DateTime, nullable=True, comment=last_comment),
+        UniqueConstraint("tool_id", "bucket_start", name=f"uq_{name}_tool_bucket"),
+    )
+
+
+tool_access_hourly = _rollup_table("tool_access_hourly", "小时起始时间", "该小时内最后访问时间")
+tool_access_daily = _rollup_table("tool_access_daily", "当天起始时间", "当天最后访问时间")
+
+# 回填读写的已有表（只声明用到的列）
+tool_access = Table(
+    "tool_access",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("tool_id", String(100)),
+    Column("tool_name", String(200)),
+    Column("access_time", DateTime),
+)
+tool_statistic = Table(
+    "tool_statistic",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("tool_id", String(100)),
+    Column("tool_name", String(200)),
+    Column("access_count", Integer),
+    Column("last_access_time", DateTime),
+)
+
+
+def _truncate_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _truncate_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _accumulate(target: Dict[tuple, dict], row, bucket: Optional[Callable[[datetime], datetime]]) -> None:
+    bucket_start = bucket(row.access_time) if bucket is not None else None
+    key = (row.tool_id, bucket_start)
+    item = target.get(key)
+    if item is None:
+        item = {
+            "tool_id": row.tool_id,
+            "tool_name": row.tool_name,
+            "access_count": 0,
+            "last_access_time": row.access_time,
+        }
+        if bucket is not None:
+            item["bucket_start"] = bucket_start
+        target[key] = item
+    item["access_count"] += 1
+    item["tool_name"] = row.tool_name
+    if row.access_time > item["last_access_time"]:
+        item["last_access_time"] = row.access_time
+
+
+def upgrade(connection: Connection) -> None:
+    metadata.create_all(connection, checkfirst=True)
+
+    if connection.execute(select(tool_access.c.id).limit(1)).first() is None:
+        return
+    # 全量重建：按 id 顺序分批读取原始记录，在内存中按工具和时间分桶汇总
+    totals: Dict[tuple, dict] = {}
+    hourly: Dict[tuple, dict] = {}
+    daily: Dict[tuple, dict] = {}
+    query = select(
+        tool_access.c.tool_id,
+        tool_access.c.tool_name,
+        tool_access.c.access_time
+    ).order_by(tool_access.c.id).execution_options(yield_per=CHUNK_SIZE)
+    for partition in connection.execute(query).partitions():
+        for row in partition:
+            _accumulate(totals, row, None)
+            _accumulate(hourly, row, _truncate_hour)
+            _accumulate(daily, row, _truncate_day)
+
+    for table, target in ((tool_statistic, totals), (tool_access_hourly, hourly), (tool_access_daily, daily)):
+        connection.execute(table.delete())
+        if target:
+            connection.execute(table.insert(), list(target.values()))
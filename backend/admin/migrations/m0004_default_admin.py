@@ -0,0 +1,37 @@
+"""
+创建默认管理员账号（用户名 admin，密码 admin123），已存在时跳过
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Connection
+
+version = 4
+description = "默认管理员账号"
+
+admin_user = Table(
+    "admin_user",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("username", String(50)),
+    Column("password", String(255)),
+    Column("is_active", Integer),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    from werkzeug.security import generate_password_hash
+
+    exists = connection.execute(
+        select(admin_user.c.id).where(admin_user.c.username == 'admin')
+    ).first()
+    if exists is not None:
+        return
+    connection.execute(admin_user.insert().values(
+        username='admin',
+        password=generate_password_hash('admin123'),
+        is_active=1
+    ))
+    print("=" * 50)
+    print("默认管理员账号已创建")
+    print("用户名: admin")
+    print("密码: admin123")
+    print("=" * 50)
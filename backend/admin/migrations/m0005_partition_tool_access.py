@@ -0,0 +1,113 @@
+"""
+PostgreSQL 上将 tool_access 改为按 access_time 的月范围分区表
+
+过期月份由归档任务整个分区 DETACH 后 DROP，热表和索引不会因大量 DELETE 而膨胀。
+- 分区表的主键必须包含分区键，主键改为 (id, access_time)；id 仍由原序列生成
+- 按已有记录的最早月份到当月之后 2 个月逐月建分区，另建默认分区兜底
+  （归档任务未运行时超出已建分区的记录写入默认分区，建分区时再移出）
+- 已有记录在迁移事务中整体复制，记录很多时请在维护窗口执行 python -m admin.migrations
+SQLite 不支持分区，不做处理
+"""
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+version = 5
+description = "访问记录按月分区（PostgreSQL）"
+
+# 迁移时在当月之后预先创建的分区月数
+MONTHS_AHEAD = 2
+
+
+def _add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def upgrade(connection: Connection) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+    partitioned = connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'tool_access' AND pg_table_is_visible(c.oid)"
+    )).first()
+    if partitioned is not None:
+        return
+
+    # 原表的 id 若为 identity 列，其序列随原表删除，先改为普通列再单独建序列
+    identity = connection.execute(text(
+        "SELECT attidentity FROM pg_attribute "
+        "WHERE attrelid = 'tool_access'::regclass AND attname = 'id'"
+    )).scalar()
+    if identity:
+        connection.execute(text("ALTER TABLE tool_access ALTER COLUMN id DROP IDENTITY"))
+    sequence = connection.execute(text("SELECT pg_get_serial_sequence('tool_access', 'id')")).scalar()
+    if sequence is None:
+        sequence = "tool_access_id_seq"
+        connection.execute(text(f"CREATE SEQUENCE {sequence} AS BIGINT"))
+        connection.execute(text(
+            f"SELECT setval('{sequence}', COALESCE((SELECT MAX(id) FROM tool_access), 0) + 1, false)"
+        ))
+
+    # 原表及其主键改名，腾出 tool_access / tool_access_pkey
+    primary_key = connection.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = 'tool_access'::regclass AND contype = 'p'"
+    )).scalar()
+    connection.execute(text("ALTER TABLE tool_access RENAME TO tool_access_unpartitioned"))
+    if primary_key is not None:
+        connection.execute(text(
+            f"ALTER TABLE tool_access_unpartitioned RENAME CONSTRAINT {primary_key} "
+            f"TO tool_access_unpartitioned_pkey"
+        ))
+
+    connection.execute(text(f"""
+        CREATE TABLE tool_access (
+            id BIGINT NOT NULL DEFAULT nextval('{sequence}'),
+            tool_id VARCHAR(100) NOT NULL,
+            tool_name VARCHAR(200) NOT NULL,
+            access_time TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),
+            ip_address VARCHAR(50),
+            user_agent TEXT,
+            path VARCHAR(500),
+            CONSTRAINT tool_access_pkey PRIMARY KEY (id, access_time)
+        ) PARTITION BY RANGE (access_time)
+    """))
+    for column, comment in (
+        ("tool_id", "工具ID"),
+        ("tool_name", "工具名称"),
+        ("access_time", "访问时间"),
+        ("ip_address", "IP地址"),
+        ("user_agent", "用户代理"),
+        ("path", "访问路径"),
+    ):
+        connection.execute(text(f"COMMENT ON COLUMN tool_access.{column} IS '{comment}'"))
+
+    oldest = connection.execute(text("SELECT MIN(access_time) FROM tool_access_unpartitioned")).scalar()
+    current = _month_start(datetime.now())
+    month = _month_start(oldest) if oldest is not None and oldest < current else current
+    last = _add_months(current, MONTHS_AHEAD)
+    while month <= last:
+        connection.execute(text(
+            f"CREATE TABLE tool_access_y{month.year}m{month.month:02d} PARTITION OF tool_access "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        ))
+        month = _add_months(month, 1)
+    connection.execute(text("CREATE TABLE tool_access_default PARTITION OF tool_access DEFAULT"))
+
+    connection.execute(text(
+        "INSERT INTO tool_access (id, tool_id, tool_name, access_time, ip_address, user_agent, path) "
+        "SELECT id, tool_id, tool_name, access_time, ip_address, user_agent, path "
+        "FROM tool_access_unpartitioned"
+    ))
+    connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY tool_access.id"))
+    connection.execute(text("DROP TABLE tool_access_unpartitioned"))
+
+    # 分区表上的索引自动建到每个分区（含之后新建的分区）
+    connection.execute(text("CREATE INDEX ix_tool_access_time_id ON tool_access (access_time, id)"))
+    connection.execute(text("CREATE INDEX ix_tool_access_tool_time_id ON tool_access (tool_id, access_time, id)"))
+    connection.execute(text("ANALYZE tool_access"))
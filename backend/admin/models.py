@@ -1,19 +1,32 @@
 """
 管理后台数据模型
 """
-from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Text
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger, Text, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from .database import Base
 
+# 主键类型：SQLite 只有 INTEGER PRIMARY KEY 才会自增，BIGINT 主键需要映射为 INTEGER
+BigIntegerKey = BigInteger().with_variant(Integer, "sqlite")
+
 
 class ToolAccess(Base):
-    """工具访问记录表"""
+    """
+    工具访问记录表
+
+    PostgreSQL 上为按 access_time 的月范围分区表（迁移 m0005），表上的主键为 (id, access_time)
+    """
     __tablename__ = "tool_access"
+    __table_args__ = (
+        # 访问记录游标分页：(access_time, id) 降序，按工具筛选时前置 tool_id
+        # （两个复合索引分别覆盖按时间、按工具的查询，不再单独为 tool_id / access_time 建索引）
+        Index("ix_tool_access_time_id", "access_time", "id"),
+        Index("ix_tool_access_tool_time_id", "tool_id", "access_time", "id"),
+    )
     
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
-    tool_id = Column(String(100), nullable=False, index=True, comment="工具ID")
+    id = Column(BigIntegerKey, primary_key=True, index=True, autoincrement=True)
+    tool_id = Column(String(100), nullable=False, comment="工具ID")
     tool_name = Column(String(200), nullable=False, comment="工具名称")
-    access_time = Column(DateTime, nullable=False, server_default=func.now(), index=True, comment="访问时间")
+    access_time = Column(DateTime, nullable=False, server_default=func.now(), comment="访问时间")
     ip_address = Column(String(50), nullable=True, comment="IP地址")
     user_agent = Column(Text, nullable=True, comment="用户代理")
     path = Column(String(500), nullable=True, comment="访问路径")
@@ -26,7 +39,7 @@ class ToolStatistic(Base):
     """工具统计表（用于缓存统计数据）"""
     __tablename__ = "tool_statistic"
     
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    id = Column(BigIntegerKey, primary_key=True, index=True, autoincrement=True)
     tool_id = Column(String(100), nullable=False, unique=True, index=True, comment="工具ID")
     tool_name = Column(String(200), nullable=False, comment="工具名称")
     access_count = Column(Integer, nullable=False, default=0, comment="访问次数")
@@ -37,11 +50,47 @@ class ToolStatistic(Base):
         return f"<ToolStatistic(tool_id={self.tool_id}, access_count={self.access_count})>"
 
 
+class ToolAccessHourly(Base):
+    """工具访问小时汇总表（按小时累计访问次数）"""
+    __tablename__ = "tool_access_hourly"
+    __table_args__ = (
+        UniqueConstraint("tool_id", "bucket_start", name="uq_tool_access_hourly_tool_bucket"),
+    )
+    
+    id = Column(BigIntegerKey, primary_key=True, index=True, autoincrement=True)
+    tool_id = Column(String(100), nullable=False, comment="工具ID")
+    tool_name = Column(String(200), nullable=False, comment="工具名称")
+    bucket_start = Column(DateTime, nullable=False, index=True, comment="小时起始时间")
+    access_count = Column(Integer, nullable=False, default=0, comment="访问次数")
+    last_access_time = Column(DateTime, nullable=True, comment="该小时内最后访问时间")
+    
+    def __repr__(self):
+        return f"<ToolAccessHourly(tool_id={self.tool_id}, bucket_start={self.bucket_start}, access_count={self.access_count})>"
+
+
+class ToolAccessDaily(Base):
+    """工具访问日汇总表（按天累计访问次数）"""
+    __tablename__ = "tool_access_daily"
+    __table_args__ = (
+        UniqueConstraint("tool_id", "bucket_start", name="uq_tool_access_daily_tool_bucket"),
+    )
+    
+    id = Column(BigIntegerKey, primary_key=True, index=True, autoincrement=True)
+    tool_id = Column(String(100), nullable=False, comment="工具ID")
+    tool_name = Column(String(200), nullable=False, comment="工具名称")
+    bucket_start = Column(DateTime, nullable=False, index=True, comment="当天起始时间")
+    access_count = Column(Integer, nullable=False, default=0, comment="访问次数")
+    last_access_time = Column(DateTime, nullable=True, comment="当天最后访问时间")
+    
+    def __repr__(self):
+        return f"<ToolAccessDaily(tool_id={self.tool_id}, bucket_start={self.bucket_start}, access_count={self.access_count})>"
+
+
 class ToolVideo(Base):
     """工具演示视频表"""
     __tablename__ = "tool_video"
     
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    id = Column(BigIntegerKey, primary_key=True, index=True, autoincrement=True)
     tool_id = Column(String(100), nullable=False, unique=True, index=True, comment="工具ID")
     tool_name = Column(String(200), nullable=False, comment="工具名称")
     video_path = Column(String(500), nullable=False, comment="视频路径（相对于 /public/videos/）")
@@ -58,7 +107,7 @@ class AdminUser(Base):
     """管理员用户表"""
     __tablename__ = "admin_user"
     
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    id = Column(BigIntegerKey, primary_key=True, index=True, autoincrement=True)
     username = Column(String(50), nullable=False, unique=True, index=True, comment="用户名")
     password = Column(String(255), nullable=False, comment="密码（加密后）")
     is_active = Column(Integer, nullable=False, default=1, comment="是否激活（1=激活，0=禁用）")
@@ -0,0 +1,34 @@
+"""
+访问记录游标分页
+
+按 (access_time, id) 降序做键集分页：下一页从上一页最后一条记录之后开始，
+不使用 OFFSET，深页与首页的查询代价相同。游标对调用方不透明
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+def encode_cursor(access_time: datetime, record_id: int) -> str:
+    """将最后一条记录的 (access_time, id) 编码为游标"""
+    payload = json.dumps({"t": access_time.isoformat(), "i": record_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), int(payload["i"])
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def next_cursor(records: list, limit: int) -> Optional[str]:
+    """本页记录数达到 limit 时返回下一页游标，否则返回 None（已到最后一页）"""
+    if len(records) < limit:
+        return None
+    last = records[-1]
+    return encode_cursor(last.access_time, last.id)
@@ -0,0 +1,107 @@
+"""
+数据库连接池统计
+
+在连接池取连接时计时，记录等待时间（包括池中无空闲连接时新建连接的时间）和超时次数，
+与连接池当前状态（已签出、溢出连接数等）一起通过管理接口输出，用于按 worker 数量调整连接池大小
+"""
+import time
+from typing import Dict, Iterable, Optional, Tuple, Type
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+
+class PoolStats:
+    """连接签出统计"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds += seconds
+        if seconds > self.max_wait_seconds:
+            self.max_wait_seconds = seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "total_wait_ms": self.wait_seconds * 1e3,
+            "avg_wait_ms": self.wait_seconds / self.checkouts * 1e3 if self.checkouts else 0.0,
+            "max_wait_ms": self.max_wait_seconds * 1e3,
+        }
+
+
+def instrumented_pool_class(base: Type[Pool], stats: PoolStats) -> Type[Pool]:
+    """
+    生成对取连接计时的连接池类
+
+    统计对象绑定在类上，engine.dispose() 重建连接池后仍累计到同一个统计对象
+    """
+
+    class InstrumentedPool(base):
+        pool_stats = stats
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                self.pool_stats.timeouts += 1
+                raise
+            self.pool_stats.record(time.perf_counter() - started)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    InstrumentedPool.__qualname__ = InstrumentedPool.__name__
+    return InstrumentedPool
+
+
+def pool_snapshot(engine: Engine, stats: Optional[PoolStats] = None) -> dict:
+    """连接池当前状态和签出统计"""
+    pool = engine.pool
+    snapshot = {
+        "dialect": engine.dialect.name,
+        "driver": engine.dialect.driver,
+        "pool_class": type(pool).__name__,
+    }
+    # StaticPool 等没有容量概念的连接池不提供以下方法
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            snapshot[name] = method()
+    # QueuePool.overflow() 在未用满 pool_size 时为负数，只输出实际使用的溢出连接数
+    if "overflow" in snapshot:
+        snapshot["overflow"] = max(snapshot["overflow"], 0)
+    timeout = getattr(pool, "timeout", None)
+    if callable(timeout):
+        snapshot["timeout"] = timeout()
+    if stats is not None:
+        snapshot.update(stats.snapshot())
+    return snapshot
+
+
+def pool_metric_samples(pools: Dict[str, Tuple[Engine, PoolStats]], field: str) -> Iterable[tuple]:
+    """
+    按连接池输出某个字段的指标样本 (后缀, 标签, 值)，供 /metrics 的回调指标使用
+
+    field 为 pool_snapshot 中的字段名，另支持 capacity（pool_size + max_overflow）、
+    utilization（已签出连接数 / capacity）和 wait_seconds；连接池不提供的字段不输出
+    """
+    samples = []
+    for name, (engine, stats) in pools.items():
+        snapshot = pool_snapshot(engine, stats)
+        if "size" in snapshot:
+            # max_overflow 为 -1 表示不限制溢出，此时按 pool_size 计算容量
+            capacity = snapshot["size"] + max(getattr(engine.pool, "_max_overflow", 0), 0)
+            snapshot["capacity"] = capacity
+            snapshot["utilization"] = snapshot["checkedout"] / capacity if capacity else 0.0
+        snapshot["wait_seconds"] = stats.wait_seconds
+        if field in snapshot:
+            samples.append(("", {"pool": name}, snapshot[field]))
+    return samples
@@ -0,0 +1,415 @@
+"""
+访问记录按月分区、保留期与归档
+
+tool_access 按自然月划分：超过保留期（默认 13 个月，保证 365 天统计窗口内的
+原始记录仍在热表中）的月份导出为 gzip 压缩的 CSV 归档文件，再从热表中删除，
+使热表及其索引保持在内存可容纳的规模。
+- PostgreSQL 上 tool_access 是按 access_time 的月范围分区表（迁移 m0005），按月维护分区
+  （提前创建、过期时 DETACH 后 DROP，不产生大量 DELETE）；SQLite 上按月份范围删除
+- 工具统计和小时 / 日汇总表不清理，统计接口对已归档的月份仍然有效
+- 已归档月份的原始访问记录可通过归档接口按需读取
+"""
+import asyncio
+import csv
+import gzip
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl：非 PostgreSQL 数据库只保证同一进程内串行
+    fcntl = None
+
+from .database import SessionLocal, engine
+from .models import ToolAccess
+
+# 归档目录、保留月数、自动归档间隔（小时，0 表示不自动执行），可通过环境变量调整
+ACCESS_ARCHIVE_DIR = Path(os.getenv(
+    "ACCESS_ARCHIVE_DIR",
+    str(Path(__file__).resolve().parent.parent / "data" / "access_archive")
+))
+ACCESS_RETENTION_MONTHS = int(os.getenv("ACCESS_RETENTION_MONTHS", "13"))
+ACCESS_RETENTION_INTERVAL_HOURS = float(os.getenv("ACCESS_RETENTION_INTERVAL_HOURS", "24"))
+# PostgreSQL 分区表提前创建的月份数
+ACCESS_PARTITION_MONTHS_AHEAD = 2
+# 默认分区：落在已建分区之外的记录写入这里，建对应月份的分区时再移出
+DEFAULT_PARTITION = "tool_access_default"
+
+ARCHIVE_COLUMNS = ["id", "tool_id", "tool_name", "access_time", "ip_address", "user_agent", "path"]
+# 导出时每次读取的记录数
+ARCHIVE_CHUNK_SIZE = 10000
+# 多进程部署时保证同一时间只有一个进程执行归档（PostgreSQL advisory lock）
+RETENTION_LOCK_KEY = 0x746f6f6c  # "tool"
+# 其他数据库（SQLite 多 worker）使用归档目录中的文件锁
+RETENTION_LOCK_FILE = ".retention.lock"
+
+
+def month_start(value: datetime) -> datetime:
+    """截断到当月第一天零点"""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    """月份加减（month 须为月初）"""
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def month_label(month: datetime) -> str:
+    return month.strftime("%Y-%m")
+
+
+def partition_name(month: datetime) -> str:
+    """月分区表名，如 tool_access_y2026m01"""
+    return f"tool_access_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(db: Session) -> bool:
+    """tool_access 是否为 PostgreSQL 原生分区表"""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'tool_access' AND pg_table_is_visible(c.oid)"
+    )).first() is not None
+
+
+def _create_partition(db: Session, name: str, month: datetime) -> None:
+    """
+    创建某月的分区
+
+    默认分区中已有该月的记录时（如归档任务停止期间写入的记录），不能直接建分区：
+    先建普通表并移入这些记录，再挂载为分区
+    """
+    bounds = {"start": month, "end": add_months(month, 1)}
+    values = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    has_default = db.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar()
+    pending = has_default is not None and db.execute(text(
+        f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE access_time >= :start AND access_time < :end LIMIT 1"
+    ), bounds).first() is not None
+    if not pending:
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF tool_access FOR VALUES {values}"))
+        return
+    db.execute(text(f"CREATE TABLE {name} (LIKE tool_access INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE access_time >= :start AND access_time < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    db.execute(text(f"ALTER TABLE tool_access ATTACH PARTITION {name} FOR VALUES {values}"))
+
+
+def ensure_partitions(db: Session, now: Optional[datetime] = None) -> List[str]:
+    """为分区表创建当月及之后若干个月的分区，返回新建的分区名"""
+    if not is_partitioned(db):
+        return []
+    existing = {
+        row[0] for row in db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'tool_access'"
+        ))
+    }
+    created = []
+    current = month_start(now or datetime.now())
+    for offset in range(ACCESS_PARTITION_MONTHS_AHEAD + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        if name in existing:
+            continue
+        _create_partition(db, name, month)
+        created.append(name)
+    db.commit()
+    return created
+
+
+def expired_months(db: Session, retention_months: int, now: Optional[datetime] = None) -> List[datetime]:
+    """热表中超过保留期的月份（月初时间），从早到晚"""
+    cutoff = add_months(month_start(now or datetime.now()), -retention_months)
+    oldest = db.execute(
+        select(func.min(ToolAccess.access_time)).where(ToolAccess.access_time < cutoff)
+    ).scalar()
+    months = []
+    if oldest is None:
+        return months
+    month = month_start(oldest)
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def _archive_path(month: datetime) -> Path:
+    """归档文件路径；同一月份重复归档（如迟到的记录）时追加序号，不覆盖已有文件"""
+    base = f"tool_access_{month_label(month)}"
+    path = ACCESS_ARCHIVE_DIR / f"{base}.csv.gz"
+    sequence = 1
+    while path.exists():
+        path = ACCESS_ARCHIVE_DIR / f"{base}.{sequence}.csv.gz"
+        sequence += 1
+    return path
+
+
+def export_month(db: Session, month: datetime) -> Optional[dict]:
+    """
+    将某月的访问记录导出为 gzip 压缩的 CSV 文件
+
+    先写入临时文件，完成后再重命名，避免留下不完整的归档。没有记录时返回 None
+    """
+    ACCESS_ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    query = select(
+        *[getattr(ToolAccess, column) for column in ARCHIVE_COLUMNS]
+    ).where(
+        ToolAccess.access_time >= month,
+        ToolAccess.access_time < add_months(month, 1)
+    ).order_by(ToolAccess.access_time, ToolAccess.id).execution_options(yield_per=ARCHIVE_CHUNK_SIZE)
+
+    path = _archive_path(month)
+    temp_path = path.with_name(path.name + ".tmp")
+    rows = 0
+    try:
+        with gzip.open(temp_path, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(ARCHIVE_COLUMNS)
+            for record in db.execute(query):
+                writer.writerow([
+                    value.isoformat() if isinstance(value, datetime) else value
+                    for value in record
+                ])
+                rows += 1
+    except Exception:
+        temp_path.unlink(missing_ok=True)
+        raise
+    if rows == 0:
+        temp_path.unlink(missing_ok=True)
+        return None
+    temp_path.replace(path)
+    return {"month": month_label(month), "rows": rows, "file": path.name}
+
+
+def _drop_month(db: Session, month: datetime, partitioned: bool) -> None:
+    """
+    从热表中移除某月的记录：分区表直接删除该月的分区，否则按范围删除
+
+    分区删除后再按范围删除一次，清理仍在默认分区中的该月记录（通常没有）
+    """
+    if partitioned:
+        name = partition_name(month)
+        exists = db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if exists is not None:
+            db.execute(text(f"ALTER TABLE tool_access DETACH PARTITION {name}"))
+            db.execute(text(f"DROP TABLE {name}"))
+    db.execute(delete(ToolAccess).where(
+        ToolAccess.access_time >= month,
+        ToolAccess.access_time < add_months(month, 1)
+    ))
+
+
+def archive_expired(
+    db: Session,
+    retention_months: int = ACCESS_RETENTION_MONTHS,
+    now: Optional[datetime] = None,
+) -> List[dict]:
+    """
+    归档并清理超过保留期的月份，返回各月份的归档结果
+
+    每个月份先导出、再在单独的事务中删除，导出失败时不会删除数据
+    """
+    partitioned = is_partitioned(db)
+    results = []
+    for month in expired_months(db, retention_months, now):
+        archived = export_month(db, month)
+        _drop_month(db, month, partitioned)
+        db.commit()
+        if archived is not None:
+            results.append(archived)
+    return results
+
+
+def list_archives() -> List[dict]:
+    """列出归档文件（按月份汇总）"""
+    archives = {}
+    if not ACCESS_ARCHIVE_DIR.exists():
+        return []
+    for path in sorted(ACCESS_ARCHIVE_DIR.glob("tool_access_*.csv.gz")):
+        month = path.name[len("tool_access_"):].split(".", 1)[0]
+        item = archives.setdefault(month, {"month": month, "files": [], "size_bytes": 0})
+        item["files"].append(path.name)
+        item["size_bytes"] += path.stat().st_size
+    return list(archives.values())
+
+
+def read_archive(
+    month: str,
+    tool_id: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> List[dict]:
+    """
+    读取某月的归档访问记录，按 (访问时间, ID) 降序分页
+
+    month 格式为 YYYY-MM，不存在的月份返回空列表。
+    逐行读取归档文件，只在内存中保留前 offset + limit 条记录
+    """
+    datetime.strptime(month, "%Y-%m")
+    return heapq.nlargest(
+        offset + limit,
+        _iter_archive(month, tool_id),
+        key=lambda record: (record["access_time"], record["id"])
+    )[offset:]
+
+
+def _iter_archive(month: str, tool_id: Optional[str]):
+    """逐行读取某月的全部归档文件"""
+    for path in sorted(ACCESS_ARCHIVE_DIR.glob(f"tool_access_{month}.*csv.gz")):
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if tool_id and row["tool_id"] != tool_id:
+                    continue
+                yield {
+                    "id": int(row["id"]),
+                    "tool_id": row["tool_id"],
+                    "tool_name": row["tool_name"],
+                    "access_time": datetime.fromisoformat(row["access_time"]),
+                    "ip_address": row["ip_address"] or None,
+                    "user_agent": row["user_agent"] or None,
+                    "path": row["path"] or None,
+                }
+
+
+def _try_lock_file():
+    """对归档目录中的锁文件加非阻塞排他锁，未获得锁时返回 None"""
+    ACCESS_ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    lock_file = open(ACCESS_ARCHIVE_DIR / RETENTION_LOCK_FILE, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class RetentionJob:
+    """定期执行分区维护和过期归档的后台任务"""
+
+    def __init__(
+        self,
+        retention_months: int = ACCESS_RETENTION_MONTHS,
+        interval_hours: float = ACCESS_RETENTION_INTERVAL_HOURS,
+    ):
+        self.retention_months = retention_months
+        self.interval_hours = interval_hours
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self.last_run: Optional[datetime] = None
+        self.last_seconds = 0.0
+        self.last_result: List[dict] = []
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """启动后台任务（需在事件循环中调用，间隔为 0 时不启动）"""
+        if self.interval_hours <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """启动后先执行一次（创建当月分区），之后按间隔执行"""
+        while True:
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception as e:
+                print(f"访问记录归档失败: {e}")
+            await asyncio.sleep(self.interval_hours * 3600)
+
+    def run_once(self) -> List[dict]:
+        """
+        执行一次分区维护和过期归档
+
+        同一进程内串行执行；PostgreSQL 上用 advisory lock、其他数据库用归档目录中的文件锁
+        保证多个进程中只有一个在执行，未获得锁时直接返回空列表。归档过程中会多次提交
+        （每个月份一个事务），会话的连接提交后可能被换掉，因此锁由单独的一个连接从加锁持有到解锁
+        """
+        with self._lock:
+            started = time.perf_counter()
+            lock_connection = None
+            lock_file = None
+            try:
+                if engine.dialect.name == "postgresql":
+                    lock_connection = engine.connect()
+                    locked = lock_connection.execute(
+                        text("SELECT pg_try_advisory_lock(:key)"), {"key": RETENTION_LOCK_KEY}
+                    ).scalar()
+                    # 会话级锁在提交后仍然保持，提交只是结束空闲事务
+                    lock_connection.commit()
+                    if not locked:
+                        lock_connection.close()
+                        lock_connection = None
+                        return []
+                elif fcntl is not None:
+                    lock_file = _try_lock_file()
+                    if lock_file is None:
+                        return []
+                with SessionLocal() as db:
+                    try:
+                        ensure_partitions(db)
+                        result = archive_expired(db, self.retention_months)
+                    except Exception:
+                        db.rollback()
+                        raise
+                self.last_result = result
+                self.last_error = None
+                return result
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            finally:
+                if lock_connection is not None:
+                    try:
+                        lock_connection.execute(
+                            text("SELECT pg_advisory_unlock(:key)"), {"key": RETENTION_LOCK_KEY}
+                        )
+                        lock_connection.commit()
+                    except Exception:
+                        # 解锁失败时丢弃该连接，数据库会话结束时锁随之释放
+                        lock_connection.invalidate()
+                    lock_connection.close()
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    lock_file.close()
+                self.last_run = datetime.now()
+                self.last_seconds = time.perf_counter() - started
+
+    def stats(self) -> dict:
+        return {
+            "retention_months": self.retention_months,
+            "interval_hours": self.interval_hours,
+            "archive_dir": str(ACCESS_ARCHIVE_DIR),
+            "last_run": self.last_run,
+            "last_seconds": self.last_seconds,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+
+# 全局归档任务实例
+retention_job = RetentionJob()
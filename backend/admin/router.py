@@ -1,16 +1,28 @@
 """
 管理后台 API 路由
 """
-from fastapi import APIRouter, Depends, Query, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi import APIRouter, Depends, Query, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select, tuple_
 from datetime import datetime, timedelta
 from typing import List, Optional
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-from .database import get_db
+from .database import (
+    get_async_db, engine, async_engine, sync_pool_stats, async_pool_stats,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+from .pool import pool_snapshot
 from .models import ToolAccess, ToolStatistic, ToolVideo, AdminUser
 from .auth import verify_password, create_access_token, get_current_user
+from .statistics import collect_tool_counts, count_accesses_since
+from .pagination import decode_cursor, next_cursor
+from .retention import list_archives, read_archive, retention_job
+from core.access_log import access_log_writer
+from core.middleware import access_tracking_stats
+from core.profiling import profile_store
+from core.static_files import frontend_server
 
 router = APIRouter(prefix="/api/admin", tags=["管理后台"])
 
@@ -49,7 +61,7 @@ class LoginResponse(BaseModel):
 @router.post("/login", response_model=LoginResponse)
 async def login(
     request: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     管理员登录
@@ -57,7 +69,8 @@ async def login(
     默认账号：admin / admin123
     """
     # 查找用户
-    user = db.query(AdminUser).filter(AdminUser.username == request.username).first()
+    result = await db.execute(select(AdminUser).where(AdminUser.username == request.username))
+    user = result.scalars().first()
     
     if not user:
         raise HTTPException(
@@ -80,7 +93,7 @@ async def login(
     
     # 更新最后登录时间
     user.last_login_time = datetime.now()
-    db.commit()
+    await db.commit()
     
     # 创建token
     access_token_expires = timedelta(minutes=60 * 24 * 7)  # 7天
@@ -98,65 +111,79 @@ async def login(
 
 @router.get("/stats/tools", response_model=List[ToolStatsResponse])
 async def get_tool_statistics(
-    days: int = Query(7, description="统计天数", ge=1, le=365),
-    db: Session = Depends(get_db),
+    days: int = Query(7, description="统计天数（0 表示全部）", ge=0, le=365),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
     获取各工具使用统计
     
-    返回指定天数内各工具的访问次数和最后访问时间
+    返回指定天数内各工具的访问次数和最后访问时间；
+    days=0 时直接读取增量维护的工具统计表，其余读取小时 / 日汇总表，不扫描访问记录
     """
+    if days == 0:
+        result = await db.execute(select(ToolStatistic).order_by(desc(ToolStatistic.access_count)))
+        stats = result.scalars().all()
+        return [
+            ToolStatsResponse(
+                tool_id=stat.tool_id,
+                tool_name=stat.tool_name,
+                access_count=stat.access_count,
+                last_access_time=stat.last_access_time
+            )
+            for stat in stats
+        ]
+    
     # 计算起始时间
     start_time = datetime.now() - timedelta(days=days)
     
-    # 查询统计信息
-    stats = db.query(
-        ToolAccess.tool_id,
-        ToolAccess.tool_name,
-        func.count(ToolAccess.id).label("access_count"),
-        func.max(ToolAccess.access_time).label("last_access_time")
-    ).filter(
-        ToolAccess.access_time >= start_time
-    ).group_by(
-        ToolAccess.tool_id,
-        ToolAccess.tool_name
-    ).order_by(
-        desc("access_count")
-    ).all()
+    # 查询统计信息（小时 / 日汇总表 + 不足一小时的原始记录）
+    stats = await db.run_sync(collect_tool_counts, start_time)
     
-    return [
-        ToolStatsResponse(
-            tool_id=stat.tool_id,
-            tool_name=stat.tool_name,
-            access_count=stat.access_count,
-            last_access_time=stat.last_access_time
-        )
-        for stat in stats
-    ]
+    return [ToolStatsResponse(**stat) for stat in stats]
 
 
 @router.get("/stats/access", response_model=List[AccessRecordResponse])
 async def get_access_records(
+    response: Response,
     tool_id: Optional[str] = Query(None, description="工具ID（可选）"),
     limit: int = Query(100, description="返回记录数", ge=1, le=1000),
-    offset: int = Query(0, description="偏移量", ge=0),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
+    offset: int = Query(0, description="偏移量（已废弃，请使用 cursor）", ge=0),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
     获取访问记录
     
-    支持按工具ID筛选，支持分页
+    支持按工具ID筛选，按 (访问时间, ID) 降序游标分页：
+    响应头 X-Next-Cursor 为下一页游标，没有该响应头表示已到最后一页
     """
-    query = db.query(ToolAccess)
+    query = select(ToolAccess)
     
     if tool_id:
-        query = query.filter(ToolAccess.tool_id == tool_id)
+        query = query.where(ToolAccess.tool_id == tool_id)
+    
+    if cursor:
+        try:
+            cursor_time, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.where(
+            tuple_(ToolAccess.access_time, ToolAccess.id) < tuple_(cursor_time, cursor_id)
+        )
+    elif offset:
+        query = query.offset(offset)
+    
+    result = await db.execute(query.order_by(
+        desc(ToolAccess.access_time),
+        desc(ToolAccess.id)
+    ).limit(limit))
+    records = result.scalars().all()
     
-    records = query.order_by(
-        desc(ToolAccess.access_time)
-    ).offset(offset).limit(limit).all()
+    token = next_cursor(records, limit)
+    if token:
+        response.headers["X-Next-Cursor"] = token
     
     return [
         AccessRecordResponse(
@@ -173,41 +200,241 @@ async def get_access_records(
 
 @router.get("/stats/summary")
 async def get_statistics_summary(
-    days: int = Query(7, description="统计天数", ge=1, le=365),
-    db: Session = Depends(get_db),
+    days: int = Query(7, description="统计天数（0 表示全部）", ge=0, le=365),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
     获取统计摘要
     
-    返回总访问次数、工具数量、今日访问次数等
+    返回总访问次数、工具数量、今日访问次数等；
+    days=0 时总访问次数和工具数量直接读取工具统计表，其余读取小时 / 日汇总表
     """
     start_time = datetime.now() - timedelta(days=days)
     today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     
-    # 总访问次数
-    total_count = db.query(func.count(ToolAccess.id)).filter(
-        ToolAccess.access_time >= start_time
-    ).scalar() or 0
+    # 今日访问次数（小时汇总表）
+    today_count = await db.run_sync(count_accesses_since, today_start)
     
-    # 今日访问次数
-    today_count = db.query(func.count(ToolAccess.id)).filter(
-        ToolAccess.access_time >= today_start
-    ).scalar() or 0
+    if days == 0:
+        result = await db.execute(select(
+            func.coalesce(func.sum(ToolStatistic.access_count), 0),
+            func.count(ToolStatistic.id)
+        ))
+        total_count, tool_count = result.one()
+        return {
+            "total_access_count": int(total_count),
+            "today_access_count": today_count,
+            "tool_count": tool_count,
+            "period_days": days
+        }
     
-    # 工具数量
-    tool_count = db.query(func.count(func.distinct(ToolAccess.tool_id))).filter(
-        ToolAccess.access_time >= start_time
-    ).scalar() or 0
+    # 总访问次数和工具数量（小时 / 日汇总表 + 不足一小时的原始记录）
+    stats = await db.run_sync(collect_tool_counts, start_time)
     
     return {
-        "total_access_count": total_count,
+        "total_access_count": sum(stat["access_count"] for stat in stats),
         "today_access_count": today_count,
-        "tool_count": tool_count,
+        "tool_count": len(stats),
         "period_days": days
     }
 
 
+@router.get("/system/access-tracking")
+async def get_access_tracking_stats(
+    current_user = Depends(get_current_user)
+):
+    """
+    获取访问追踪运行状态
+    
+    返回访问追踪中间件的自身开销（每请求耗时）和访问日志写入队列的状态
+    """
+    return {
+        "middleware": access_tracking_stats.snapshot(),
+        "writer": access_log_writer.stats()
+    }
+
+
+@router.get("/system/db-pool")
+async def get_db_pool_stats(
+    current_user = Depends(get_current_user)
+):
+    """
+    获取数据库连接池状态
+    
+    返回同步 / 异步引擎的连接池容量、已签出和溢出连接数、取连接等待时间及超时次数，
+    用于按 worker 数量调整连接池大小（每个 worker 进程各自一组连接池）
+    """
+    return {
+        "config": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+        },
+        "sync": pool_snapshot(engine, sync_pool_stats),
+        "async": pool_snapshot(async_engine.sync_engine, async_pool_stats)
+    }
+
+
+class ArchiveInfoResponse(BaseModel):
+    """访问记录归档信息响应"""
+    month: str
+    files: List[str]
+    size_bytes: int
+
+
+@router.get("/archives", response_model=List[ArchiveInfoResponse])
+async def get_archives(
+    current_user = Depends(get_current_user)
+):
+    """
+    获取访问记录归档列表
+    
+    超过保留期的月份从热表导出为压缩归档文件，按月份列出
+    """
+    return [ArchiveInfoResponse(**archive) for archive in list_archives()]
+
+
+@router.get("/archives/{month}/access", response_model=List[AccessRecordResponse])
+async def get_archived_access_records(
+    month: str,
+    tool_id: Optional[str] = Query(None, description="工具ID（可选）"),
+    limit: int = Query(100, description="返回记录数", ge=1, le=1000),
+    offset: int = Query(0, description="偏移量", ge=0),
+    current_user = Depends(get_current_user)
+):
+    """
+    获取已归档月份的访问记录
+    
+    month 格式为 YYYY-MM，按访问时间降序
+    """
+    try:
+        records = await run_in_threadpool(read_archive, month, tool_id, limit, offset)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"月份格式错误: {month}")
+    
+    return [AccessRecordResponse(**record) for record in records]
+
+
+@router.post("/system/retention")
+async def run_retention(
+    current_user = Depends(get_current_user)
+):
+    """
+    立即执行访问记录归档
+    
+    将超过保留期的月份导出为归档文件并从热表删除，返回本次归档的月份
+    """
+    try:
+        archived = await run_in_threadpool(retention_job.run_once)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"归档失败: {str(e)}")
+    
+    return {
+        "archived": archived,
+        "retention": retention_job.stats()
+    }
+
+
+@router.get("/system/retention")
+async def get_retention_status(
+    current_user = Depends(get_current_user)
+):
+    """
+    获取访问记录归档任务状态
+    """
+    return retention_job.stats()
+
+
+@router.get("/system/frontend")
+async def get_frontend_status(
+    current_user = Depends(get_current_user)
+):
+    """
+    获取前端静态文件服务状态
+    
+    返回构建目录、加载时间、内存中的文件数和大小、预压缩文件数
+    """
+    return frontend_server.stats()
+
+
+@router.post("/system/frontend/reload")
+async def reload_frontend(
+    current_user = Depends(get_current_user)
+):
+    """
+    重新加载前端构建目录（部署新前端后调用）
+    
+    只重新加载处理本次请求的进程；多 worker 部署时依赖 FRONTEND_RELOAD_INTERVAL 定期检查
+    """
+    try:
+        bundle = await run_in_threadpool(frontend_server.load)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"重新加载失败: {str(e)}")
+    if bundle is None:
+        raise HTTPException(status_code=404, detail="前端构建目录不存在")
+    return frontend_server.stats()
+
+
+class ProfileSummaryResponse(BaseModel):
+    """请求剖析结果摘要响应"""
+    id: str
+    created_at: datetime
+    method: str
+    path: str
+    query: Optional[str]
+    status: int
+    user: Optional[str]  # 发起剖析的管理员（随机抽样时为空）
+    reason: str  # "flag"（请求标记）或 "sampled"（随机抽样）
+    wall_ms: float  # 墙钟时间（毫秒）
+    cpu_ms: float  # 进程 CPU 时间（毫秒）
+    samples: int  # 采样到的调用栈数
+
+
+@router.get("/profiles", response_model=List[ProfileSummaryResponse])
+async def get_profiles(
+    limit: int = Query(50, description="返回记录数", ge=1, le=500),
+    current_user = Depends(get_current_user)
+):
+    """
+    获取请求剖析结果列表（从新到旧）
+    
+    请求带 X-Profile: 1 请求头或 profile=1 查询参数并携带管理员令牌时被剖析，
+    响应头 X-Profile-Id 为剖析结果ID
+    """
+    profiles = await run_in_threadpool(profile_store.list, limit)
+    return [ProfileSummaryResponse(**profile) for profile in profiles]
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    current_user = Depends(get_current_user)
+):
+    """
+    获取请求剖析结果
+    
+    包括热点函数（自身 / 累计样本和折算耗时）、按线程分组的调用树、墙钟时间和 CPU 时间
+    """
+    profile = await run_in_threadpool(profile_store.get, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="剖析结果不存在")
+    return profile
+
+
+@router.delete("/profiles/{profile_id}")
+async def delete_profile(
+    profile_id: str,
+    current_user = Depends(get_current_user)
+):
+    """删除请求剖析结果"""
+    if not await run_in_threadpool(profile_store.delete, profile_id):
+        raise HTTPException(status_code=404, detail="剖析结果不存在")
+    return {"message": "删除成功"}
+
+
 class VideoInfoResponse(BaseModel):
     """视频信息响应"""
     id: int
@@ -232,7 +459,7 @@ class VideoCreateRequest(BaseModel):
 @router.get("/videos", response_model=List[VideoInfoResponse])
 async def get_videos(
     tool_id: Optional[str] = Query(None, description="工具ID（可选）"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
@@ -240,12 +467,13 @@ async def get_videos(
     
     支持按工具ID筛选
     """
-    query = db.query(ToolVideo)
+    query = select(ToolVideo)
     
     if tool_id:
-        query = query.filter(ToolVideo.tool_id == tool_id)
+        query = query.where(ToolVideo.tool_id == tool_id)
     
-    videos = query.order_by(ToolVideo.upload_time.desc()).all()
+    result = await db.execute(query.order_by(ToolVideo.upload_time.desc()))
+    videos = result.scalars().all()
     
     return [
         VideoInfoResponse(
@@ -265,13 +493,14 @@ async def get_videos(
 @router.get("/videos/{tool_id}", response_model=Optional[VideoInfoResponse])
 async def get_video_by_tool_id(
     tool_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
     根据工具ID获取视频信息
     """
-    video = db.query(ToolVideo).filter(ToolVideo.tool_id == tool_id).first()
+    result = await db.execute(select(ToolVideo).where(ToolVideo.tool_id == tool_id))
+    video = result.scalars().first()
     
     if not video:
         return None
@@ -291,14 +520,15 @@ async def get_video_by_tool_id(
 @router.post("/videos", response_model=VideoInfoResponse)
 async def create_video(
     request: VideoCreateRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
     创建或更新工具演示视频信息
     """
     # 检查是否已存在
-    existing = db.query(ToolVideo).filter(ToolVideo.tool_id == request.tool_id).first()
+    result = await db.execute(select(ToolVideo).where(ToolVideo.tool_id == request.tool_id))
+    existing = result.scalars().first()
     
     if existing:
         # 更新现有记录
@@ -307,8 +537,8 @@ async def create_video(
         existing.video_url = request.video_url
         existing.description = request.description
         existing.update_time = datetime.now()
-        db.commit()
-        db.refresh(existing)
+        await db.commit()
+        await db.refresh(existing)
         
         return VideoInfoResponse(
             id=existing.id,
@@ -330,8 +560,8 @@ async def create_video(
             description=request.description
         )
         db.add(video)
-        db.commit()
-        db.refresh(video)
+        await db.commit()
+        await db.refresh(video)
         
         return VideoInfoResponse(
             id=video.id,
@@ -348,19 +578,20 @@ async def create_video(
 @router.delete("/videos/{tool_id}")
 async def delete_video(
     tool_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     """
     删除工具演示视频信息
     """
-    video = db.query(ToolVideo).filter(ToolVideo.tool_id == tool_id).first()
+    result = await db.execute(select(ToolVideo).where(ToolVideo.tool_id == tool_id))
+    video = result.scalars().first()
     
     if not video:
         return {"message": "视频信息不存在"}
     
-    db.delete(video)
-    db.commit()
+    await db.delete(video)
+    await db.commit()
     
     return {"message": "视频信息已删除"}
 
@@ -0,0 +1,239 @@
+"""
+工具统计增量维护
+
+访问日志批量写入时，在同一事务中按工具汇总本批次的访问次数和最后访问时间，
+原子地累加到以下表中，统计接口读取汇总表，无需扫描 tool_access：
+- tool_statistic：全部时间的累计值
+- tool_access_hourly / tool_access_daily：按小时 / 按天的分桶累计值
+
+任意时间范围 [start, now] 的统计拆分为：
+- [start, 下一个整点)：不足一小时，直接统计原始访问记录
+- 整点到下一个零点、今天零点以后：小时汇总
+- 中间的整天：日汇总
+因此 365 天与 1 天的统计读取的行数相近
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import ToolAccess, ToolAccessDaily, ToolAccessHourly, ToolStatistic
+
+# 全量重建时每次读取的原始记录数
+REBUILD_CHUNK_SIZE = 10000
+
+
+def truncate_hour(value: datetime) -> datetime:
+    """截断到整点"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def truncate_day(value: datetime) -> datetime:
+    """截断到零点"""
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil(value: datetime, truncate: Callable[[datetime], datetime], step: timedelta) -> datetime:
+    """向上取整到下一个分桶边界（已在边界上时不变）"""
+    floor = truncate(value)
+    return floor if floor == value else floor + step
+
+
+def summarize_batch(
+    batch: List[dict],
+    bucket: Optional[Callable[[datetime], datetime]] = None,
+) -> List[dict]:
+    """
+    按工具（及时间分桶）汇总一批访问记录
+
+    bucket 为 None 时只按工具汇总；否则按 (工具, bucket(访问时间)) 汇总，
+    结果带 bucket_start 字段
+    """
+    summary: Dict[tuple, dict] = {}
+    for record in batch:
+        bucket_start = bucket(record["access_time"]) if bucket is not None else None
+        key = (record["tool_id"], bucket_start)
+        item = summary.get(key)
+        if item is None:
+            item = {
+                "tool_id": record["tool_id"],
+                "tool_name": record["tool_name"],
+                "access_count": 1,
+                "last_access_time": record["access_time"],
+            }
+            if bucket is not None:
+                item["bucket_start"] = bucket_start
+            summary[key] = item
+            continue
+        item["access_count"] += 1
+        item["tool_name"] = record["tool_name"]
+        if record["access_time"] > item["last_access_time"]:
+            item["last_access_time"] = record["access_time"]
+    return list(summary.values())
+
+
+def _upsert_statement(db: Session, model, rows: List[dict], index_elements: List[str]):
+    """构造 INSERT ... ON CONFLICT (...) DO UPDATE 累加语句（PostgreSQL / SQLite）"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(model).values(rows)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(model).values(rows)
+    else:
+        raise NotImplementedError(f"不支持的数据库类型: {dialect}")
+
+    table = model.__table__
+    excluded = statement.excluded
+    set_ = {
+        "tool_name": excluded.tool_name,
+        "access_count": table.c.access_count + excluded.access_count,
+        "last_access_time": case(
+            (
+                or_(
+                    table.c.last_access_time.is_(None),
+                    excluded.last_access_time > table.c.last_access_time
+                ),
+                excluded.last_access_time
+            ),
+            else_=table.c.last_access_time
+        ),
+    }
+    if "update_time" in table.c:
+        set_["update_time"] = func.now()
+    return statement.on_conflict_do_update(
+        index_elements=[table.c[name] for name in index_elements],
+        set_=set_
+    )
+
+
+def apply_access_batch(db: Session, batch: List[dict]) -> None:
+    """
+    将一批访问记录累加到统计表和小时 / 日汇总表（不提交，由调用方在同一事务中提交）
+    """
+    rows = summarize_batch(batch)
+    if not rows:
+        return
+    db.execute(_upsert_statement(db, ToolStatistic, rows, ["tool_id"]))
+    db.execute(_upsert_statement(
+        db, ToolAccessHourly, summarize_batch(batch, truncate_hour), ["tool_id", "bucket_start"]
+    ))
+    db.execute(_upsert_statement(
+        db, ToolAccessDaily, summarize_batch(batch, truncate_day), ["tool_id", "bucket_start"]
+    ))
+
+
+def rebuild_tool_statistics(db: Session) -> int:
+    """
+    根据 tool_access 全量重建统计表和小时 / 日汇总表，返回工具数量
+
+    用于首次启用统计表或数据修复。分批读取原始记录，在内存中按桶汇总
+    """
+    totals: Dict[str, dict] = {}
+    hourly: Dict[tuple, dict] = {}
+    daily: Dict[tuple, dict] = {}
+    query = select(
+        ToolAccess.tool_id,
+        ToolAccess.tool_name,
+        ToolAccess.access_time
+    ).order_by(ToolAccess.id).execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    for partition in db.execute(query).partitions():
+        batch = [row._asdict() for row in partition]
+        for target, bucket in ((totals, None), (hourly, truncate_hour), (daily, truncate_day)):
+            for item in summarize_batch(batch, bucket):
+                key = (item["tool_id"], item.get("bucket_start"))
+                existing = target.get(key)
+                if existing is None:
+                    target[key] = item
+                    continue
+                existing["access_count"] += item["access_count"]
+                existing["tool_name"] = item["tool_name"]
+                if item["last_access_time"] > existing["last_access_time"]:
+                    existing["last_access_time"] = item["last_access_time"]
+
+    for model, target in ((ToolStatistic, totals), (ToolAccessHourly, hourly), (ToolAccessDaily, daily)):
+        db.query(model).delete()
+        if target:
+            db.execute(model.__table__.insert(), list(target.values()))
+    db.commit()
+    return len(totals)
+
+
+def _merge_counts(result: Dict[str, dict], rows) -> None:
+    """合并 (tool_id, tool_name, access_count, last_access_time) 行"""
+    for row in rows:
+        item = result.get(row.tool_id)
+        if item is None:
+            result[row.tool_id] = {
+                "tool_id": row.tool_id,
+                "tool_name": row.tool_name,
+                "access_count": int(row.access_count),
+                "last_access_time": row.last_access_time,
+            }
+            continue
+        item["access_count"] += int(row.access_count)
+        if row.last_access_time is not None and (
+            item["last_access_time"] is None or row.last_access_time > item["last_access_time"]
+        ):
+            item["last_access_time"] = row.last_access_time
+            item["tool_name"] = row.tool_name
+
+
+def _rollup_counts(db: Session, model, start: datetime, end: Optional[datetime] = None):
+    """按工具汇总 [start, end) 范围内的分桶"""
+    query = select(
+        model.tool_id,
+        func.max(model.tool_name).label("tool_name"),
+        func.sum(model.access_count).label("access_count"),
+        func.max(model.last_access_time).label("last_access_time")
+    ).where(model.bucket_start >= start)
+    if end is not None:
+        query = query.where(model.bucket_start < end)
+    return db.execute(query.group_by(model.tool_id)).all()
+
+
+def collect_tool_counts(db: Session, start_time: datetime) -> List[dict]:
+    """
+    统计 start_time 至今各工具的访问次数和最后访问时间，按访问次数降序
+
+    整点之前不足一小时的部分统计原始记录，其余部分读取小时 / 日汇总表
+    """
+    now = datetime.now()
+    hour_start = _ceil(start_time, truncate_hour, timedelta(hours=1))
+    day_start = max(_ceil(start_time, truncate_day, timedelta(days=1)), hour_start)
+    today_start = max(truncate_day(now), day_start)
+
+    result: Dict[str, dict] = {}
+    # 不足一小时的头部：原始访问记录
+    if start_time < hour_start:
+        _merge_counts(result, db.execute(
+            select(
+                ToolAccess.tool_id,
+                func.max(ToolAccess.tool_name).label("tool_name"),
+                func.count(ToolAccess.id).label("access_count"),
+                func.max(ToolAccess.access_time).label("last_access_time")
+            ).where(
+                ToolAccess.access_time >= start_time,
+                ToolAccess.access_time < hour_start
+            ).group_by(ToolAccess.tool_id)
+        ).all())
+    # 整点到下一个零点：小时汇总
+    if hour_start < day_start:
+        _merge_counts(result, _rollup_counts(db, ToolAccessHourly, hour_start, day_start))
+    # 中间的整天：日汇总
+    if day_start < today_start:
+        _merge_counts(result, _rollup_counts(db, ToolAccessDaily, day_start, today_start))
+    # 今天：小时汇总
+    _merge_counts(result, _rollup_counts(db, ToolAccessHourly, today_start))
+
+    return sorted(result.values(), key=lambda item: item["access_count"], reverse=True)
+
+
+def count_accesses_since(db: Session, start_time: datetime) -> int:
+    """统计 start_time（整点）至今的访问次数（读取小时汇总表）"""
+    return int(db.execute(
+        select(func.coalesce(func.sum(ToolAccessHourly.access_count), 0)).where(
+            ToolAccessHourly.bucket_start >= start_time
+        )
+    ).scalar())
@@ -0,0 +1,13 @@
+"""
+评分引擎与计算接口的性能基准
+
+用法（在 backend 目录下）：
+    python -m benchmarks                         # 完整基准（投标单位 10 ~ 1,000,000）
+    python -m benchmarks --quick                 # 快速基准（投标单位不超过 10,000）
+    python -m benchmarks --suite engine          # 只测 calculate_scores
+    python -m benchmarks --save-baseline         # 将本次结果保存为基准线
+    python -m benchmarks --baseline path.json    # 与指定基准线比较
+
+结果保存为 JSON（默认 data/benchmarks/latest.json）；存在基准线时逐项比较中位耗时，
+超过阈值的变慢项视为回归，以非零退出码结束。修改评分引擎时附上本次结果与基准线的对比
+"""
@@ -0,0 +1,64 @@
+"""
+运行性能基准
+
+用法见 benchmarks/__init__.py
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from .report import DEFAULT_THRESHOLD, build_report, compare, format_comparison, load_report, save_report
+from .runner import MIN_SECONDS, SUITES, run_suites
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT = BACKEND_DIR / "data" / "benchmarks" / "latest.json"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="评分引擎与计算接口性能基准")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="基准组（可重复指定，默认全部）")
+    parser.add_argument("--quick", action="store_true", help="快速模式（投标单位不超过 10,000）")
+    parser.add_argument("--max-bidders", type=int, help="投标单位数量上限")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="每个用例的最少累计计时（秒）")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="结果 JSON 文件")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="基准线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="回归阈值（0.25 表示变慢 25%%）")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基准线")
+    args = parser.parse_args()
+
+    suites = args.suite or list(SUITES)
+    results = run_suites(suites, quick=args.quick, max_bidders=args.max_bidders, min_seconds=args.min_seconds)
+    report = build_report(results, {
+        "suites": suites,
+        "quick": args.quick,
+        "max_bidders": args.max_bidders,
+        "min_seconds": args.min_seconds,
+    })
+    save_report(report, args.output)
+    print(f"结果已保存: {args.output}")
+
+    if args.save_baseline:
+        save_report(report, args.baseline)
+        print(f"基准线已保存: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"基准线不存在（{args.baseline}），跳过比较；可用 --save-baseline 生成")
+        return 0
+
+    baseline = load_report(args.baseline)
+    if baseline.get("environment", {}).get("machine") != report["environment"]["machine"]:
+        print("注意：基准线来自不同的机器架构，比较结果仅供参考")
+    comparisons = compare(report, baseline, args.threshold)
+    print(format_comparison(comparisons))
+    regressions = [item for item in comparisons if item["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} 个用例性能回归（阈值 {args.threshold:.0%}）")
+        return 1
+    print("未发现性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+基准输入生成
+
+按投标单位数量、去极值规则数、区间规则数和报价分布生成确定性的计算请求（固定随机种子），
+同一组参数每次生成的请求完全相同，结果可跨版本比较
+"""
+import random
+from typing import List
+
+# 报价分布：random 随机报价；duplicate 大量重复报价（排名并列）；
+# boundary 偏离度恰好落在区间规则边界上
+PRICE_DISTRIBUTIONS = ("random", "duplicate", "boundary")
+
+BASE_PRICE = 100.0
+# duplicate 分布中不同报价的个数
+DUPLICATE_DISTINCT_PRICES = 5
+# 区间规则覆盖的偏离度范围（%）
+INTERVAL_SPAN = 40.0
+
+
+def outlier_rules(count: int) -> List[dict]:
+    """
+    生成 count 条去极值规则，按投标单位数量分段，最后一段不设上限
+
+    每条规则去掉 1 个最高价和 1 个最低价
+    """
+    rules = []
+    for index in range(count):
+        rules.append({
+            "min_count": index * 5,
+            "max_count": (index + 1) * 5 if index < count - 1 else None,
+            "remove_high": 1,
+            "remove_low": 1,
+        })
+    return rules
+
+
+def interval_boundaries(count: int) -> List[float]:
+    """count 条区间规则的分界偏离度（不含 0）"""
+    width = INTERVAL_SPAN / count
+    return [round(width * (index + 1), 6) for index in range(count)]
+
+
+def interval_rules(count: int, side: str) -> List[dict]:
+    """
+    生成 count 条连续的区间规则，覆盖 0 ~ INTERVAL_SPAN 的偏离度
+
+    高价区间全部扣分；低价区间加分、扣分交替
+    """
+    rules = []
+    lower = 0.0
+    for index, upper in enumerate(interval_boundaries(count)):
+        rules.append({
+            "min_dev": lower,
+            "max_dev": upper,
+            "type": "deduct" if side == "high" or index % 2 else "add",
+            "factor": 0.5 + index % 3 * 0.25,
+        })
+        lower = upper
+    return rules
+
+
+def bidder_prices(count: int, distribution: str, intervals: int, seed: int = 0) -> List[float]:
+    """生成 count 个报价"""
+    rng = random.Random(seed)
+    if distribution == "random":
+        return [round(rng.uniform(80, 120), 2) for _ in range(count)]
+    if distribution == "duplicate":
+        distinct = [round(BASE_PRICE * (0.9 + 0.05 * index), 2) for index in range(DUPLICATE_DISTINCT_PRICES)]
+        return [rng.choice(distinct) for _ in range(count)]
+    if distribution == "boundary":
+        # 报价按偏离度 ±边界值成对出现，均值（即 K=1 时的基准价）恰好为 BASE_PRICE；
+        # 去极值去掉的最高、最低价也成对，不改变均值
+        boundaries = interval_boundaries(intervals)
+        prices = []
+        for index in range(count // 2):
+            deviation = boundaries[index % len(boundaries)] / 100
+            prices.extend([BASE_PRICE * (1 + deviation), BASE_PRICE * (1 - deviation)])
+        if count % 2:
+            prices.append(BASE_PRICE)
+        rng.shuffle(prices)
+        return prices
+    raise ValueError(f"未知的报价分布: {distribution}")
+
+
+def make_request(
+    bidders: int,
+    outliers: int = 1,
+    intervals: int = 2,
+    distribution: str = "random",
+    seed: int = 0,
+) -> dict:
+    """生成计算请求（CalculationRequest 的 JSON 结构）"""
+    prices = bidder_prices(bidders, distribution, intervals, seed)
+    return {
+        "config": {
+            "k_factor": 1.0,
+            "base_score": 60.0,
+            "outlier_rules": outlier_rules(outliers),
+            "high_price_rules": interval_rules(intervals, "high"),
+            "low_price_rules": interval_rules(intervals, "low"),
+            "min_score": 0,
+            "max_score": 100,
+        },
+        "bidders": [{"name": f"单位{index:07d}", "price": price} for index, price in enumerate(prices)],
+        "rank_method": "competition",
+        "tie_breaker": "index",
+    }
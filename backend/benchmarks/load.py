@@ -0,0 +1,323 @@
+"""
+进程内 ASGI 负载测试
+
+在同一进程中通过 ASGI 直接驱动 main.app（不经过网络），按配置的并发数和流量组成发送请求，
+测量包括中间件、访问日志批量写入、管理后台统计和评分计算在内的整体吞吐量。
+默认使用临时 SQLite 数据库，无需 PostgreSQL。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.load                                   # 默认 32 并发、20 秒
+    python -m benchmarks.load --concurrency 64 --requests 20000
+    python -m benchmarks.load --mix calculate=90,page=5,stats=5
+    python -m benchmarks.load --output data/benchmarks/load.json
+
+压测客户端与应用共用同一个事件循环和 CPU，结果用于不同版本之间的相对比较
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .inputs import make_request
+from .runner import configure_sqlite_environment
+
+# 默认流量组成（权重）
+DEFAULT_MIX = "calculate=90,page=5,stats=5"
+# 计算请求的不同请求体个数（不同请求体不命中结果缓存）与投标单位数量范围
+CALCULATE_VARIANTS = 200
+CALCULATE_BIDDERS = (10, 200)
+# 页面访问路径（由访问追踪中间件记录到访问日志）
+PAGE_PATHS = ("/tools/bidding/scoring", "/tools/bidding/scoring/history")
+ADMIN_USERNAME = os.getenv("LOAD_ADMIN_USERNAME", "admin")
+ADMIN_PASSWORD = os.getenv("LOAD_ADMIN_PASSWORD", "admin123")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """解析流量组成，如 calculate=90,page=5,stats=5"""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in REQUEST_KINDS:
+            raise ValueError(f"未知的请求类型: {name}（可选: {', '.join(REQUEST_KINDS)}）")
+        weights[name] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError(f"无效的流量组成: {mix}")
+    return weights
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """最近秩百分位数（ordered 已升序）"""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(ordered, 0.50) * 1e3,
+        "p95_ms": percentile(ordered, 0.95) * 1e3,
+        "p99_ms": percentile(ordered, 0.99) * 1e3,
+        "max_ms": ordered[-1] * 1e3 if ordered else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) * 1e3 if ordered else 0.0,
+    }
+
+
+class StatementCounter:
+    """按语句类型统计数据库语句（同步、异步引擎）"""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.enabled = False
+
+    def attach(self, *engines) -> None:
+        from sqlalchemy import event
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled:
+            keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+            self.counts[keyword] += 1
+
+    def snapshot(self) -> dict:
+        writes = sum(count for keyword, count in self.counts.items() if keyword in ("INSERT", "UPDATE", "DELETE"))
+        return {"statements": dict(self.counts), "write_statements": writes}
+
+
+class RequestFactory:
+    """各类请求的生成（请求体预先生成，不计入耗时）"""
+
+    def __init__(self, seed: int = 0):
+        rng = random.Random(seed)
+        self.calculate_bodies = [
+            json.dumps(
+                make_request(rng.randint(*CALCULATE_BIDDERS), distribution="random", seed=index),
+                ensure_ascii=False
+            ).encode("utf-8")
+            for index in range(CALCULATE_VARIANTS)
+        ]
+        self.token: Optional[str] = None
+
+    def auth_headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+
+async def request_calculate(client, factory: RequestFactory, rng: random.Random):
+    body = rng.choice(factory.calculate_bodies)
+    return await client.post(
+        "/api/tools/bidding/scoring/calculate",
+        content=body,
+        headers={"Content-Type": "application/json"}
+    )
+
+
+async def request_page(client, factory: RequestFactory, rng: random.Random):
+    return await client.get(rng.choice(PAGE_PATHS), headers={"User-Agent": "load-harness"})
+
+
+async def request_stats(client, factory: RequestFactory, rng: random.Random):
+    path = rng.choice(("/api/admin/stats/tools?days=7", "/api/admin/stats/summary?days=30"))
+    return await client.get(path, headers=factory.auth_headers())
+
+
+async def request_access(client, factory: RequestFactory, rng: random.Random):
+    return await client.get("/api/admin/stats/access?limit=50", headers=factory.auth_headers())
+
+
+REQUEST_KINDS = {
+    "calculate": request_calculate,
+    "page": request_page,
+    "stats": request_stats,
+    "access": request_access,
+}
+
+
+def prepare_frontend_dist() -> None:
+    """前端未构建时生成最小的 index.html，使页面访问走正常的 SPA 回退路由"""
+    if os.getenv("FRONTEND_DIST"):
+        return
+    default_dist = Path(__file__).resolve().parent.parent.parent / "frontend" / "dist"
+    if (default_dist / "index.html").exists():
+        return
+    dist = Path(tempfile.mkdtemp(prefix="load-dist-"))
+    (dist / "assets").mkdir()
+    (dist / "index.html").write_text(
+        '<!doctype html><html><head><script type="module" src="/assets/index.js"></script></head>'
+        '<body><div id="root"></div></body></html>',
+        encoding="utf-8"
+    )
+    (dist / "assets" / "index.js").write_text("console.log('load harness')\n", encoding="utf-8")
+    os.environ["FRONTEND_DIST"] = str(dist)
+
+
+async def run_load(
+    concurrency: int,
+    mix: Dict[str, float],
+    duration: Optional[float],
+    total_requests: Optional[int],
+    warmup_requests: int,
+    seed: int,
+    log=print,
+) -> dict:
+    import httpx
+    from main import app
+    from admin.database import async_engine, engine
+    from core.access_log import access_log_writer
+
+    counter = StatementCounter()
+    counter.attach(engine, async_engine.sync_engine)
+    factory = RequestFactory(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    errors: Counter = Counter()
+    issued = 0
+    measuring = False
+
+    async def worker(index: int, client, deadline: Optional[float]):
+        nonlocal issued
+        rng = random.Random(seed * 1000 + index)
+        while True:
+            if total_requests is not None and issued >= total_requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            issued += 1
+            kind = rng.choices(kinds, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await REQUEST_KINDS[kind](client, factory, rng)
+                status = response.status_code
+            except Exception as e:
+                errors[f"{kind}: {type(e).__name__}"] += 1
+                status = "error"
+            elapsed = time.perf_counter() - started
+            if measuring:
+                latencies[kind].append(elapsed)
+                statuses[kind][str(status)] += 1
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, client=("10.0.0.1", 40000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+            login = await client.post("/api/admin/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+            if login.status_code == 200:
+                factory.token = login.json()["access_token"]
+            else:
+                log(f"管理员登录失败（{login.status_code}），管理后台请求将返回 401")
+
+            # 预热：加载工具路由、填充缓存和连接池，不计入结果
+            if warmup_requests:
+                saved_total, issued = total_requests, 0
+                total_requests = warmup_requests
+                await asyncio.gather(*(worker(index, client, None) for index in range(min(concurrency, warmup_requests))))
+                total_requests, issued = saved_total, 0
+
+            writer_before = access_log_writer.stats()
+            counter.enabled = True
+            measuring = True
+            log(f"开始压测：并发 {concurrency}，流量组成 {mix}，"
+                + (f"{total_requests} 个请求" if total_requests is not None else f"{duration} 秒"))
+            started = time.perf_counter()
+            deadline = started + duration if duration is not None and total_requests is None else None
+            await asyncio.gather(*(worker(index, client, deadline) for index in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            measuring = False
+        # 退出生命周期时写完访问日志队列，写入次数包括这部分
+    counter.enabled = False
+    writer_after = access_log_writer.stats()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    completed = len(all_latencies)
+    return {
+        "concurrency": concurrency,
+        "mix": mix,
+        "seconds": elapsed,
+        "requests": completed,
+        "requests_per_second": completed / elapsed if elapsed else 0.0,
+        "latency": latency_summary(all_latencies),
+        "by_kind": {
+            kind: {**latency_summary(latencies[kind]), "status": dict(statuses[kind])}
+            for kind in kinds
+        },
+        "errors": dict(errors),
+        "db": {
+            **counter.snapshot(),
+            "access_log_rows_written": writer_after["written"] - writer_before["written"],
+            "access_log_batches": writer_after["batches"] - writer_before["batches"],
+            "access_log_dropped": writer_after["dropped"] - writer_before["dropped"],
+            "access_log_failed": writer_after["failed"] - writer_before["failed"],
+        },
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"请求数 {report['requests']}，耗时 {report['seconds']:.2f} 秒，"
+        f"吞吐量 {report['requests_per_second']:.1f} 请求/秒",
+        f"{'类型':<12}{'请求数':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  状态码",
+    ]
+    rows = [("全部", report["latency"], None)] + [
+        (kind, stats, stats["status"]) for kind, stats in report["by_kind"].items()
+    ]
+    for name, stats, status in rows:
+        lines.append(
+            f"{name:<12}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+            f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}  {status or ''}"
+        )
+    db = report["db"]
+    lines.append(
+        f"数据库写语句 {db['write_statements']}（{db['statements']}），"
+        f"访问日志写入 {db['access_log_rows_written']} 条 / {db['access_log_batches']} 批，"
+        f"丢弃 {db['access_log_dropped']}，失败 {db['access_log_failed']}"
+    )
+    if report["errors"]:
+        lines.append(f"请求异常: {report['errors']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="进程内 ASGI 负载测试（SQLite）")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发请求数")
+    parser.add_argument("--duration", type=float, default=20.0, help="压测时长（秒）")
+    parser.add_argument("--requests", type=int, help="请求总数（指定时忽略 --duration）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"流量组成，可选 {', '.join(REQUEST_KINDS)}")
+    parser.add_argument("--warmup", type=int, default=100, help="预热请求数（不计入结果）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", type=Path, help="结果 JSON 文件")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    configure_sqlite_environment()
+    prepare_frontend_dist()
+
+    report = asyncio.run(run_load(
+        args.concurrency, mix, args.duration, args.requests, args.warmup, args.seed
+    ))
+    print(format_report(report))
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"结果已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
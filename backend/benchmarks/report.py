@@ -0,0 +1,108 @@
+"""
+基准结果的保存与基准线比较
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+# 中位耗时超过基准线的比例阈值（0.25 表示变慢 25% 以上视为回归）
+DEFAULT_THRESHOLD = 0.25
+# 中位耗时差值小于该值（秒）时不视为回归，避免极短用例的计时噪声
+NOISE_FLOOR_SECONDS = 50e-6
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, timeout=5,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> dict:
+    """运行环境信息（不同机器的结果不可直接比较）"""
+    import numpy
+    import pydantic
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pydantic": pydantic.VERSION,
+        "git_commit": _git_commit(),
+    }
+
+
+def build_report(results: List[dict], options: dict) -> dict:
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "options": options,
+        "results": results,
+    }
+
+
+def save_report(report: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def load_report(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def compare(
+    current: dict,
+    baseline: dict,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[dict]:
+    """
+    按用例名称比较中位耗时，返回两边都有的用例的比较结果
+
+    status：regression（变慢超过阈值）、improvement（变快超过阈值）或 ok
+    """
+    baseline_results = {result["name"]: result for result in baseline.get("results", [])}
+    comparisons = []
+    for result in current["results"]:
+        previous = baseline_results.get(result["name"])
+        if previous is None:
+            continue
+        now = result["stats"]["median"]
+        before = previous["stats"]["median"]
+        ratio = now / before if before else float("inf")
+        status = "ok"
+        if abs(now - before) >= NOISE_FLOOR_SECONDS:
+            if ratio > 1 + threshold:
+                status = "regression"
+            elif ratio < 1 / (1 + threshold):
+                status = "improvement"
+        comparisons.append({
+            "name": result["name"],
+            "baseline_median": before,
+            "median": now,
+            "ratio": ratio,
+            "status": status,
+        })
+    return comparisons
+
+
+def format_comparison(comparisons: List[dict]) -> str:
+    """比较结果的文本表格"""
+    lines = [f"{'用例':<75} {'基准线 ms':>12} {'本次 ms':>12} {'倍数':>7}  结果"]
+    labels = {"regression": "回归", "improvement": "提升", "ok": ""}
+    for item in comparisons:
+        lines.append(
+            f"{item['name']:<75} {item['baseline_median'] * 1e3:12.3f} {item['median'] * 1e3:12.3f} "
+            f"{item['ratio']:7.2f}  {labels[item['status']]}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,219 @@
+"""
+基准用例与计时
+
+- engine：直接调用 calculate_scores（请求模型预先构造，不计入耗时）
+- api：在进程内通过 ASGI 调用完整的 FastAPI 应用（中间件、请求校验、序列化），
+  使用临时 SQLite 数据库；cold 用例每次请求内容不同（不命中结果缓存），cached 用例重复同一请求
+"""
+import asyncio
+import gc
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .inputs import PRICE_DISTRIBUTIONS, make_request
+
+# 投标单位数量
+FULL_BIDDER_COUNTS = (10, 100, 1000, 10000, 100000, 1000000)
+QUICK_BIDDER_COUNTS = (10, 100, 1000, 10000)
+# 规则数量组合（在固定的投标单位数量下测试）
+RULE_BIDDERS = 10000
+OUTLIER_RULE_COUNTS = (0, 1, 8, 64)
+INTERVAL_RULE_COUNTS = (1, 4, 32, 256)
+# 报价分布用例的投标单位数量
+DISTRIBUTION_BIDDERS = (1000, 100000)
+
+# 每个用例至少重复的次数、最少累计耗时（秒）和最多重复次数
+MIN_REPEATS = 3
+MIN_SECONDS = 1.0
+MAX_REPEATS = 200
+
+API_PATH = "/api/tools/bidding/scoring/calculate"
+LEGACY_API_PATH = "/calculate"
+
+
+def summarize(samples: List[float]) -> dict:
+    """耗时统计（秒）"""
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "repeats": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[p95_index],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def time_call(func: Callable[[int], None], min_seconds: float = MIN_SECONDS) -> dict:
+    """
+    重复调用 func(第几次) 并计时，直到达到最少重复次数和最少累计耗时
+
+    计时期间暂停垃圾回收，避免回收时机造成的抖动
+    """
+    samples: List[float] = []
+    func(-1)  # 预热（导入、编译配置缓存等），不计入结果
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(samples) < MAX_REPEATS and (len(samples) < MIN_REPEATS or sum(samples) < min_seconds):
+            started = time.perf_counter()
+            func(len(samples))
+            samples.append(time.perf_counter() - started)
+            gc.collect()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return summarize(samples)
+
+
+def case_name(suite: str, **params) -> str:
+    return suite + "/" + "/".join(f"{key}={value}" for key, value in params.items())
+
+
+def engine_cases(bidder_counts: Iterable[int], max_bidders: int) -> List[dict]:
+    """calculate_scores 用例参数：投标单位数量、规则数量、报价分布三组"""
+    cases = []
+    for bidders in bidder_counts:
+        cases.append({"bidders": bidders, "outliers": 1, "intervals": 2, "distribution": "random"})
+    if RULE_BIDDERS <= max_bidders:
+        for outliers in OUTLIER_RULE_COUNTS:
+            for intervals in INTERVAL_RULE_COUNTS:
+                cases.append({
+                    "bidders": RULE_BIDDERS, "outliers": outliers, "intervals": intervals, "distribution": "random"
+                })
+    for bidders in DISTRIBUTION_BIDDERS:
+        if bidders > max_bidders:
+            continue
+        for distribution in PRICE_DISTRIBUTIONS:
+            cases.append({"bidders": bidders, "outliers": 1, "intervals": 4, "distribution": distribution})
+    # 去重（不同分组可能生成相同参数），保持顺序
+    unique = []
+    for case in cases:
+        if case["bidders"] <= max_bidders and case not in unique:
+            unique.append(case)
+    return unique
+
+
+def run_engine_suite(bidder_counts: Iterable[int], max_bidders: int, min_seconds: float, log=print) -> List[dict]:
+    """直接调用 calculate_scores"""
+    from tools.bidding_scoring.logic import CalculationRequest, calculate_scores
+
+    results = []
+    for params in engine_cases(bidder_counts, max_bidders):
+        request = CalculationRequest.model_validate(make_request(**params))
+        stats = time_call(lambda _: calculate_scores(request), min_seconds)
+        results.append(_result("engine", params, stats, log))
+    return results
+
+
+def _result(suite: str, params: dict, stats: dict, log) -> dict:
+    stats["per_bidder_ns"] = stats["median"] / params["bidders"] * 1e9
+    result = {"name": case_name(suite, **params), "suite": suite, "params": params, "stats": stats}
+    log(f"{result['name']:<75} median {stats['median'] * 1e3:10.3f} ms  "
+        f"p95 {stats['p95'] * 1e3:10.3f} ms  x{stats['repeats']}")
+    return result
+
+
+def configure_sqlite_environment() -> None:
+    """API 基准使用临时 SQLite 数据库，不启动归档任务（已设置的环境变量优先，须在导入 main 之前调用）"""
+    workdir = tempfile.mkdtemp(prefix="benchmark-")
+    os.environ.setdefault("DB_BACKEND", "sqlite")
+    os.environ.setdefault("SQLITE_PATH", os.path.join(workdir, "benchmark.db"))
+    os.environ.setdefault("ACCESS_ARCHIVE_DIR", os.path.join(workdir, "archive"))
+    os.environ.setdefault("PROFILE_DIR", os.path.join(workdir, "profiles"))
+    os.environ.setdefault("ACCESS_RETENTION_INTERVAL_HOURS", "0")
+
+
+def run_api_suite(bidder_counts: Iterable[int], max_bidders: int, min_seconds: float, log=print) -> List[dict]:
+    """通过 ASGI 调用完整应用"""
+    configure_sqlite_environment()
+    return asyncio.run(_run_api_suite(bidder_counts, max_bidders, min_seconds, log))
+
+
+async def _run_api_suite(bidder_counts, max_bidders, min_seconds, log) -> List[dict]:
+    import httpx
+    from main import app
+
+    cases = [
+        (API_PATH, "cold", {"bidders": bidders, "outliers": 1, "intervals": 2, "distribution": "random"})
+        for bidders in bidder_counts if bidders <= max_bidders
+    ]
+    for path, mode in ((API_PATH, "cached"), (LEGACY_API_PATH, "cold")):
+        cases.append((path, mode, {"bidders": 1000, "outliers": 1, "intervals": 2, "distribution": "random"}))
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for case, (path, mode, params) in enumerate(cases):
+                body = json.dumps(make_request(**params), ensure_ascii=False).encode("utf-8")
+                # 每个冷缓存用例使用各自的名称前缀，不会命中之前用例（同样的请求体）写入的缓存
+                namespace = f"基准{case:02d}-" if mode == "cold" else None
+                stats = await _time_requests(client, path, body, namespace, min_seconds)
+                results.append(_result("api", {"path": path, "mode": mode, **params}, stats, log))
+    return results
+
+
+async def _time_requests(client, path: str, body: bytes, namespace: Optional[str], min_seconds: float) -> dict:
+    """
+    依次发送请求并计时（异步版本的 time_call）
+
+    指定 namespace 时每次将第一个投标单位的名称替换为 namespace 加序号，使请求不命中结果缓存；
+    请求体在计时前生成
+    """
+    marker = "单位0000000".encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+
+    def payload(index: int) -> bytes:
+        if namespace is None:
+            return body
+        return body.replace(marker, f"{namespace}{index + 2:07d}".encode("utf-8"), 1)
+
+    async def post(content: bytes) -> None:
+        response = await client.post(path, content=content, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} 返回 {response.status_code}: {response.text[:200]}")
+
+    samples: List[float] = []
+    await post(payload(-1))
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(samples) < MAX_REPEATS and (len(samples) < MIN_REPEATS or sum(samples) < min_seconds):
+            content = payload(len(samples))
+            started = time.perf_counter()
+            await post(content)
+            samples.append(time.perf_counter() - started)
+            gc.collect()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return summarize(samples)
+
+
+SUITES: Dict[str, Callable[..., List[dict]]] = {
+    "engine": run_engine_suite,
+    "api": run_api_suite,
+}
+
+
+def run_suites(
+    suites: Iterable[str],
+    quick: bool = False,
+    max_bidders: Optional[int] = None,
+    min_seconds: float = MIN_SECONDS,
+    log=print,
+) -> List[dict]:
+    """运行指定的基准组，返回各用例结果"""
+    bidder_counts = QUICK_BIDDER_COUNTS if quick else FULL_BIDDER_COUNTS
+    if max_bidders is None:
+        max_bidders = max(bidder_counts)
+    results = []
+    for suite in suites:
+        results.extend(SUITES[suite](bidder_counts, max_bidders, min_seconds, log=log))
+    return results
@@ -0,0 +1,208 @@
+"""
+访问日志批量写入
+
+中间件只把访问记录放入有界队列，由后台任务按批量大小或时间间隔批量写入数据库：
+- 每批一个事务，避免每次访问一个事务；同一事务中累加 tool_statistic 统计
+- 队列满时丢弃新记录并计数，不阻塞请求
+- 应用关闭时写完队列中剩余的记录
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from admin.database import AsyncSessionLocal
+from admin.models import ToolAccess
+from admin.statistics import apply_access_batch
+from core.metrics import metrics
+
+# 队列容量、单批最大记录数、最长刷新间隔（秒），可通过环境变量调整
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+ACCESS_LOG_BATCH_SIZE = int(os.getenv("ACCESS_LOG_BATCH_SIZE", "500"))
+ACCESS_LOG_FLUSH_INTERVAL = float(os.getenv("ACCESS_LOG_FLUSH_INTERVAL", "1.0"))
+
+# 队列中的停止标记
+_STOP = object()
+
+write_duration = metrics.histogram(
+    "access_log_write_seconds",
+    "访问日志批量写入耗时（秒），按结果",
+    ("result",)
+)
+
+
+class AccessLogWriter:
+    """访问日志批量写入器"""
+
+    def __init__(
+        self,
+        queue_size: int = ACCESS_LOG_QUEUE_SIZE,
+        batch_size: int = ACCESS_LOG_BATCH_SIZE,
+        flush_interval: float = ACCESS_LOG_FLUSH_INTERVAL,
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 统计计数
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_write_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """启动后台写入任务（需在事件循环中调用）"""
+        if self.running:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务，并写入队列中剩余的记录"""
+        if self.running:
+            # 放入停止标记，后台任务写完当前批次后退出
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                await self._flush([record for record in self._drain(self.batch_size) if record is not _STOP])
+
+    def enqueue(
+        self,
+        tool_id: str,
+        tool_name: str,
+        path: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+    ) -> bool:
+        """
+        放入一条访问记录，不阻塞
+
+        访问时间在此时记录，而不是写入数据库时。队列已满时丢弃并返回 False
+        """
+        if not self.running:
+            self.start()
+        record = {
+            "tool_id": tool_id,
+            "tool_name": tool_name,
+            "access_time": datetime.now(),
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "path": path,
+        }
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _drain(self, limit: int) -> List[dict]:
+        """从队列中取出最多 limit 条已就绪的记录"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """后台循环：攒够一批或等待超过刷新间隔后写入，收到停止标记时写完当前批次后退出"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                batch.extend(self._drain(self.batch_size - len(batch)))
+                if _STOP in batch or len(batch) >= self.batch_size:
+                    break
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [record for record in batch if record is not _STOP]
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]) -> None:
+        """批量写入一批记录，失败时记录错误但不影响主流程"""
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            await self._write_batch(batch)
+            self.written += len(batch)
+            self.batches += 1
+            result = "ok"
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"批量写入访问日志失败: {e}")
+            result = "error"
+        self.last_write_seconds = time.perf_counter() - started
+        write_duration.observe(self.last_write_seconds, result=result)
+
+    async def _write_batch(self, batch: List[dict]) -> None:
+        """批量插入访问记录并累加工具统计（一个事务，异步驱动）"""
+        async with AsyncSessionLocal() as db:
+            try:
+                await db.execute(insert(ToolAccess), batch)
+                await db.run_sync(apply_access_batch, batch)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+    def stats(self) -> dict:
+        """写入器统计"""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_write_seconds": self.last_write_seconds,
+        }
+
+
+# 全局访问日志写入器实例
+access_log_writer = AccessLogWriter()
+
+metrics.gauge_callback(
+    "access_log_queue_depth",
+    "访问日志队列中等待写入的记录数",
+    lambda: [("", {}, access_log_writer.stats()["queue_depth"])]
+)
+metrics.gauge_callback(
+    "access_log_queue_capacity",
+    "访问日志队列容量",
+    lambda: [("", {}, access_log_writer.queue_size)]
+)
+metrics.counter_callback(
+    "access_log_records_total",
+    "访问日志记录数，按状态（enqueued 入队、dropped 队列满丢弃、written 已写入、failed 写入失败）",
+    lambda: [
+        ("", {"state": state}, getattr(access_log_writer, state))
+        for state in ("enqueued", "dropped", "written", "failed")
+    ]
+)
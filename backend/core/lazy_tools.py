@@ -0,0 +1,87 @@
+"""
+工具路由延迟加载
+
+启动时为每个通过清单注册的工具挂载一个占位路由，匹配该工具的请求路径前缀。
+首个请求到达时在线程池中导入工具的路由模块，把真实路由插入到占位路由的位置
+（保证仍在 SPA 回退路由之前），然后重新分发该请求；之后的请求直接匹配真实路由
+"""
+import asyncio
+from typing import List, Tuple
+
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import BaseRoute, Match, NoMatchFound
+from starlette.types import Receive, Scope, Send
+
+from core.tool_registry import ToolRegistry
+
+
+class LazyToolRoute(BaseRoute):
+    """工具占位路由：首次匹配时加载工具的真实路由"""
+
+    def __init__(self, app: FastAPI, registry: ToolRegistry, tool_id: str, prefixes: List[str]):
+        self.app = app
+        self.registry = registry
+        self.tool_id = tool_id
+        self.prefixes = [prefix.rstrip("/") for prefix in prefixes]
+        self._lock = asyncio.Lock()
+        self._installed = False
+
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        if scope["type"] == "http":
+            path = scope["path"]
+            for prefix in self.prefixes:
+                if path == prefix or path.startswith(prefix + "/"):
+                    return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.load()
+        # 真实路由已替换占位路由，重新分发当前请求
+        await self.app.router(scope, receive, send)
+
+    async def load(self) -> None:
+        """导入工具路由并替换占位路由（并发的首批请求只导入一次）"""
+        async with self._lock:
+            if self._installed:
+                return
+            routers = await run_in_threadpool(self.registry.load_tool, self.tool_id)
+            install_routers(self.app, routers, self)
+            self._installed = True
+
+
+def install_routers(app: FastAPI, routers: list, placeholder: BaseRoute) -> None:
+    """把路由插入到占位路由所在的位置，并移除占位路由（需在事件循环线程中调用）"""
+    routes = app.router.routes
+    start = len(routes)
+    for router in routers:
+        app.include_router(router)
+    new_routes = routes[start:]
+    del routes[start:]
+    if placeholder in routes:
+        index = routes.index(placeholder)
+        routes[index:index + 1] = new_routes
+    else:
+        routes.extend(new_routes)
+    # 新路由加入后重新生成 OpenAPI 文档
+    app.openapi_schema = None
+
+
+def mount_lazy_tools(app: FastAPI, registry: ToolRegistry) -> List[LazyToolRoute]:
+    """为清单中的每个工具挂载占位路由（须在 SPA 回退路由之前调用）"""
+    placeholders = []
+    for tool_id, manifest in registry.get_manifests().items():
+        placeholder = LazyToolRoute(app, registry, tool_id, manifest.get("prefixes", []))
+        app.router.routes.append(placeholder)
+        placeholders.append(placeholder)
+    return placeholders
+
+
+async def preload_tools(app: FastAPI, tool_ids: List[str]) -> None:
+    """启动时预先加载指定工具的路由（不等首个请求）"""
+    for route in list(app.router.routes):
+        if isinstance(route, LazyToolRoute) and route.tool_id in tool_ids:
+            await route.load()
@@ -0,0 +1,261 @@
+"""
+进程内指标与 Prometheus 文本格式输出
+
+不依赖外部采集组件：指标在进程内累计，GET /metrics 按 Prometheus 文本格式（0.0.4）输出，
+可直接用 curl 查看或由 Prometheus 抓取。多 worker 部署时每个进程各自统计
+- 计数器、直方图：在代码中直接记录（线程安全，计算可能在线程池中执行）
+- 回调指标：抓取时调用回调函数读取当前值（队列深度、连接池状态等）
+"""
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 默认延迟直方图分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 回调指标返回的样本：(指标名后缀, 标签, 值)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Sample]:
+        return ()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """只增计数器（指标名须以 _total 结尾）"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", dict(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    """直方图（累计分桶 + 总和 + 次数）"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签：[各分桶计数..., 超出最大分桶的计数, 总和]
+        self._values: Dict[tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def time(self, **labels) -> "_Timer":
+        """上下文管理器：记录代码块耗时"""
+        return _Timer(self, labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        for key, counts in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            cumulative += counts[len(self.buckets)]
+            yield "_bucket", {**labels, "le": "+Inf"}, cumulative
+            yield "_sum", labels, counts[-1]
+            yield "_count", labels, cumulative
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class CallbackMetric(Metric):
+    """抓取时调用回调读取当前值的指标（gauge 或 counter）"""
+
+    def __init__(self, name: str, documentation: str, type_name: str, callback: Callable[[], Iterable[Sample]]):
+        super().__init__(name, documentation)
+        self.type_name = type_name
+        self.callback = callback
+
+    def samples(self) -> Iterable[Sample]:
+        try:
+            return list(self.callback())
+        except Exception:
+            # 回调失败（如连接池尚未创建）时不输出样本，不影响其他指标
+            return []
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, callback: Callable[[], Iterable[Sample]]) -> Metric:
+        """注册回调 gauge，回调返回 (后缀, 标签, 值) 样本"""
+        return self._register(CallbackMetric(name, documentation, "gauge", callback))
+
+    def counter_callback(self, name: str, documentation: str, callback: Callable[[], Iterable[Sample]]) -> Metric:
+        """注册回调 counter（值由其他组件累计），指标名须以 _total 结尾"""
+        return self._register(CallbackMetric(name, documentation, "counter", callback))
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式输出全部指标"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+# 请求延迟（按路由模板）和工具请求延迟（按 tool_registry 中的工具，自动覆盖所有已注册工具）
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP 请求处理耗时（秒），按路由模板、方法和状态码",
+    ("route", "method", "status")
+)
+tool_request_duration = metrics.histogram(
+    "tool_request_duration_seconds",
+    "工具 API 请求处理耗时（秒），按工具",
+    ("tool", "status")
+)
+
+
+def route_template(scope: Scope) -> str:
+    """请求匹配到的路由模板（如 /api/admin/videos/{tool_id}），未匹配时为 unmatched"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    请求延迟统计中间件（纯 ASGI）
+
+    按路由模板统计所有 HTTP 请求；请求路径属于 tool_registry 中某个工具的 API 前缀时，
+    同时计入该工具的延迟直方图
+    """
+
+    def __init__(self, app: ASGIApp, registry=None):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_request_duration.observe(
+                elapsed, route=route_template(scope), method=scope["method"], status=status
+            )
+            tool = self.registry.match_prefix(scope["path"]) if self.registry is not None else None
+            if tool is not None:
+                tool_request_duration.observe(elapsed, tool=tool["id"], status=status)
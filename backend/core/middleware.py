@@ -1,74 +1,106 @@
 """
 访问追踪中间件
+
+纯 ASGI 实现：先根据路径判断是否为工具页面访问，非工具请求（API、静态资源等）
+直接交给下游应用处理，不做任何额外包装
 """
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-import asyncio
-from datetime import datetime
-from sqlalchemy.orm import Session
-
-from admin.database import SessionLocal
-from admin.models import ToolAccess
+import time
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.access_log import access_log_writer
 from core.tool_registry import tool_registry
 
 
-class AccessTrackingMiddleware(BaseHTTPMiddleware):
+class AccessTrackingStats:
+    """中间件自身开销统计（纳秒）"""
+
+    def __init__(self):
+        self.requests = 0
+        self.tracked = 0
+        self.overhead_ns = 0
+        self.max_overhead_ns = 0
+
+    def record(self, overhead_ns: int, tracked: bool) -> None:
+        self.requests += 1
+        if tracked:
+            self.tracked += 1
+        self.overhead_ns += overhead_ns
+        if overhead_ns > self.max_overhead_ns:
+            self.max_overhead_ns = overhead_ns
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "tracked": self.tracked,
+            "skipped": self.requests - self.tracked,
+            "total_overhead_ms": self.overhead_ns / 1e6,
+            "avg_overhead_us": self.overhead_ns / self.requests / 1e3 if self.requests else 0.0,
+            "max_overhead_us": self.max_overhead_ns / 1e3,
+        }
+
+
+# 全局中间件开销统计
+access_tracking_stats = AccessTrackingStats()
+
+
+def match_tool(path: str) -> Optional[dict]:
+    """判断路径是否为工具访问，返回对应的工具信息"""
+    # 排除 API 路径和静态资源
+    if path.startswith("/api/") or path.startswith("/assets/") or path == "/":
+        return None
+
+    return tool_registry.match_path(path)
+
+
+class AccessTrackingMiddleware:
     """访问追踪中间件"""
-    
-    async def dispatch(self, request: Request, call_next):
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter_ns()
+        tool = match_tool(scope["path"])
+        overhead = time.perf_counter_ns() - started
+
+        if tool is None:
+            access_tracking_stats.record(overhead, tracked=False)
+            await self.app(scope, receive, send)
+            return
+
         # 处理请求
-        response = await call_next(request)
-        
-        # 异步记录访问日志（不阻塞响应）
-        asyncio.create_task(self._log_access(request))
-        
-        return response
-    
-    async def _log_access(self, request: Request):
+        await self.app(scope, receive, send)
+
+        # 放入访问日志队列（由后台任务批量写入，不阻塞响应）
+        started = time.perf_counter_ns()
+        self._log_access(scope, tool)
+        access_tracking_stats.record(overhead + time.perf_counter_ns() - started, tracked=True)
+
+    def _log_access(self, scope: Scope, tool: dict):
         """记录访问日志"""
         try:
-            # 获取路径
-            path = request.url.path
-            
-            # 判断是否为工具访问（排除 API 路径和静态资源）
-            if path.startswith("/api/") or path.startswith("/assets/") or path == "/":
-                return
-            
-            # 检查是否为工具路径
-            tool = None
-            for tool_info in tool_registry.get_all_tools().values():
-                if path.startswith(tool_info.get("path", "")):
-                    tool = tool_info
-                    break
-            
-            if not tool:
-                return
-            
             # 获取客户端信息
-            ip_address = request.client.host if request.client else None
-            user_agent = request.headers.get("user-agent")
-            
-            # 创建数据库会话
-            db = SessionLocal()
-            try:
-                # 记录访问
-                access_record = ToolAccess(
-                    tool_id=tool["id"],
-                    tool_name=tool["name"],
-                    ip_address=ip_address,
-                    user_agent=user_agent,
-                    path=path
-                )
-                db.add(access_record)
-                db.commit()
-            except Exception as e:
-                db.rollback()
-                # 记录错误但不影响主流程
-                print(f"记录访问日志失败: {e}")
-            finally:
-                db.close()
+            client = scope.get("client")
+            ip_address = client[0] if client else None
+            user_agent = None
+            for key, value in scope.get("headers", ()):
+                if key == b"user-agent":
+                    user_agent = value.decode("latin-1")
+                    break
+
+            access_log_writer.enqueue(
+                tool_id=tool["id"],
+                tool_name=tool["name"],
+                path=scope["path"],
+                ip_address=ip_address,
+                user_agent=user_agent
+            )
         except Exception as e:
             # 静默处理错误，不影响主流程
             print(f"访问追踪中间件错误: {e}")
-
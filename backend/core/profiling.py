@@ -0,0 +1,409 @@
+"""
+按需请求剖析
+
+管理员在请求上加 X-Profile: 1 请求头或 ?profile=1 查询参数（并携带管理后台令牌）时，
+对该请求做采样剖析，结果保存为 JSON 文件，可通过 /api/admin/profiles 查看：
+- 采样剖析：后台线程按固定间隔读取正在运行的线程的调用栈，开销低，并且能覆盖在线程池中执行的计算
+- 结果包括耗时最多的函数、调用树、墙钟时间和进程 CPU 时间
+- 同一进程同一时间只剖析一个请求；采样期间同一进程中并发执行的其他请求也可能出现在结果中
+- 未带标记的请求只做一次请求头检查，不产生剖析开销
+另可通过 PROFILE_SAMPLE_RATE 按比例随机剖析工具 API 请求（无需令牌，默认关闭）
+"""
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 剖析结果目录、保留的结果数、采样间隔（毫秒）、随机剖析比例（0~1），可通过环境变量调整
+PROFILE_DIR = Path(os.getenv(
+    "PROFILE_DIR",
+    str(Path(__file__).resolve().parent.parent / "data" / "profiles")
+))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# 输出的热点函数数量、调用树中保留的最小样本占比、最大调用栈深度
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_TREE_MIN_FRACTION = 0.005
+PROFILE_MAX_DEPTH = 128
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_PATTERN = re.compile(r"^\d{20}-[0-9a-f]{8}$")
+
+# 当前请求是否正在被剖析（线程池中执行的代码也能读取）
+profiling_active: ContextVar[bool] = ContextVar("profiling_active", default=False)
+
+# 线程空闲时调用栈顶所在的标准库文件（等待任务、等待 I/O）
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+_BACKEND_DIR = str(Path(__file__).resolve().parent.parent) + os.sep
+_LIBRARY_DIRS = sorted(
+    {path + os.sep for path in (sysconfig.get_paths()["purelib"], sysconfig.get_paths()["stdlib"])},
+    key=len,
+    reverse=True
+)
+
+
+_HAS_THREAD_CPU_CLOCK = hasattr(time, "pthread_getcpuclockid")
+
+
+def is_profiling() -> bool:
+    """当前请求是否正在被剖析（剖析时应跳过结果缓存，使计算过程出现在结果中）"""
+    return profiling_active.get()
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    if code.co_filename.endswith(_IDLE_FILES):
+        return True
+    # concurrent.futures 线程池的空闲线程停在 SimpleQueue.get（C 实现）上
+    return code.co_name == "_worker" and code.co_filename.endswith("thread.py")
+
+
+def _stack(frame) -> tuple:
+    """调用栈的代码对象，从最外层到当前函数"""
+    codes = []
+    while frame is not None and len(codes) < PROFILE_MAX_DEPTH:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    return tuple(codes)
+
+
+def _short_filename(filename: str) -> str:
+    if filename.startswith(_BACKEND_DIR):
+        return filename[len(_BACKEND_DIR):]
+    for directory in _LIBRARY_DIRS:
+        if filename.startswith(directory):
+            return filename[len(directory):]
+    return filename
+
+
+def _function_label(code) -> str:
+    return f"{code.co_name} ({_short_filename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    采样剖析器
+
+    后台线程每隔 interval 秒读取一次所有线程的调用栈（sys._current_frames），
+    只记录两次采样之间在运行的线程，按 (线程名, 调用栈) 计数；
+    等待 I/O 的时间不计入样本，可对照墙钟时间与 CPU 时间判断
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_names: Dict[int, str] = {}
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _thread_name(self, thread_id: int) -> str:
+        name = self._thread_names.get(thread_id)
+        if name is None:
+            self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            name = self._thread_names.get(thread_id, f"thread-{thread_id}")
+        return name
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        cpu_times: Dict[int, int] = {}
+        while not self._stop.wait(self.interval):
+            self.ticks += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or not self._is_running(thread_id, frame, cpu_times):
+                    continue
+                self.stacks[(self._thread_name(thread_id), _stack(frame))] += 1
+
+    @staticmethod
+    def _is_running(thread_id: int, frame, cpu_times: Dict[int, int]) -> bool:
+        """
+        线程自上次采样以来是否在运行
+
+        支持线程 CPU 时钟的平台上按线程 CPU 时间是否增加判断（阻塞在 C 代码中等待的线程也能排除），
+        否则按栈顶是否位于等待任务、等待 I/O 的标准库函数判断
+        """
+        if _HAS_THREAD_CPU_CLOCK:
+            try:
+                cpu_time = time.clock_gettime_ns(time.pthread_getcpuclockid(thread_id))
+            except (OSError, OverflowError):
+                return not _is_idle(frame)
+            previous = cpu_times.get(thread_id)
+            cpu_times[thread_id] = cpu_time
+            return previous is not None and cpu_time > previous
+        return not _is_idle(frame)
+
+
+def _top_functions(stacks: Counter, sample_ms: float, total: int) -> List[dict]:
+    """按函数汇总：自身样本（位于栈顶）和累计样本（出现在栈中，每个栈只计一次）"""
+    own: Counter = Counter()
+    cumulative: Counter = Counter()
+    for (_, codes), count in stacks.items():
+        if not codes:
+            continue
+        own[codes[-1]] += count
+        for code in set(codes):
+            cumulative[code] += count
+    ranked = sorted(cumulative, key=lambda code: (own[code], cumulative[code]), reverse=True)
+    return [
+        {
+            "function": code.co_name,
+            "file": _short_filename(code.co_filename),
+            "line": code.co_firstlineno,
+            "self_samples": own[code],
+            "total_samples": cumulative[code],
+            "self_ms": own[code] * sample_ms,
+            "total_ms": cumulative[code] * sample_ms,
+            "self_percent": own[code] / total * 100 if total else 0.0,
+            "total_percent": cumulative[code] / total * 100 if total else 0.0,
+        }
+        for code in ranked[:PROFILE_TOP_FUNCTIONS]
+    ]
+
+
+def _call_tree(stacks: Counter, sample_ms: float, total: int) -> dict:
+    """按线程分组的调用树，样本占比低于 PROFILE_TREE_MIN_FRACTION 的分支不输出"""
+    root: dict = {"children": {}, "samples": 0}
+    for (thread_name, codes), count in stacks.items():
+        root["samples"] += count
+        node = root
+        for key in (thread_name, *codes):
+            node = node["children"].setdefault(key, {"children": {}, "samples": 0})
+            node["samples"] += count
+
+    min_samples = total * PROFILE_TREE_MIN_FRACTION
+
+    def render(key, node) -> dict:
+        children = [
+            render(child_key, child)
+            for child_key, child in sorted(node["children"].items(), key=lambda item: -item[1]["samples"])
+            if child["samples"] >= min_samples
+        ]
+        return {
+            "function": key if isinstance(key, str) else _function_label(key),
+            "samples": node["samples"],
+            "ms": node["samples"] * sample_ms,
+            "children": children,
+        }
+
+    return render("all", root)
+
+
+def build_profile(profiler: SamplingProfiler, wall_seconds: float, cpu_seconds: float) -> dict:
+    """由采样结果生成剖析报告"""
+    total = sum(profiler.stacks.values())
+    # 按实际采样次数折算每个样本代表的时间（GIL 竞争时实际间隔会大于设定间隔）
+    sample_ms = wall_seconds * 1e3 / profiler.ticks if profiler.ticks else 0.0
+    return {
+        "wall_ms": wall_seconds * 1e3,
+        "cpu_ms": cpu_seconds * 1e3,
+        "samples": total,
+        "ticks": profiler.ticks,
+        "sample_interval_ms": sample_ms,
+        "top_functions": _top_functions(profiler.stacks, sample_ms, total),
+        "call_tree": _call_tree(profiler.stacks, sample_ms, total),
+    }
+
+
+class ProfileStore:
+    """剖析结果存储（每个结果一个 JSON 文件，只保留最近 keep 个）"""
+
+    SUMMARY_FIELDS = (
+        "id", "created_at", "method", "path", "query", "status", "user", "reason",
+        "wall_ms", "cpu_ms", "samples",
+    )
+
+    def __init__(self, directory: Path = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    @staticmethod
+    def new_id() -> str:
+        """按时间排序的剖析结果ID"""
+        return f"{datetime.now():%Y%m%d%H%M%S%f}-{secrets.token_hex(4)}"
+
+    def _files(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob("*.json"), reverse=True)
+
+    def save(self, profile: dict) -> None:
+        """写入临时文件后重命名，并删除超出保留数量的旧结果"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{profile['id']}.json"
+        temp_path = path.with_name(path.name + ".tmp")
+        temp_path.write_text(json.dumps(profile, ensure_ascii=False), encoding="utf-8")
+        temp_path.replace(path)
+        for old in self._files()[self.keep:]:
+            old.unlink(missing_ok=True)
+
+    def list(self, limit: int = 50) -> List[dict]:
+        """最近的剖析结果摘要，从新到旧"""
+        summaries = []
+        for path in self._files()[:limit]:
+            try:
+                profile = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            summaries.append({field: profile.get(field) for field in self.SUMMARY_FIELDS})
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        """读取剖析结果，ID 格式不正确或不存在时返回 None"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def delete(self, profile_id: str) -> bool:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return False
+        path = self.directory / f"{profile_id}.json"
+        if not path.exists():
+            return False
+        path.unlink()
+        return True
+
+
+# 全局剖析结果存储
+profile_store = ProfileStore()
+
+
+def _profile_flag(scope: Scope) -> bool:
+    """请求头 X-Profile 或查询参数 profile 为真值"""
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value.strip().lower() in (b"1", b"true", b"yes")
+    query = scope.get("query_string", b"")
+    if b"profile=" not in query:
+        return False
+    params = dict(parse_qsl(query.decode("latin-1")))
+    return params.get("profile", "").lower() in ("1", "true", "yes")
+
+
+def _bearer_token(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    请求剖析中间件（纯 ASGI）
+
+    带剖析标记且令牌属于有效管理员的请求，或按 PROFILE_SAMPLE_RATE 随机抽中的工具 API 请求
+    会被剖析；响应头 X-Profile-Id 返回剖析结果ID。标记无效（无令牌、令牌无效）时按普通请求处理
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        registry=None,
+        store: ProfileStore = profile_store,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS,
+    ):
+        self.app = app
+        self.registry = registry
+        self.store = store
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1e3
+        # 采样剖析器会读取所有线程，同一时间只剖析一个请求
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        reason, user = await self._should_profile(scope)
+        if reason is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send, reason, user)
+        finally:
+            self._busy.release()
+
+    async def _should_profile(self, scope: Scope) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (剖析原因, 用户名)，不剖析时原因为 None"""
+        if _profile_flag(scope):
+            token = _bearer_token(scope)
+            if token is not None:
+                from admin.auth import authenticate_token
+
+                user = await authenticate_token(token)
+                if user is not None:
+                    return "flag", user.username
+            return None, None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            if self.registry is None or self.registry.match_prefix(scope["path"]) is not None:
+                return "sampled", None
+        return None, None
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, reason: str, user: Optional[str]):
+        profile_id = self.store.new_id()
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode("ascii"))]
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval)
+        token = profiling_active.set(True)
+        started_wall = time.perf_counter()
+        started_cpu = time.process_time()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            wall_seconds = time.perf_counter() - started_wall
+            cpu_seconds = time.process_time() - started_cpu
+            profiling_active.reset(token)
+            profile = {
+                "id": profile_id,
+                "created_at": datetime.now().isoformat(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "user": user,
+                "reason": reason,
+                **build_profile(profiler, wall_seconds, cpu_seconds),
+            }
+            try:
+                await run_in_threadpool(self.store.save, profile)
+            except Exception as e:
+                print(f"保存剖析结果失败: {e}")
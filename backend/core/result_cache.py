@@ -0,0 +1,131 @@
+"""
+结果缓存
+
+进程内的 TTL + 容量上限（LRU）缓存，相同键的并发请求只计算一次（single-flight），
+其余请求等待并共享同一个结果。计算在线程池中执行，不阻塞事件循环。
+提供 sizeof 时同时按总字节数淘汰，超过单条上限的值不缓存。
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+
+class ResultCache:
+    """带 TTL 和容量上限的结果缓存，支持 single-flight"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 300,
+        max_bytes: Optional[int] = None,
+        max_entry_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # 字节数上限（总量和单条），只在提供 sizeof 时生效
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        self.oversized = 0
+
+    def get(self, key: str) -> Any:
+        """读取未过期的缓存值，不存在时返回 None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """写入缓存，超出条数或字节数上限时淘汰最久未使用的条目；超过单条上限的值不缓存"""
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        self._remove(key)
+        if self.max_entry_bytes is not None and size > self.max_entry_bytes:
+            self.oversized += 1
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value, size)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        获取缓存值；未命中时在线程池中调用 compute 计算并缓存
+
+        同一键正在计算时，后续请求等待该计算完成并共享结果（或异常）；
+        计算失败的结果不缓存。计算在独立的任务中进行，所有请求（包括发起计算的请求）
+        都通过 shield 等待：任何一个请求被取消都不会中断计算或影响其他请求，
+        计算完成后结果照常写入缓存
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            self.misses += 1
+            task = asyncio.get_running_loop().create_task(self._compute(key, compute))
+            # 所有等待者都已取消时，读取异常避免输出 "exception was never retrieved" 警告
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        try:
+            value = await run_in_threadpool(compute)
+            self.put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: str) -> None:
+        """删除指定键的缓存（不影响正在进行的计算）"""
+        self._remove(key)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        """缓存统计"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "evictions": self.evictions,
+            "oversized": self.oversized,
+        }
@@ -0,0 +1,347 @@
+"""
+前端静态文件服务
+
+启动时把 frontend/dist 读入内存，SPA 路由回退和静态资源请求直接返回内存中的内容，
+不再每次请求访问文件系统：
+- 每个文件带 ETag（内容哈希），If-None-Match 匹配时返回 304
+- 可压缩的文件预先生成 gzip（以及安装了 brotli 时的 br）版本，按 Accept-Encoding 返回；
+  构建目录中已有的 .gz / .br 文件直接使用
+- /assets/ 下的文件名带内容哈希（Vite 构建），返回一年的 immutable 缓存头；
+  index.html 每次向服务器验证（no-cache + ETag），部署后立即生效
+- 超过 STATIC_MEMORY_MAX_FILE_BYTES 的文件（如视频）不读入内存，从磁盘返回（支持 Range）
+- 重新加载：调用管理接口，或设置 FRONTEND_RELOAD_INTERVAL 定期检查 index.html 是否变化
+  （多 worker 部署时每个进程各自检查）
+"""
+import asyncio
+import gzip
+import hashlib
+import mimetypes
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+from .etag import etag_matches
+
+try:
+    import brotli
+except ImportError:  # 可选依赖：未安装时只提供 gzip 版本
+    brotli = None
+
+# 前端构建目录（可通过 FRONTEND_DIST 环境变量指定），在 Docker 容器中为 /app/frontend/dist
+FRONTEND_DIST = Path(os.getenv(
+    "FRONTEND_DIST",
+    str(Path(__file__).resolve().parent.parent.parent / "frontend" / "dist")
+))
+# 检查前端是否重新构建的间隔（秒，0 表示不检查，只能通过管理接口重新加载）
+FRONTEND_RELOAD_INTERVAL = float(os.getenv("FRONTEND_RELOAD_INTERVAL", "30"))
+# 读入内存的单个文件大小上限（字节）
+STATIC_MEMORY_MAX_FILE_BYTES = int(os.getenv("STATIC_MEMORY_MAX_FILE_BYTES", str(2 * 1024 * 1024)))
+
+# 带内容哈希的资源目录与缓存头
+HASHED_ASSETS_PREFIX = "assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+INDEX_CACHE_CONTROL = "no-cache"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+# 预压缩：最小文件大小，压缩后至少节省的比例
+COMPRESS_MIN_BYTES = 512
+COMPRESS_MIN_SAVING = 0.1
+COMPRESSIBLE_TYPES = (
+    "text/", "application/javascript", "application/json", "application/xml",
+    "application/manifest+json", "image/svg+xml", "application/wasm", "font/ttf", "font/otf",
+)
+# Accept-Encoding 的优先顺序
+ENCODING_PREFERENCE = ("br", "gzip")
+PRECOMPRESSED_SUFFIXES = {".br": "br", ".gz": "gzip"}
+
+
+class StaticAsset:
+    """内存中的一个静态文件及其压缩版本"""
+
+    __slots__ = ("path", "content_type", "etag", "cache_control", "bodies", "file_path")
+
+    def __init__(self, path: str, content_type: str, cache_control: str):
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = ""
+        # 编码 -> 内容（identity 为原始内容）
+        self.bodies: Dict[str, bytes] = {}
+        # 超过内存上限的文件只记录磁盘路径
+        self.file_path: Optional[Path] = None
+
+
+def _cache_control(path: str) -> str:
+    if path.startswith(HASHED_ASSETS_PREFIX):
+        return IMMUTABLE_CACHE_CONTROL
+    if path == "index.html":
+        return INDEX_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
+
+
+def _content_type(path: str) -> str:
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _compress(content: bytes, content_type: str, encoding: str) -> Optional[bytes]:
+    """生成压缩版本，不可压缩或压缩收益太小时返回 None"""
+    if len(content) < COMPRESS_MIN_BYTES or not content_type.startswith(COMPRESSIBLE_TYPES):
+        return None
+    if encoding == "gzip":
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+    elif encoding == "br" and brotli is not None:
+        compressed = brotli.compress(content, quality=11)
+    else:
+        return None
+    if len(compressed) > len(content) * (1 - COMPRESS_MIN_SAVING):
+        return None
+    return compressed
+
+
+def disk_asset(directory: Path, file_path: Path) -> StaticAsset:
+    """不读入内存、从磁盘返回原始内容的文件，ETag 取修改时间和大小"""
+    path = file_path.relative_to(directory).as_posix()
+    asset = StaticAsset(path, _content_type(path), _cache_control(path))
+    stat = file_path.stat()
+    asset.file_path = file_path
+    asset.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return asset
+
+
+def load_asset(directory: Path, file_path: Path) -> StaticAsset:
+    """读取一个文件，生成 ETag 和压缩版本（优先使用构建目录中已有的 .br / .gz 文件）"""
+    if file_path.stat().st_size > STATIC_MEMORY_MAX_FILE_BYTES:
+        return disk_asset(directory, file_path)
+    path = file_path.relative_to(directory).as_posix()
+    content_type = _content_type(path)
+    asset = StaticAsset(path, content_type, _cache_control(path))
+
+    content = file_path.read_bytes()
+    asset.bodies["identity"] = content
+    asset.etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+    for suffix, encoding in PRECOMPRESSED_SUFFIXES.items():
+        precompressed = file_path.with_name(file_path.name + suffix)
+        if precompressed.is_file():
+            asset.bodies[encoding] = precompressed.read_bytes()
+        else:
+            compressed = _compress(content, content_type, encoding)
+            if compressed is not None:
+                asset.bodies[encoding] = compressed
+    return asset
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """解析 Accept-Encoding，返回可接受（q > 0）的编码"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class FrontendBundle:
+    """一次加载的前端构建目录（只读，重新加载时整体替换）"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+        self.loaded_at = datetime.now()
+        # 先记录 index.html 的状态，加载期间再次变化时下次检查仍会重新加载
+        self.signature = index_signature(directory)
+        started = time.perf_counter()
+        for file_path in sorted(directory.rglob("*")):
+            if not file_path.is_file():
+                continue
+            # 预压缩文件（如 index.js.gz）作为原文件的编码版本加载，不单独提供
+            if file_path.suffix in PRECOMPRESSED_SUFFIXES and file_path.with_suffix("").is_file():
+                continue
+            asset = load_asset(directory, file_path)
+            self.assets[asset.path] = asset
+        self.load_seconds = time.perf_counter() - started
+        self.index = self.assets.get("index.html")
+
+    def stats(self) -> dict:
+        in_memory = [asset for asset in self.assets.values() if asset.file_path is None]
+        return {
+            "directory": str(self.directory),
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "files": len(self.assets),
+            "in_memory_files": len(in_memory),
+            "memory_bytes": sum(len(body) for asset in in_memory for body in asset.bodies.values()),
+            "gzip_files": sum("gzip" in asset.bodies for asset in in_memory),
+            "brotli_files": sum("br" in asset.bodies for asset in in_memory),
+            "index_etag": self.index.etag if self.index is not None else None,
+        }
+
+
+def index_signature(directory: Path) -> Optional[tuple]:
+    """index.html 的修改时间和大小，用于判断前端是否重新构建"""
+    try:
+        stat = (directory / "index.html").stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FrontendServer:
+    """前端静态文件服务（SPA 路由回退 + 静态资源）"""
+
+    def __init__(self, directory: Path = FRONTEND_DIST, reload_interval: float = FRONTEND_RELOAD_INTERVAL):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.bundle: Optional[FrontendBundle] = None
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self) -> Optional[dict]:
+        """
+        （重新）加载构建目录，新内容完全加载后才替换，加载期间的请求仍使用旧内容
+
+        目录不存在时清空已加载的内容并返回 None
+        """
+        if not self.directory.is_dir():
+            self.bundle = None
+            return None
+        try:
+            bundle = FrontendBundle(self.directory)
+        except OSError as e:
+            # 部署过程中文件可能被替换，保留旧内容，下次检查时重试
+            self.last_error = str(e)
+            raise
+        self.bundle = bundle
+        self.reloads += 1
+        self.last_error = None
+        return bundle.stats()
+
+    def start(self) -> None:
+        """启动定期检查（需在事件循环中调用，间隔为 0 时不启动）"""
+        if self.reload_interval <= 0 or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        """index.html 变化（重新构建、部署）时重新加载"""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            current = self.bundle.signature if self.bundle is not None else None
+            if index_signature(self.directory) == current:
+                continue
+            try:
+                stats = await run_in_threadpool(self.load)
+                if stats is not None:
+                    print(f"前端已重新加载: {stats['files']} 个文件")
+            except Exception as e:
+                print(f"重新加载前端失败: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "directory": str(self.directory),
+            "reload_interval": self.reload_interval,
+            "reloads": self.reloads,
+            "brotli_available": brotli is not None,
+            "last_error": self.last_error,
+            "bundle": self.bundle.stats() if self.bundle is not None else None,
+        }
+
+    def response(self, full_path: str, headers: Headers) -> Response:
+        """
+        返回静态文件或 SPA 回退的 index.html
+
+        - api/ 开头的路径返回 404（不应回退到前端页面）
+        - assets/ 下不存在的文件返回 404；部署过程中新文件尚未加载时从磁盘返回
+        - 构建目录中存在的其他文件直接返回，其余路径返回 index.html
+        """
+        if full_path.startswith("api/"):
+            raise HTTPException(status_code=404, detail="API endpoint not found")
+        bundle = self.bundle
+        if bundle is None:
+            raise HTTPException(
+                status_code=500,
+                detail="Frontend static files not found. Please ensure frontend/dist directory exists."
+            )
+
+        asset = bundle.assets.get(full_path)
+        if asset is None and full_path.startswith(HASHED_ASSETS_PREFIX):
+            asset = self._load_missing(full_path)
+            if asset is None:
+                raise HTTPException(status_code=404, detail="Static file not found")
+        if asset is None:
+            asset = bundle.index
+            if asset is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="index.html not found. Please build frontend first."
+                )
+        return self._asset_response(asset, headers)
+
+    def _load_missing(self, full_path: str) -> Optional[StaticAsset]:
+        """
+        内存中没有的 assets/ 文件（新部署、尚未重新加载）
+
+        由 FileResponse 从磁盘返回原始内容，不在事件循环中读取和压缩，也不加入内存；
+        重新加载后再由内存提供压缩版本
+        """
+        directory = self.directory.resolve()
+        file_path = (directory / full_path).resolve()
+        if directory not in file_path.parents or not file_path.is_file():
+            return None
+        return disk_asset(directory, file_path)
+
+    @staticmethod
+    def _asset_response(asset: StaticAsset, headers: Headers) -> Response:
+        cache_headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control}
+        if asset.file_path is not None:
+            # 大文件从磁盘返回，FileResponse 处理 Range 和 HEAD
+            if etag_matches(headers.get("if-none-match"), asset.etag):
+                return Response(status_code=304, headers=cache_headers)
+            return FileResponse(asset.file_path, media_type=asset.content_type, headers=cache_headers)
+
+        encoding = "identity"
+        if len(asset.bodies) > 1:
+            cache_headers["Vary"] = "Accept-Encoding"
+            accepted = accepted_encodings(headers.get("accept-encoding", ""))
+            for candidate in ENCODING_PREFERENCE:
+                if candidate in accepted and candidate in asset.bodies:
+                    encoding = candidate
+                    break
+        # 不同编码是不同的表示，使用不同的 ETag
+        if encoding != "identity":
+            cache_headers["ETag"] = asset.etag[:-1] + f'-{encoding}"'
+            cache_headers["Content-Encoding"] = encoding
+        if etag_matches(headers.get("if-none-match"), cache_headers["ETag"]):
+            cache_headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=cache_headers)
+        return Response(content=asset.bodies[encoding], headers=cache_headers, media_type=asset.content_type)
+
+
+# 全局前端静态文件服务实例
+frontend_server = FrontendServer()
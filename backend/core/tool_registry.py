@@ -1,17 +1,78 @@
 """
 工具注册机制
 用于管理和注册各个工具模块
+
+工具通过 tools/<工具>/manifest.json 声明元数据和路由模块，启动时只读取清单、
+注册元数据，工具的路由模块及其依赖在该工具首次被请求时才导入
 """
-from typing import Dict, List, Optional
+import importlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from fastapi import APIRouter
 
 
+# 前缀树中标记“此处为某个工具路径的终点”的键
+_TERMINAL = None
+
+
+def resolve_object(spec: str) -> Any:
+    """按 "模块:属性" 导入对象，例如 tools.bidding_scoring.router:router"""
+    module_name, _, attribute = spec.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
+
+
+def _build_path_index(entries: Iterable[Tuple[str, Dict]]) -> Dict:
+    """
+    构建路径的字符前缀树
+
+    entries 为 (路径, 工具信息) 序列；每个节点是 {字符: 子节点} 的字典，
+    路径终点的节点在 _TERMINAL 键下保存工具信息
+    """
+    root: Dict = {}
+    for path, tool_info in entries:
+        path = (path or "").rstrip("/")
+        if not path:
+            continue
+        node = root
+        for char in path:
+            node = node.setdefault(char, {})
+        node[_TERMINAL] = tool_info
+    return root
+
+
+def _match_path_index(index: Dict, path: str) -> Optional[Dict]:
+    """在前缀树中按路径段边界做最长前缀匹配"""
+    node = index
+    matched = None
+    length = len(path)
+    position = 0
+    for char in path:
+        node = node.get(char)
+        if node is None:
+            break
+        position += 1
+        if _TERMINAL in node and (position == length or path[position] == "/"):
+            matched = node[_TERMINAL]
+    return matched
+
+
 class ToolRegistry:
     """工具注册表"""
     
     def __init__(self):
         self._tools: Dict[str, Dict] = {}
         self._routers: List[APIRouter] = []
+        self._path_index: Dict = {}
+        self._prefix_index: Dict = {}
+        self._warmups: Dict[str, Callable[[], None]] = {}
+        self._shutdowns: Dict[str, Callable[[], None]] = {}
+        self._manifests: Dict[str, Dict] = {}
+        self._loaded: Dict[str, List[APIRouter]] = {}
+        self._load_lock = threading.Lock()
     
     def register_tool(
         self,
@@ -19,6 +80,7 @@ class ToolRegistry:
         name: str,
         description: str = "",
         router: Optional[APIRouter] = None,
+        warmup: Optional[Callable[[], None]] = None,
         **kwargs
     ):
         """
@@ -29,6 +91,7 @@ class ToolRegistry:
             name: 工具名称
             description: 工具描述
             router: FastAPI 路由对象
+            warmup: 预热函数（可选），应用启动时、报告就绪前调用
             **kwargs: 其他工具元数据
         """
         tool_info = {
@@ -38,14 +101,116 @@ class ToolRegistry:
             **kwargs
         }
         self._tools[tool_id] = tool_info
+        # 重建路径索引（整体替换，查找时无需加锁）
+        self._path_index = _build_path_index(
+            (info.get("path"), info) for info in self._tools.values()
+        )
+        self._prefix_index = _build_path_index(
+            (prefix, info) for info in self._tools.values() for prefix in info.get("prefixes") or []
+        )
         
         if router:
             self._routers.append(router)
+        if warmup:
+            self._warmups[tool_id] = warmup
     
     def get_tool(self, tool_id: str) -> Optional[Dict]:
         """获取工具信息"""
         return self._tools.get(tool_id)
     
+    def match_path(self, path: str) -> Optional[Dict]:
+        """
+        按请求路径查找工具（最长前缀匹配）
+        
+        工具路径只在路径段边界上匹配：/tools/a 匹配 /tools/a 和 /tools/a/x，
+        不匹配 /tools/ab；查找耗时只与请求路径长度有关，与工具数量无关
+        """
+        return _match_path_index(self._path_index, path)
+    
+    def match_prefix(self, path: str) -> Optional[Dict]:
+        """按请求路径查找处理该请求的工具（清单 prefixes 的最长前缀匹配），用于按工具统计 API 请求"""
+        return _match_path_index(self._prefix_index, path)
+    
+    def discover(self, tools_dir: Path) -> List[str]:
+        """
+        扫描 tools_dir/*/manifest.json，注册工具元数据（不导入工具模块），返回工具ID列表
+        
+        清单字段：id、name、description、category、path（前端页面路径）、
+        prefixes（由该工具处理的请求路径前缀）、routers（"模块:属性" 列表），
+        以及可选的 warmup、shutdown（"模块:属性"）
+        """
+        tool_ids = []
+        for manifest_path in sorted(Path(tools_dir).glob("*/manifest.json")):
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            self.register_manifest(manifest)
+            tool_ids.append(manifest["id"])
+        return tool_ids
+    
+    def register_manifest(self, manifest: Dict):
+        """按清单注册工具元数据，路由模块延迟到 load_tool 时导入"""
+        self._manifests[manifest["id"]] = manifest
+        self.register_tool(
+            tool_id=manifest["id"],
+            name=manifest["name"],
+            description=manifest.get("description", ""),
+            category=manifest.get("category"),
+            path=manifest.get("path"),
+            prefixes=manifest.get("prefixes", [])
+        )
+    
+    def get_manifests(self) -> Dict[str, Dict]:
+        """获取通过清单注册的工具"""
+        return self._manifests.copy()
+    
+    def is_loaded(self, tool_id: str) -> bool:
+        """工具的路由模块是否已导入"""
+        return tool_id in self._loaded
+    
+    def load_tool(self, tool_id: str) -> List[APIRouter]:
+        """
+        导入工具的路由模块（每个工具只导入一次），返回其路由列表
+        
+        同时解析清单中的预热和关闭函数；可在线程池中调用
+        """
+        with self._load_lock:
+            routers = self._loaded.get(tool_id)
+            if routers is not None:
+                return routers
+            manifest = self._manifests[tool_id]
+            routers = [resolve_object(spec) for spec in manifest.get("routers", [])]
+            if manifest.get("warmup"):
+                self._warmups[tool_id] = resolve_object(manifest["warmup"])
+            if manifest.get("shutdown"):
+                self._shutdowns[tool_id] = resolve_object(manifest["shutdown"])
+            self._loaded[tool_id] = routers
+            return routers
+    
+    def warm_up(self, tool_ids: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        依次调用各工具（或指定工具）的预热函数，返回各工具的预热耗时（秒）
+        
+        预热失败只输出错误，不影响其他工具和应用启动
+        """
+        timings = {}
+        for tool_id, warmup in list(self._warmups.items()):
+            if tool_ids is not None and tool_id not in tool_ids:
+                continue
+            started = time.perf_counter()
+            try:
+                warmup()
+            except Exception as e:
+                print(f"工具 {tool_id} 预热失败: {e}")
+            timings[tool_id] = time.perf_counter() - started
+        return timings
+    
+    def shutdown(self):
+        """调用已加载工具的关闭函数（释放进程池等资源）"""
+        for tool_id, shutdown in list(self._shutdowns.items()):
+            try:
+                shutdown()
+            except Exception as e:
+                print(f"工具 {tool_id} 关闭失败: {e}")
+    
     def get_all_tools(self) -> Dict[str, Dict]:
         """获取所有工具"""
         return self._tools.copy()
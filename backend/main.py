@@ -1,22 +1,92 @@
-from fastapi import FastAPI, HTTPException
+import os
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 # 导入工具注册机制
 from core.tool_registry import tool_registry
+from core.lazy_tools import mount_lazy_tools, preload_tools
 from core.middleware import AccessTrackingMiddleware
-
-# 导入工具模块（会自动注册）
-from tools.bidding_scoring import router as bidding_scoring_router
-from tools.bidding_scoring.logic import CalculationRequest, CalculationResult, calculate_scores
+from core.access_log import access_log_writer
+from core.metrics import metrics, MetricsMiddleware
+from core.profiling import ProfilingMiddleware
+from core.static_files import frontend_server
 
 # 导入管理后台路由
 from admin.router import router as admin_router
-from admin.database import init_db
+from admin.database import engine, async_engine, DB_AUTO_MIGRATE
+from admin.migrations import ensure_schema
+from admin.retention import retention_job
+
+# 扫描工具清单，只注册元数据，工具模块在首次请求时导入
+tool_registry.discover(Path(__file__).parent / "tools")
+
+# 启动时预先加载并预热的工具：逗号分隔的工具ID，"*" 表示全部，空字符串表示全部延迟加载；
+# 默认 "warmup"，即清单中声明了预热函数的工具（首个请求不承担模块导入和初始化的耗时），其余工具延迟加载
+TOOLS_PRELOAD = os.getenv("TOOLS_PRELOAD", "warmup")
+
+
+def preload_tool_ids() -> list:
+    """解析 TOOLS_PRELOAD"""
+    value = TOOLS_PRELOAD.strip()
+    manifests = tool_registry.get_manifests()
+    if value == "*":
+        return list(manifests)
+    if value == "warmup":
+        return [tool_id for tool_id, manifest in manifests.items() if manifest.get("warmup")]
+    return [tool_id.strip() for tool_id in value.split(",") if tool_id.strip()]
+
+
+async def warm_up(app: FastAPI) -> dict:
+    """预热：打开数据库连接池，加载并预热 TOOLS_PRELOAD 中的工具"""
+    def open_sync_pool():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    
+    await run_in_threadpool(open_sync_pool)
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    tool_ids = preload_tool_ids()
+    await preload_tools(app, tool_ids)
+    return await run_in_threadpool(tool_registry.warm_up, tool_ids)
 
-app = FastAPI(title="王得伏工具平台", version="2.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期
+    
+    启动：检查数据库版本（需要时执行迁移）、预热、把前端构建目录读入内存，完成后才报告就绪；
+    关闭：停止后台任务，写完剩余访问日志
+    """
+    app.state.ready = False
+    started = time.perf_counter()
+    applied = await run_in_threadpool(ensure_schema, engine, DB_AUTO_MIGRATE)
+    if applied:
+        print(f"已执行数据库迁移: {', '.join(str(v) for v in applied)}")
+    app.state.warmup = await warm_up(app)
+    if await run_in_threadpool(frontend_server.load) is None:
+        print(f"前端构建目录不存在: {frontend_server.directory}")
+    frontend_server.start()
+    access_log_writer.start()
+    retention_job.start()
+    app.state.startup_seconds = time.perf_counter() - started
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    await frontend_server.stop()
+    await retention_job.stop()
+    await access_log_writer.stop()
+    await async_engine.dispose()
+    tool_registry.shutdown()
+
+
+app = FastAPI(title="王得伏工具平台", version="2.0.0", lifespan=lifespan)
 
 # 配置CORS，允许前端跨域请求
 app.add_middleware(
@@ -25,101 +95,63 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Profile-Id"],
 )
 
 # 添加访问追踪中间件
 app.add_middleware(AccessTrackingMiddleware)
 
-# 初始化数据库（创建表）
-try:
-    init_db()
-except Exception as e:
-    print(f"数据库初始化失败（可能数据库未就绪）: {e}")
+# 按需请求剖析（管理员带 X-Profile 标记的请求）
+app.add_middleware(ProfilingMiddleware, registry=tool_registry)
+
+# 请求延迟指标（最外层，包含其他中间件的耗时）
+app.add_middleware(MetricsMiddleware, registry=tool_registry)
 
 # 注册管理后台路由
 app.include_router(admin_router)
 
-# 注册所有工具路由
+# 注册所有工具路由：直接注册的路由立即挂载，清单中的工具挂载占位路由、首次请求时加载
 for router in tool_registry.get_routers():
     app.include_router(router)
-
-# 保持向后兼容：保留旧的 API 端点
-@app.post("/api/calculate", response_model=CalculationResult)
-async def calculate_legacy_v1(request: CalculationRequest):
-    """
-    计算评分（旧端点，保持兼容）
-    """
-    try:
-        result = calculate_scores(request)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"计算失败: {str(e)}")
-
-
-@app.post("/calculate", response_model=CalculationResult)
-async def calculate_legacy_v2(request: CalculationRequest):
+mount_lazy_tools(app, tool_registry)
+
+@app.get("/api/health/live")
+async def health_live():
+    """存活检查：进程可以响应请求"""
+    return {"status": "ok"}
+
+
+@app.get("/api/health/ready")
+async def health_ready():
+    """就绪检查：数据库版本已检查、预热已完成时返回 200，否则返回 503"""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {
+        "status": "ready",
+        "startup_seconds": app.state.startup_seconds,
+        "warmup": app.state.warmup
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 文本格式的进程内指标（多 worker 部署时为当前进程的指标）"""
+    return Response(
+        content=metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+# 前端静态文件：启动时把 frontend/dist 读入内存（预压缩、ETag、缓存头），
+# 非 API 路径返回对应的静态文件，其余返回 index.html（SPA 路由回退，支持前端路由刷新）
+# 这个路由必须放在最后，确保 API 路由优先匹配
+@app.api_route("/{full_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_spa(full_path: str, request: Request):
     """
-    计算评分（旧端点，保持兼容）
+    SPA 路由回退处理
+    当访问非 API 路径时，返回静态文件或 index.html，让前端路由处理
     """
-    try:
-        result = calculate_scores(request)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"计算失败: {str(e)}")
-
-
-# 静态文件目录路径（相对于 backend/main.py 的位置）
-# 在 Docker 容器中，路径为 /app/frontend/dist
-static_dir = Path(__file__).parent.parent / "frontend" / "dist"
-
-# 挂载静态文件（必须在所有 API 路由之后）
-# 注意：静态文件挂载必须在 SPA 回退路由之前
-if static_dir.exists():
-    # 挂载静态资源目录（CSS、JS、图片等）
-    # 只挂载 assets 目录，避免与 SPA 路由冲突
-    assets_dir = static_dir / "assets"
-    if assets_dir.exists():
-        app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
-    
-    # SPA 路由回退：所有非 API 路径都返回 index.html
-    # 这个路由必须放在最后，确保 API 路由优先匹配
-    @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        """
-        SPA 路由回退处理
-        当访问非 API 路径时，返回 index.html，让前端路由处理
-        这样可以支持前端路由（如 React Router）的客户端路由
-        """
-        # 如果路径以 /api 开头，不应该到这里（应该被 API 路由匹配）
-        # 但为了安全，还是检查一下
-        if full_path.startswith("api/"):
-            raise HTTPException(status_code=404, detail="API endpoint not found")
-        
-        # 如果是静态资源文件，尝试直接返回
-        # 注意：assets 已经通过 mount 处理，这里作为备用
-        if full_path.startswith("assets/"):
-            file_path = static_dir / full_path
-            if file_path.exists() and file_path.is_file():
-                return FileResponse(str(file_path))
-            raise HTTPException(status_code=404, detail="Static file not found")
-        
-        # 其他所有路径都返回 index.html（SPA 路由回退）
-        # 这样前端路由可以正确处理页面刷新
-        index_path = static_dir / "index.html"
-        if index_path.exists():
-            return FileResponse(str(index_path))
-        else:
-            raise HTTPException(status_code=404, detail="index.html not found. Please build frontend first.")
-else:
-    # 如果静态文件目录不存在，提供一个友好的错误提示
-    @app.get("/{full_path:path}")
-    async def serve_spa_error(full_path: str):
-        if full_path.startswith("api/"):
-            raise HTTPException(status_code=404, detail="API endpoint not found")
-        raise HTTPException(
-            status_code=500, 
-            detail="Frontend static files not found. Please ensure frontend/dist directory exists."
-        )
+    return frontend_server.response(full_path, request.headers)
 
 
 if __name__ == "__main__":
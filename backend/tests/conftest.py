@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# 测试按 backend 目录为根导入（与 main.py 相同）
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# 数据库相关测试使用临时 SQLite 数据库（须在导入 admin 模块之前设置，不使用外部 DATABASE_URL）
+_workdir = tempfile.mkdtemp(prefix="tests-")
+os.environ.pop("DATABASE_URL", None)
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(_workdir, "tests.db")
+os.environ["ACCESS_ARCHIVE_DIR"] = os.path.join(_workdir, "archive")
+os.environ["PROFILE_DIR"] = os.path.join(_workdir, "profiles")
+
+
+@pytest.fixture
+def db():
+    """执行迁移后的数据库会话，测试结束后清空访问记录和统计表"""
+    from admin.database import SessionLocal, init_db
+    from admin.models import ToolAccess, ToolAccessDaily, ToolAccessHourly, ToolStatistic
+
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for model in (ToolAccess, ToolStatistic, ToolAccessHourly, ToolAccessDaily):
+            session.query(model).delete()
+        session.commit()
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    """挂载管理后台路由的测试客户端（已用默认管理员账号登录）"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from admin.router import router
+
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        response = client.post("/api/admin/login", json={"username": "admin", "password": "admin123"})
+        assert response.status_code == 200
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        yield client
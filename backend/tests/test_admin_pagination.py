@@ -0,0 +1,71 @@
+"""
+访问记录游标分页测试
+
+按 (access_time, id) 降序逐页读取，访问时间大量重复时也不能漏读或重复读取
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from admin.models import ToolAccess
+from admin.pagination import decode_cursor, encode_cursor
+
+ACCESS_PATH = "/api/admin/stats/access"
+
+
+def insert_records(db, count: int) -> None:
+    """每 4 条记录共用一个访问时间，两个工具交替"""
+    start = datetime(2026, 3, 1, 12, 0, 0)
+    db.add_all([
+        ToolAccess(
+            tool_id=f"tool_{index % 2}",
+            tool_name=f"工具{index % 2}",
+            access_time=start + timedelta(seconds=index // 4),
+            path=f"/tools/{index}",
+        )
+        for index in range(count)
+    ])
+    db.commit()
+
+
+def read_all_pages(client, limit: int, **params) -> list:
+    pages = []
+    cursor = None
+    while True:
+        query = {"limit": limit, **params}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get(ACCESS_PATH, params=query)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 5, 7, 50])
+@pytest.mark.parametrize("tool_id", [None, "tool_1"])
+def test_cursor_pages_cover_every_record_once(db, client, limit, tool_id):
+    insert_records(db, 30)
+    expected = db.query(ToolAccess).order_by(ToolAccess.access_time.desc(), ToolAccess.id.desc())
+    if tool_id:
+        expected = expected.filter(ToolAccess.tool_id == tool_id)
+    expected_ids = [record.id for record in expected]
+
+    pages = read_all_pages(client, limit, **({"tool_id": tool_id} if tool_id else {}))
+
+    ids = [record["id"] for page in pages for record in page]
+    assert ids == expected_ids
+    assert all(len(page) == limit for page in pages[:-1])
+    assert len(pages[-1]) <= limit
+
+
+def test_malformed_cursor_returns_400(db, client):
+    for cursor in ("not-a-cursor", encode_cursor(datetime(2026, 3, 1), 1)[:-3], "e30"):
+        response = client.get(ACCESS_PATH, params={"cursor": cursor})
+        assert response.status_code == 400
+
+
+def test_cursor_round_trip():
+    access_time = datetime(2026, 3, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(access_time, 42)) == (access_time, 42)
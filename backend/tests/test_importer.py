@@ -0,0 +1,28 @@
+"""
+表格导入编码识别测试
+"""
+import io
+
+import pytest
+
+from tools.bidding_scoring.importer import ENCODING_SAMPLE_BYTES, collect_table
+
+
+def test_gb18030_after_encoding_sample_falls_back():
+    """编码样本内全是 ASCII、之后才出现 GB18030 字符时，按 GB18030 重新解析"""
+    ascii_rows = []
+    while sum(len(row) + 2 for row in ascii_rows) < ENCODING_SAMPLE_BYTES:
+        ascii_rows.append(f"bidder-{len(ascii_rows)},{100 + len(ascii_rows) % 7}")
+    content = "\r\n".join(ascii_rows + ["华东建设,98.5", "华南工程,101"]).encode("gb18030")
+
+    columns = collect_table(io.BytesIO(content), "bidders.csv")
+
+    assert columns.names[-2:] == ["华东建设", "华南工程"]
+    assert len(columns.names) == len(ascii_rows) + 2
+    assert not columns.errors
+
+
+def test_explicit_encoding_mismatch_is_reported():
+    content = "单位名称,报价\r\n华东建设,98.5".encode("gb18030")
+    with pytest.raises(ValueError):
+        collect_table(io.BytesIO(content), "bidders.csv", "utf-8")
@@ -0,0 +1,81 @@
+"""
+K值抽签评估与 calculate_scores 的一致性测试
+"""
+import random
+
+import pytest
+
+from tools.bidding_scoring.logic import (
+    Bidder,
+    CalculationRequest,
+    IntervalRule,
+    OutlierRule,
+    ScoringConfig,
+    VECTORIZE_THRESHOLD,
+    calculate_scores,
+)
+from tools.bidding_scoring.lottery import LotteryRequest, evaluate_lottery
+from tools.bidding_scoring.ranking import RANK_METHODS, TIE_BREAKERS
+
+
+def make_config() -> ScoringConfig:
+    return ScoringConfig(
+        k_factor=0.97,
+        base_score=90,
+        outlier_rules=[OutlierRule(min_count=5, remove_high=1, remove_low=1)],
+        high_price_rules=[
+            IntervalRule(min_dev=0, max_dev=3, type="deduct", factor=1),
+            IntervalRule(min_dev=3, max_dev=100, type="deduct", factor=2),
+        ],
+        low_price_rules=[
+            IntervalRule(min_dev=0, max_dev=4, type="add", factor=0.5),
+            IntervalRule(min_dev=4, max_dev=100, type="deduct", factor=0.8),
+        ],
+        min_score=60,
+        max_score=100,
+    )
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("rank_method", RANK_METHODS)
+@pytest.mark.parametrize("tie_breaker", TIE_BREAKERS)
+def test_candidates_match_calculate_scores(seed, rank_method, tie_breaker):
+    """每个候选配置的结果应与单独调用 calculate_scores 完全一致"""
+    rng = random.Random(seed)
+    count = rng.choice([2, 7, VECTORIZE_THRESHOLD - 1, VECTORIZE_THRESHOLD + 1])
+    # 报价取自较小的集合，保证出现并列
+    choices = [round(rng.uniform(90, 110), 2) for _ in range(max(2, count // 3))]
+    bidders = [Bidder(name=f"b{i}", price=rng.choice(choices)) for i in range(count)]
+    # 去极值规则不同的直接候选配置单独成组
+    direct = make_config().model_copy(update={
+        "k_factor": 1.0,
+        "outlier_rules": [OutlierRule(min_count=3, remove_high=2, remove_low=0)],
+    })
+    request = LotteryRequest(
+        bidders=bidders,
+        config=make_config(),
+        k_factors=[0.95, 0.97, 1.0],
+        base_scores=[85, 90],
+        configs=[direct],
+        rank_method=rank_method,
+        tie_breaker=tie_breaker,
+    )
+
+    result = evaluate_lottery(request)
+
+    assert len(result.candidates) == 7
+    configs = [direct] + [
+        make_config().model_copy(update={"k_factor": k_factor, "base_score": base_score})
+        for k_factor in request.k_factors
+        for base_score in request.base_scores
+    ]
+    for candidate, config in zip(result.candidates, configs):
+        expected = calculate_scores(CalculationRequest(
+            config=config,
+            bidders=bidders,
+            rank_method=rank_method,
+            tie_breaker=tie_breaker,
+        ))
+        assert (candidate.k_factor, candidate.base_score) == (config.k_factor, config.base_score)
+        assert candidate.benchmark_price == expected.benchmark_price
+        assert [item.model_dump() for item in candidate.results] == [item.model_dump() for item in expected.results]
@@ -0,0 +1,71 @@
+"""
+结果缓存测试：字节数上限和 single-flight 的取消处理
+"""
+import asyncio
+import threading
+
+import pytest
+
+from core.result_cache import ResultCache
+
+
+def make_cache(**kwargs) -> ResultCache:
+    return ResultCache(max_entries=100, ttl_seconds=60, sizeof=len, **kwargs)
+
+
+def test_evicts_by_total_bytes():
+    cache = make_cache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    cache.put("c", b"1234")
+    assert cache.get("a") is None
+    assert cache.get("b") == b"1234" and cache.get("c") == b"1234"
+    assert cache.stats()["bytes"] == 8
+
+
+def test_skips_entries_above_entry_limit():
+    cache = make_cache(max_entry_bytes=4)
+    cache.put("a", b"12345")
+    assert cache.get("a") is None
+    assert cache.stats()["oversized"] == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_replacing_entry_updates_size():
+    cache = make_cache()
+    cache.put("a", b"1234")
+    cache.put("a", b"12")
+    cache.invalidate("b")
+    assert cache.stats()["bytes"] == 2
+    cache.invalidate("a")
+    assert cache.stats()["bytes"] == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    """发起计算的请求被取消时，等待同一结果的请求仍然得到结果，结果照常写入缓存"""
+    async def scenario():
+        cache = make_cache()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return b"result"
+
+        leader = asyncio.create_task(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0.05)
+
+        leader.cancel()
+        await asyncio.sleep(0.05)
+        release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == b"result"
+        assert cache.get("key") == b"result"
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+"""
+访问记录归档测试：归档分页读取和多进程互斥
+"""
+import csv
+import gzip
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from admin import retention
+from admin.retention import ARCHIVE_COLUMNS, RetentionJob, read_archive
+
+fcntl = pytest.importorskip("fcntl")
+
+
+def write_archive(path, records) -> None:
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(ARCHIVE_COLUMNS)
+        for record in records:
+            writer.writerow([record["id"], record["tool_id"], "工具", record["access_time"].isoformat(), "", "", ""])
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(retention, "ACCESS_ARCHIVE_DIR", tmp_path)
+    return tmp_path
+
+
+def test_read_archive_pages_match_full_sort(archive_dir):
+    """多个归档文件（含重复归档的迟到记录）、访问时间重复时，分页结果与全量排序后切片一致"""
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1)
+    records = [
+        {"id": index, "tool_id": rng.choice(["a", "b"]), "access_time": start + timedelta(minutes=rng.randint(0, 50))}
+        for index in range(1, 301)
+    ]
+    rng.shuffle(records)
+    write_archive(archive_dir / "tool_access_2025-01.csv.gz", records[:200])
+    write_archive(archive_dir / "tool_access_2025-01.1.csv.gz", records[200:])
+
+    for tool_id in (None, "a"):
+        expected = sorted(
+            (record for record in records if tool_id is None or record["tool_id"] == tool_id),
+            key=lambda record: (record["access_time"], record["id"]),
+            reverse=True,
+        )
+        for offset, limit in ((0, 10), (7, 25), (190, 100), (400, 10)):
+            page = read_archive("2025-01", tool_id, limit=limit, offset=offset)
+            assert [(item["access_time"], item["id"]) for item in page] == [
+                (item["access_time"], item["id"]) for item in expected[offset:offset + limit]
+            ]
+    assert read_archive("2025-02") == []
+
+
+def test_run_once_skips_while_another_process_holds_lock(db, archive_dir):
+    """SQLite 多 worker 时，其他进程持有归档目录中的文件锁则跳过本次执行"""
+    job = RetentionJob(retention_months=1, interval_hours=0)
+    with open(archive_dir / retention.RETENTION_LOCK_FILE, "a") as holder:
+        fcntl.flock(holder, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        db.add(retention.ToolAccess(tool_id="a", tool_name="工具", access_time=datetime(2020, 1, 5)))
+        db.commit()
+        assert job.run_once() == []
+        fcntl.flock(holder, fcntl.LOCK_UN)
+
+    result = job.run_once()
+    assert [item["month"] for item in result] == ["2020-01"]
+    assert retention.list_archives()[0]["month"] == "2020-01"
@@ -0,0 +1,132 @@
+"""
+评分引擎一致性测试
+
+向量化引擎（calculate_scores_vectorized）必须与逐行实现逐字段一致，
+覆盖 VECTORIZE_THRESHOLD 附近的投标单位数量、区间规则边界和重复报价
+"""
+import random
+
+import numpy as np
+import pytest
+
+from tools.bidding_scoring import logic
+from tools.bidding_scoring.engine import calculate_scores_vectorized, round_scores, sequential_row_sum
+from tools.bidding_scoring.logic import (
+    Bidder,
+    CalculationRequest,
+    IntervalRule,
+    OutlierRule,
+    ScoringConfig,
+    VECTORIZE_THRESHOLD,
+)
+from tools.bidding_scoring.ranking import RANK_METHODS, TIE_BREAKERS
+
+BIDDER_COUNTS = (VECTORIZE_THRESHOLD - 1, VECTORIZE_THRESHOLD, VECTORIZE_THRESHOLD + 1)
+
+
+def make_config() -> ScoringConfig:
+    """规则边界落在整数偏离度上，去极值规则在阈值附近切换"""
+    return ScoringConfig(
+        k_factor=1.0,
+        base_score=90,
+        outlier_rules=[
+            OutlierRule(min_count=0, max_count=VECTORIZE_THRESHOLD - 1, remove_high=1, remove_low=1),
+            OutlierRule(min_count=VECTORIZE_THRESHOLD - 1, max_count=VECTORIZE_THRESHOLD, remove_high=2, remove_low=1),
+            OutlierRule(min_count=VECTORIZE_THRESHOLD, remove_high=3, remove_low=2),
+        ],
+        high_price_rules=[
+            IntervalRule(min_dev=0, max_dev=5, type="deduct", factor=1),
+            IntervalRule(min_dev=5, max_dev=10, type="deduct", factor=2),
+            IntervalRule(min_dev=10, max_dev=1000, type="deduct", factor=3),
+        ],
+        low_price_rules=[
+            IntervalRule(min_dev=0, max_dev=2, type="add", factor=0.5),
+            IntervalRule(min_dev=2, max_dev=8, type="deduct", factor=0.25),
+            IntervalRule(min_dev=8, max_dev=100, type="deduct", factor=1),
+        ],
+        min_score=60,
+        max_score=100,
+    )
+
+
+def scalar_scores(monkeypatch, request: CalculationRequest):
+    """强制走逐行实现"""
+    monkeypatch.setattr(logic, "VECTORIZE_THRESHOLD", 10 ** 9)
+    result = logic._calculate_scores(request)
+    monkeypatch.undo()
+    return result
+
+
+def assert_same(monkeypatch, request: CalculationRequest) -> None:
+    expected = scalar_scores(monkeypatch, request)
+    actual = calculate_scores_vectorized(request)
+    assert actual.model_dump() == expected.model_dump()
+
+
+def boundary_prices(count: int) -> list:
+    """报价对称分布在 100 两侧，基准价为 100，偏离度恰好落在规则边界上"""
+    offsets = [0, 2, 5, 8, 10, 12]
+    prices = []
+    while len(prices) < count:
+        offset = offsets[len(prices) // 2 % len(offsets)]
+        prices.append(100 + offset if len(prices) % 2 == 0 else 100 - offset)
+    return [float(price) for price in prices]
+
+
+@pytest.mark.parametrize("count", BIDDER_COUNTS)
+@pytest.mark.parametrize("rank_method", RANK_METHODS)
+@pytest.mark.parametrize("tie_breaker", TIE_BREAKERS)
+def test_vectorized_matches_scalar_on_rule_boundaries(monkeypatch, count, rank_method, tie_breaker):
+    request = CalculationRequest(
+        config=make_config(),
+        bidders=[Bidder(name=f"b{i}", price=price) for i, price in enumerate(boundary_prices(count))],
+        rank_method=rank_method,
+        tie_breaker=tie_breaker,
+    )
+    assert_same(monkeypatch, request)
+
+
+@pytest.mark.parametrize("count", BIDDER_COUNTS)
+@pytest.mark.parametrize("rank_method", RANK_METHODS)
+@pytest.mark.parametrize("tie_breaker", TIE_BREAKERS)
+def test_vectorized_matches_scalar_with_duplicate_prices(monkeypatch, count, rank_method, tie_breaker):
+    rng = random.Random(count)
+    choices = [95.5, 98.25, 100.0, 101.125, 104.0, 111.0]
+    request = CalculationRequest(
+        config=make_config(),
+        bidders=[Bidder(name=f"b{i % 7}", price=rng.choice(choices)) for i in range(count)],
+        rank_method=rank_method,
+        tie_breaker=tie_breaker,
+    )
+    assert_same(monkeypatch, request)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_vectorized_matches_scalar_on_random_prices(monkeypatch, seed):
+    rng = random.Random(seed)
+    count = rng.choice(BIDDER_COUNTS)
+    config = make_config().model_copy(update={"k_factor": rng.choice([0.95, 1.0, 1.03])})
+    request = CalculationRequest(
+        config=config,
+        bidders=[
+            Bidder(name=f"b{i}", price=round(rng.uniform(80, 120), rng.choice([0, 2, 4])))
+            for i in range(count)
+        ],
+    )
+    assert_same(monkeypatch, request)
+
+
+def test_round_scores_matches_python_round():
+    """矩阵计算（模拟、求解）使用的四舍五入须与逐行实现的 Python round 一致，包括 .5 边界"""
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.uniform(-100, 100, 10000),
+        np.arange(-20000, 20000) / 1000 + 0.005,
+        np.arange(0, 20000) * 0.005,
+    ])
+    assert round_scores(values).tolist() == [round(value, 2) for value in values.tolist()]
+
+
+def test_sequential_row_sum_matches_python_sum():
+    matrix = np.random.default_rng(0).uniform(0, 1e6, (200, 37))
+    assert sequential_row_sum(matrix).tolist() == [sum(row) for row in matrix.tolist()]
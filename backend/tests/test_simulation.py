@@ -0,0 +1,61 @@
+"""
+蒙特卡洛模拟与 calculate_scores 的一致性测试
+"""
+import random
+
+import numpy as np
+import pytest
+
+from tools.bidding_scoring.logic import Bidder, CalculationRequest, IntervalRule, ScoringConfig, calculate_scores
+from tools.bidding_scoring.simulation import (
+    PriceDistribution,
+    SimulationRequest,
+    sample_prices,
+    simulate,
+    validate_distribution,
+)
+
+
+def make_config() -> ScoringConfig:
+    return ScoringConfig(
+        k_factor=0.97,
+        base_score=100,
+        outlier_rules=[],
+        high_price_rules=[IntervalRule(min_dev=0, max_dev=100, type="deduct", factor=0.83)],
+        low_price_rules=[IntervalRule(min_dev=0, max_dev=100, type="deduct", factor=0.41)],
+    )
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_fixed_prices_match_calculate_scores(seed):
+    """竞争对手报价固定时，模拟得分和排名应与 calculate_scores 完全一致"""
+    rng = random.Random(seed)
+    prices = [round(rng.uniform(90, 110), 3) for _ in range(rng.randint(2, 12))]
+    own_price, competitors = prices[0], prices[1:]
+
+    expected = calculate_scores(CalculationRequest(
+        config=make_config(),
+        bidders=[Bidder(name=str(i), price=price) for i, price in enumerate(prices)],
+        rank_method="competition",
+    )).results[0]
+    result = simulate(SimulationRequest(
+        config=make_config(),
+        own_price=own_price,
+        competitors=[PriceDistribution(type="fixed", price=price) for price in competitors],
+        trials=3,
+    ))
+
+    assert result.min_score == result.max_score == expected.score
+    assert result.rank_histogram == {expected.rank: 3}
+
+
+def test_normal_distribution_never_samples_negative_prices():
+    distribution = PriceDistribution(type="normal", mean=1, std=10)
+    validate_distribution(distribution)
+    prices = sample_prices(distribution, 10000, np.random.default_rng(0))
+    assert prices.min() >= 0
+
+
+def test_normal_distribution_rejects_negative_upper_bound():
+    with pytest.raises(ValueError):
+        validate_distribution(PriceDistribution(type="normal", mean=1, std=1, high=-1))
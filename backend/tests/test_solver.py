@@ -0,0 +1,94 @@
+"""
+最优报价求解与逐价格网格搜索的一致性测试
+
+求解器只在解析断点附近计算得分，结果须与按 0.01 报价单位逐一调用
+calculate_scores 的暴力搜索一致
+"""
+import random
+
+import pytest
+
+from tools.bidding_scoring.logic import (
+    Bidder,
+    CalculationRequest,
+    IntervalRule,
+    OutlierRule,
+    ScoringConfig,
+    calculate_scores,
+)
+from tools.bidding_scoring.solver import SOLVER_OBJECTIVES, SolverRequest, solve_optimal_price
+
+
+def make_config(k_factor: float) -> ScoringConfig:
+    return ScoringConfig(
+        k_factor=k_factor,
+        base_score=90,
+        outlier_rules=[OutlierRule(min_count=5, remove_high=1, remove_low=1)],
+        high_price_rules=[
+            IntervalRule(min_dev=0, max_dev=3, type="deduct", factor=1),
+            IntervalRule(min_dev=3, max_dev=100, type="deduct", factor=2),
+        ],
+        low_price_rules=[
+            IntervalRule(min_dev=0, max_dev=4, type="add", factor=0.5),
+            IntervalRule(min_dev=4, max_dev=100, type="deduct", factor=0.8),
+        ],
+        min_score=60,
+        max_score=100,
+    )
+
+
+def grid_search(config: ScoringConfig, competitors: list, price_min: float, price_max: float):
+    """按 0.01 报价单位逐一计算我方得分和竞争排名"""
+    results = []
+    for cents in range(round(price_min * 100), round(price_max * 100) + 1):
+        price = cents / 100
+        own = calculate_scores(CalculationRequest(
+            config=config,
+            bidders=[Bidder(name="own", price=price)] + [
+                Bidder(name=str(index), price=competitor) for index, competitor in enumerate(competitors)
+            ],
+            rank_method="competition",
+        )).results[0]
+        results.append((price, own.score, own.rank))
+    return results
+
+
+@pytest.mark.parametrize("objective", SOLVER_OBJECTIVES)
+@pytest.mark.parametrize("seed", range(6))
+def test_solver_matches_grid_search(objective, seed):
+    rng = random.Random(seed)
+    config = make_config(rng.choice([0.95, 0.97, 1.0]))
+    competitors = [round(rng.uniform(95, 105), 2) for _ in range(rng.randint(2, 8))]
+    price_min, price_max = 90.0, 110.0
+
+    result = solve_optimal_price(SolverRequest(
+        config=config,
+        competitor_prices=competitors,
+        objective=objective,
+        price_min=price_min,
+        price_max=price_max,
+    ))
+    grid = grid_search(config, competitors, price_min, price_max)
+
+    if objective == "max_score":
+        pool = grid
+    else:
+        pool = [item for item in grid if item[2] == 1]
+    assert result.feasible == bool(pool)
+    if not pool:
+        return
+    # 得分最高者优先，其次报价较高者
+    best_price, best_score, best_rank = max(pool, key=lambda item: (item[1], item[0]))
+    assert round(result.best_price, 2) == best_price
+    assert result.best_score == best_score
+    assert result.rank == best_rank
+
+    if objective == "max_score":
+        selected = {price for price, score, _ in grid if score == best_score}
+    else:
+        selected = {price for price, _, _ in pool}
+    covered = {
+        price for price, _, _ in grid
+        if any(interval.start - 1e-9 <= price <= interval.end + 1e-9 for interval in result.intervals)
+    }
+    assert covered == selected
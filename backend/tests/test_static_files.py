@@ -0,0 +1,47 @@
+"""
+前端静态文件服务测试：部署过程中尚未加载的 assets/ 文件
+"""
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+
+from core.static_files import FrontendServer
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<html></html>" * 100, encoding="utf-8")
+    (tmp_path / "assets" / "app.js").write_text("console.log(1);" * 100, encoding="utf-8")
+    server = FrontendServer(tmp_path, reload_interval=0)
+    server.load()
+    return server
+
+
+def test_missing_asset_served_from_disk_without_compression(server, tmp_path):
+    (tmp_path / "assets" / "new.js").write_text("console.log(2);" * 1000, encoding="utf-8")
+    headers = Headers({"accept-encoding": "gzip, br"})
+
+    response = server.response("assets/new.js", headers)
+
+    assert isinstance(response, FileResponse)
+    assert "content-encoding" not in response.headers
+    assert "assets/new.js" not in server.bundle.assets
+
+    etag = response.headers["etag"]
+    cached = server.response("assets/new.js", Headers({"if-none-match": etag}))
+    assert cached.status_code == 304
+
+
+def test_loaded_asset_still_served_compressed(server):
+    response = server.response("assets/app.js", Headers({"accept-encoding": "gzip"}))
+    assert response.headers["content-encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("path", ["assets/missing.js", "assets/../../outside.js"])
+def test_unknown_asset_returns_404(server, tmp_path, path):
+    (tmp_path.parent / "outside.js").write_text("secret", encoding="utf-8")
+    with pytest.raises(HTTPException) as error:
+        server.response(path, Headers())
+    assert error.value.status_code == 404
@@ -0,0 +1,140 @@
+"""
+工具统计增量维护测试
+
+按访问日志写入的方式分批累加统计表和小时 / 日汇总表，
+任意时间窗口的统计须与直接对 tool_access 的 COUNT(*) 一致
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from admin.models import ToolAccess, ToolAccessDaily, ToolAccessHourly, ToolStatistic
+from admin.statistics import (
+    apply_access_batch,
+    collect_tool_counts,
+    rebuild_tool_statistics,
+    truncate_day,
+    truncate_hour,
+)
+
+TOOL_IDS = ("bidding_scoring", "unit_converter", "qr_code")
+
+
+def make_access_times(now: datetime, count: int, seed: int) -> list:
+    """过去 40 天内的随机访问时间，另加恰好落在整点和零点上的访问时间"""
+    rng = random.Random(seed)
+    times = [now - timedelta(seconds=rng.randint(1, 40 * 86400)) for _ in range(count)]
+    times += [truncate_hour(now) - timedelta(hours=hours) for hours in range(0, 50, 7)]
+    times += [truncate_day(now) - timedelta(days=days) for days in range(0, 10, 3)]
+    return [value for value in times if value < now]
+
+
+def record_accesses(db, times: list, batch_size: int) -> None:
+    """与访问日志写入相同：每批插入原始记录并在同一事务中累加统计"""
+    rng = random.Random(len(times))
+    records = [
+        {
+            "tool_id": tool_id,
+            "tool_name": f"工具 {tool_id}",
+            "access_time": access_time,
+            "ip_address": "127.0.0.1",
+            "user_agent": "pytest",
+            "path": f"/tools/{tool_id}",
+        }
+        for access_time in times
+        for tool_id in [rng.choice(TOOL_IDS)]
+    ]
+    for offset in range(0, len(records), batch_size):
+        batch = records[offset:offset + batch_size]
+        db.execute(ToolAccess.__table__.insert(), batch)
+        apply_access_batch(db, batch)
+        db.commit()
+
+
+def direct_counts(db, start_time=None) -> dict:
+    query = db.query(
+        ToolAccess.tool_id,
+        func.count().label("access_count"),
+        func.max(ToolAccess.access_time).label("last_access_time"),
+    )
+    if start_time is not None:
+        query = query.filter(ToolAccess.access_time >= start_time)
+    return {row.tool_id: (row.access_count, row.last_access_time) for row in query.group_by(ToolAccess.tool_id)}
+
+
+def collected(items) -> dict:
+    return {item["tool_id"]: (item["access_count"], item["last_access_time"]) for item in items}
+
+
+def window_starts(now: datetime) -> list:
+    """跨越整点、零点的各种窗口起点，包括今天零点和恰好落在整点上的起点"""
+    today = truncate_day(now)
+    return [
+        now - timedelta(minutes=17),
+        now - timedelta(hours=2, minutes=5, seconds=3),
+        truncate_hour(now),
+        truncate_hour(now) - timedelta(hours=5),
+        today,
+        today - timedelta(minutes=1),
+        today + timedelta(minutes=30),
+        now - timedelta(days=1),
+        now - timedelta(days=1, hours=3, minutes=41),
+        today - timedelta(days=3),
+        now - timedelta(days=7),
+        now - timedelta(days=30, seconds=1),
+        now - timedelta(days=365),
+    ]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_collect_tool_counts_matches_direct_count(db, seed):
+    now = datetime.now()
+    record_accesses(db, make_access_times(now, 1500, seed), batch_size=[7, 97, 500][seed])
+
+    for start_time in window_starts(now):
+        if start_time > now:
+            continue
+        assert collected(collect_tool_counts(db, start_time)) == direct_counts(db, start_time), start_time
+
+
+def test_tool_statistic_matches_all_time_count(db):
+    record_accesses(db, make_access_times(datetime.now(), 800, 7), batch_size=64)
+    statistics = {
+        row.tool_id: (row.access_count, row.last_access_time)
+        for row in db.query(ToolStatistic)
+    }
+    assert statistics == direct_counts(db)
+
+
+def test_rebuild_matches_incremental_statistics(db):
+    now = datetime.now()
+    record_accesses(db, make_access_times(now, 800, 11), batch_size=50)
+
+    def snapshot():
+        return [
+            sorted(
+                (row.tool_id, getattr(row, "bucket_start", None), row.tool_name, row.access_count, row.last_access_time)
+                for row in db.query(model)
+            )
+            for model in (ToolStatistic, ToolAccessHourly, ToolAccessDaily)
+        ]
+
+    incremental = snapshot()
+    assert rebuild_tool_statistics(db) == len(direct_counts(db))
+    assert snapshot() == incremental
+    assert collected(collect_tool_counts(db, now - timedelta(days=7))) == direct_counts(db, now - timedelta(days=7))
+
+
+def test_tool_statistics_endpoint(db, client):
+    now = datetime.now()
+    record_accesses(db, make_access_times(now, 300, 3), batch_size=100)
+
+    for days in (0, 1, 7, 365):
+        response = client.get("/api/admin/stats/tools", params={"days": days})
+        assert response.status_code == 200
+        counts = {item["tool_id"]: item["access_count"] for item in response.json()}
+        start_time = None if days == 0 else datetime.now() - timedelta(days=days)
+        expected = {tool_id: count for tool_id, (count, _) in direct_counts(db, start_time).items()}
+        assert counts == expected, days
@@ -0,0 +1,68 @@
+"""
+评分计算结果缓存
+
+按 CalculationRequest 的规范化哈希缓存序列化后的计算结果，
+响应携带 ETag，请求头 If-None-Match 匹配时返回 304
+"""
+import hashlib
+import os
+from typing import Optional, Tuple
+
+from fastapi import Response
+from starlette.concurrency import run_in_threadpool
+
+from core.etag import etag_matches
+from core.profiling import is_profiling
+from core.result_cache import ResultCache
+from .logic import CalculationRequest, calculate_scores
+
+# 缓存容量（条）和有效期（秒），可通过环境变量调整
+RESULT_CACHE_SIZE = int(os.getenv("SCORING_RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = float(os.getenv("SCORING_RESULT_CACHE_TTL", "300"))
+# 缓存结果的总字节数上限，以及单条结果的字节数上限（更大的结果不缓存，如数十万投标单位的计算）
+RESULT_CACHE_MAX_BYTES = int(os.getenv("SCORING_RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("SCORING_RESULT_CACHE_MAX_ENTRY_BYTES", str(16 * 1024 * 1024)))
+
+calculation_cache = ResultCache(
+    max_entries=RESULT_CACHE_SIZE,
+    ttl_seconds=RESULT_CACHE_TTL,
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+    max_entry_bytes=RESULT_CACHE_MAX_ENTRY_BYTES,
+    # 缓存值为 (序列化后的响应内容, ETag)
+    sizeof=lambda value: len(value[0])
+)
+
+
+def request_fingerprint(request: CalculationRequest) -> str:
+    """计算请求的规范化哈希（字段按模型定义顺序序列化）"""
+    return hashlib.sha256(request.model_dump_json().encode("utf-8")).hexdigest()
+
+
+def _render_calculation(request: CalculationRequest) -> Tuple[bytes, str]:
+    """计算并序列化结果，ETag 取响应内容的哈希"""
+    body = calculate_scores(request).model_dump_json().encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    return body, etag
+
+
+async def cached_calculation_response(
+    request: CalculationRequest,
+    if_none_match: Optional[str] = None,
+) -> Response:
+    """
+    返回（可能来自缓存的）计算结果响应
+
+    相同请求并发到达时只计算一次；计算异常原样抛出，由调用方转换为 HTTP 错误。
+    请求正在被剖析时跳过缓存，使计算过程出现在剖析结果中
+    """
+    if is_profiling():
+        body, etag = await run_in_threadpool(_render_calculation, request)
+    else:
+        body, etag = await calculation_cache.get_or_compute(
+            request_fingerprint(request),
+            lambda: _render_calculation(request)
+        )
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,197 @@
+"""
+评分配置编译与缓存
+
+将 ScoringConfig 编译为便于快速查找的形式：
+- 区间规则拆分为互不重叠的有序区间，按偏离度二分查找
+- 去极值规则按投标单位数量预先划分区段，按数量二分查找
+编译结果按配置的规范化哈希缓存在有界 LRU 中，相同配置只编译一次
+"""
+import hashlib
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .logic import ScoringConfig, OutlierRule, IntervalRule, match_outlier_rule, trim_bounds
+
+# 编译结果缓存容量（按配置个数计）
+COMPILED_CONFIG_CACHE_SIZE = 256
+
+
+class CompiledIntervalTable:
+    """
+    编译后的区间规则表
+
+    所有规则的边界排序去重后形成若干互不重叠的区间 [edges[i], edges[i+1])，
+    每个区间预先确定按原规则顺序第一条命中的规则，
+    查找结果与逐条扫描规则列表完全一致
+    """
+
+    __slots__ = ("edges", "segment_rules", "edge_array", "segment_active", "segment_factor")
+
+    def __init__(self, rules: List[IntervalRule]):
+        edges = sorted({rule.min_dev for rule in rules} | {rule.max_dev for rule in rules})
+        segment_rules: List[Optional[IntervalRule]] = []
+        for start, end in zip(edges, edges[1:]):
+            # 规则边界都在 edges 中，因此规则要么覆盖整个区间，要么完全不覆盖
+            matched = None
+            for rule in rules:
+                if rule.min_dev <= start and end <= rule.max_dev:
+                    matched = rule
+                    break
+            segment_rules.append(matched)
+
+        self.edges: Tuple[float, ...] = tuple(edges)
+        self.segment_rules: Tuple[Optional[IntervalRule], ...] = tuple(segment_rules)
+
+        # 向量化查找用的数组：命中 add/deduct 规则的区间及其带符号系数
+        self.edge_array = np.asarray(edges, dtype=np.float64)
+        self.segment_active = np.array(
+            [rule is not None and rule.type in ("add", "deduct") for rule in segment_rules],
+            dtype=bool,
+        )
+        self.segment_factor = np.array(
+            [
+                (rule.factor if rule.type == "add" else -rule.factor)
+                if rule is not None and rule.type in ("add", "deduct") else 0.0
+                for rule in segment_rules
+            ],
+            dtype=np.float64,
+        )
+
+    def lookup(self, abs_deviation: float) -> Optional[IntervalRule]:
+        """查找偏离度命中的规则（min_dev <= 偏离度 < max_dev），未命中返回 None"""
+        index = bisect_right(self.edges, abs_deviation) - 1
+        if 0 <= index < len(self.segment_rules):
+            return self.segment_rules[index]
+        return None
+
+    def apply(
+        self,
+        scores: np.ndarray,
+        abs_deviation: np.ndarray,
+        candidates: np.ndarray,
+        base_score,
+    ) -> None:
+        """
+        对 candidates 中的报价批量应用区间规则，原地更新 scores
+
+        base_score 可以是与 scores 形状可广播的数组（如每行一个基准分）
+        """
+        segment_count = len(self.segment_rules)
+        if segment_count == 0:
+            return
+        index = np.searchsorted(self.edge_array, abs_deviation, side="right") - 1
+        in_range = candidates & (index >= 0) & (index < segment_count)
+        index = np.clip(index, 0, segment_count - 1)
+        hit = in_range & self.segment_active[index]
+        if np.ndim(base_score):
+            base_score = np.broadcast_to(base_score, scores.shape)[hit]
+        # base - d * f 与 base + d * (-f) 在浮点运算上结果一致
+        scores[hit] = base_score + (abs_deviation[hit] * self.segment_factor[index[hit]])
+
+
+class CompiledOutlierTable:
+    """
+    编译后的去极值规则表
+
+    规则匹配结果只会在 min_count + 1 和 max_count + 1 处发生变化，
+    预先计算每个区段匹配的规则，按投标单位数量二分查找
+    """
+
+    __slots__ = ("breakpoints", "segment_rules", "rules")
+
+    def __init__(self, rules: List[OutlierRule]):
+        points = {0}
+        for rule in rules:
+            points.add(rule.min_count + 1)
+            if rule.max_count is not None:
+                points.add(rule.max_count + 1)
+
+        self.rules = list(rules)
+        self.breakpoints: Tuple[int, ...] = tuple(sorted(points))
+        self.segment_rules: Tuple[Optional[OutlierRule], ...] = tuple(
+            match_outlier_rule(rules, point) for point in self.breakpoints
+        )
+
+    def lookup(self, bidder_count: int) -> Optional[OutlierRule]:
+        """查找与投标单位数量匹配的去极值规则"""
+        index = bisect_right(self.breakpoints, bidder_count) - 1
+        if index < 0:
+            return match_outlier_rule(self.rules, bidder_count)
+        return self.segment_rules[index]
+
+
+class CompiledScoringConfig:
+    """编译后的评分配置"""
+
+    __slots__ = (
+        "fingerprint",
+        "config",
+        "k_factor",
+        "base_score",
+        "min_score",
+        "max_score",
+        "outlier_table",
+        "high_price_table",
+        "low_price_table",
+    )
+
+    def __init__(self, config: ScoringConfig, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.config = config
+        self.k_factor = config.k_factor
+        self.base_score = config.base_score
+        self.min_score = config.min_score
+        self.max_score = config.max_score
+        self.outlier_table = CompiledOutlierTable(config.outlier_rules)
+        self.high_price_table = CompiledIntervalTable(config.high_price_rules)
+        self.low_price_table = CompiledIntervalTable(config.low_price_rules)
+
+    def trim_bounds(self, bidder_count: int) -> Tuple[int, int]:
+        """去极值后有效报价在升序报价中的区间 [lo, hi)"""
+        return trim_bounds(self.outlier_table.lookup(bidder_count), bidder_count)
+
+
+def config_fingerprint(config: ScoringConfig) -> str:
+    """
+    计算配置的规范化哈希
+
+    字段按模型定义顺序序列化；规则列表的顺序影响匹配结果，因此保持原顺序
+    """
+    return hashlib.sha256(config.model_dump_json().encode("utf-8")).hexdigest()
+
+
+_compiled_cache: "OrderedDict[str, CompiledScoringConfig]" = OrderedDict()
+_compiled_cache_lock = threading.Lock()
+
+
+def compile_config(config: ScoringConfig) -> CompiledScoringConfig:
+    """
+    获取编译后的评分配置（带 LRU 缓存）
+    """
+    fingerprint = config_fingerprint(config)
+
+    with _compiled_cache_lock:
+        compiled = _compiled_cache.get(fingerprint)
+        if compiled is not None:
+            _compiled_cache.move_to_end(fingerprint)
+            return compiled
+
+    compiled = CompiledScoringConfig(config, fingerprint)
+
+    with _compiled_cache_lock:
+        _compiled_cache[fingerprint] = compiled
+        _compiled_cache.move_to_end(fingerprint)
+        while len(_compiled_cache) > COMPILED_CONFIG_CACHE_SIZE:
+            _compiled_cache.popitem(last=False)
+
+    return compiled
+
+
+def clear_compiled_cache() -> None:
+    """清空编译缓存"""
+    with _compiled_cache_lock:
+        _compiled_cache.clear()
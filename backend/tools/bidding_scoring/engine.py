@@ -0,0 +1,156 @@
+"""
+报价评分向量化引擎
+
+基于 NumPy 对整批报价一次性计算偏离度、得分和排名，
+计算结果与 logic.calculate_scores 的逐行实现完全一致
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from .logic import ScoringConfig, CalculationRequest, CalculationResult, BidderResult
+from .compiled import CompiledScoringConfig, compile_config
+from .ranking import RankMethod, TieBreaker, assign_ranks, validate_rank_options
+
+
+def compute_benchmark_price(compiled: CompiledScoringConfig, prices: np.ndarray) -> float:
+    """
+    计算基准价（去极值后有效报价的均值 * K值）
+
+    求和使用 Python 内置 sum（顺序累加），保证与逐行实现的浮点结果一致
+    """
+    bidder_count = len(prices)
+    lo, hi = compiled.trim_bounds(bidder_count)
+
+    if hi > lo:
+        prices_sorted = np.sort(prices)
+        return sum(prices_sorted[lo:hi].tolist()) / (hi - lo) * compiled.k_factor
+    return sum(prices.tolist()) / bidder_count * compiled.k_factor
+
+
+def benchmark_prices_matrix(compiled: CompiledScoringConfig, price_matrix: np.ndarray) -> np.ndarray:
+    """
+    批量计算基准价：price_matrix 每行为一组报价（各行投标单位数量相同），返回每行的基准价
+
+    各行去极值区间相同，排序后按列切片即可，无需逐行处理
+    """
+    bidder_count = price_matrix.shape[1]
+    lo, hi = compiled.trim_bounds(bidder_count)
+
+    if hi > lo:
+        trimmed = np.sort(price_matrix, axis=1)[:, lo:hi]
+        return sequential_row_sum(trimmed) / (hi - lo) * compiled.k_factor
+    return sequential_row_sum(price_matrix) / bidder_count * compiled.k_factor
+
+
+def sequential_row_sum(matrix: np.ndarray) -> np.ndarray:
+    """
+    逐行按列顺序累加（与 Python 内置 sum 的累加顺序一致）
+
+    ndarray.sum 使用成对求和，末位可能与逐行实现不同；这里对各行同时按列累加
+    """
+    total = np.zeros(matrix.shape[0], dtype=np.float64)
+    for column in range(matrix.shape[1]):
+        total += matrix[:, column]
+    return total
+
+
+def round_scores(values: np.ndarray, digits: int = 2) -> np.ndarray:
+    """
+    逐元素四舍五入，结果与 Python round(value, digits) 完全一致
+
+    np.round 先放大再取整，在 .5 边界附近可能与 Python round 不同：
+    先用 np.round 计算，再对放大后小数部分接近 0.5 的元素改用 Python round
+    """
+    rounded = np.round(values, digits)
+    scaled = values * 10 ** digits
+    ambiguous = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if ambiguous.any():
+        rounded[ambiguous] = [round(value, digits) for value in values[ambiguous].tolist()]
+    return rounded
+
+
+def score_prices(
+    compiled: CompiledScoringConfig,
+    prices: np.ndarray,
+    benchmark_price: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    根据基准价计算偏离度（%）和截断后的得分（均未四舍五入）
+
+    prices 可以是二维矩阵（每行一组报价），此时 benchmark_price 为形如 (行数, 1) 的数组
+    """
+    if np.any(np.asarray(benchmark_price) == 0):
+        # 与逐行实现保持一致：基准价为 0 时无法计算偏离度
+        raise ZeroDivisionError("float division by zero")
+
+    deviation = ((prices - benchmark_price) / benchmark_price) * 100
+    abs_deviation = np.abs(deviation)
+
+    scores = np.full(prices.shape, compiled.base_score, dtype=np.float64)
+    compiled.high_price_table.apply(scores, abs_deviation, prices > benchmark_price, compiled.base_score)
+    compiled.low_price_table.apply(scores, abs_deviation, prices < benchmark_price, compiled.base_score)
+
+    scores = np.maximum(compiled.min_score, np.minimum(compiled.max_score, scores))
+    return deviation, scores
+
+
+def calculate_scores_vectorized(request: CalculationRequest) -> CalculationResult:
+    """
+    计算评分（向量化实现）
+
+    适用于大批量投标单位，结果与 calculate_scores 完全一致
+    """
+    bidders = request.bidders
+    return score_columns(
+        request.config,
+        [bidder.name for bidder in bidders],
+        np.fromiter((bidder.price for bidder in bidders), dtype=np.float64, count=len(bidders)),
+        request.rank_method,
+        request.tie_breaker
+    )
+
+
+def score_columns(
+    config: ScoringConfig,
+    names: Sequence[str],
+    prices: np.ndarray,
+    rank_method: RankMethod = "ordinal",
+    tie_breaker: TieBreaker = "index",
+) -> CalculationResult:
+    """
+    按列（单位名称列表 + 报价数组）计算评分
+
+    供批量导入等场景直接调用，无需先构造 Bidder 对象
+    """
+    validate_rank_options(rank_method, tie_breaker)
+
+    if len(prices) == 0:
+        return CalculationResult(benchmark_price=0.0, results=[])
+
+    compiled = compile_config(config)
+    benchmark_price = compute_benchmark_price(compiled, prices)
+    deviation, scores = score_prices(compiled, prices, benchmark_price)
+
+    # 四舍五入使用 Python round，避免 np.round 在 .5 边界上的差异
+    rounded_deviation = [round(value, 2) for value in deviation.tolist()]
+    rounded_scores = [round(value, 2) for value in scores.tolist()]
+    ranks = assign_ranks(rounded_scores, prices, rank_method, tie_breaker).tolist()
+
+    # 输出数据已由引擎保证类型正确，跳过逐行校验
+    results = [
+        BidderResult.model_construct(
+            name=name,
+            price=price,
+            deviation=rounded_deviation[index],
+            score=rounded_scores[index],
+            rank=ranks[index],
+            index=index,
+        )
+        for index, (name, price) in enumerate(zip(names, prices.tolist()))
+    ]
+
+    return CalculationResult(
+        benchmark_price=round(benchmark_price, 2),
+        results=results
+    )
@@ -0,0 +1,235 @@
+"""
+投标单位表格导入
+
+逐行流式解析 CSV / XLSX 文件，边读边校验，有效行直接写入紧凑的报价数组，
+不整体载入文件，也不为每行构造 Bidder 对象；出错的行单独记录，不中断整个文件。
+"""
+import codecs
+import csv
+import io
+import math
+import re
+from array import array
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from .logic import ScoringConfig, CalculationResult
+from .engine import score_columns
+from .ranking import RankMethod, TieBreaker
+
+# 最多返回的行级错误数量
+IMPORT_MAX_ERRORS = 1000
+# 单个文件允许的最大数据行数
+IMPORT_MAX_ROWS = 1000000
+# 用于检测 CSV 编码的样本大小（字节）
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# 表头别名（小写、去空格后匹配）
+NAME_HEADERS = {"name", "单位名称", "投标单位", "单位", "名称", "投标人"}
+PRICE_HEADERS = {"price", "报价", "投标报价", "报价（元）", "报价(元)", "金额"}
+
+_PRICE_CLEANUP = re.compile(r"[\s,，¥￥元]")
+
+
+class RowError(BaseModel):
+    """行级错误"""
+    row: int  # 文件中的行号（从 1 开始，含表头）
+    error: str  # 错误信息
+
+
+class ImportCalculationResult(CalculationResult):
+    """表格导入计算结果"""
+    total_rows: int  # 数据行数（不含表头和空行）
+    valid_rows: int  # 有效行数
+    errors: List[RowError]  # 行级错误（最多 IMPORT_MAX_ERRORS 条）
+    errors_truncated: bool = False  # 错误是否被截断
+
+
+class BidderColumns:
+    """逐行累积的投标单位数据（名称列表 + 报价数组）"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.prices = array("d")
+        self.total_rows = 0
+        self.errors: List[RowError] = []
+        self.error_count = 0
+
+    def add_error(self, row: int, error: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(RowError(row=row, error=error))
+
+
+def parse_price(value) -> float:
+    """解析报价单元格，支持千分位逗号和货币符号"""
+    if value is None:
+        raise ValueError("报价为空")
+    if isinstance(value, bool):
+        raise ValueError(f"报价格式错误: {value}")
+    if isinstance(value, (int, float)):
+        price = float(value)
+    else:
+        text = _PRICE_CLEANUP.sub("", str(value))
+        if not text:
+            raise ValueError("报价为空")
+        try:
+            price = float(text)
+        except ValueError:
+            raise ValueError(f"报价格式错误: {value}")
+    if not math.isfinite(price):
+        raise ValueError(f"报价格式错误: {value}")
+    return price
+
+
+def _is_blank(cells: Sequence) -> bool:
+    return all(cell is None or str(cell).strip() == "" for cell in cells)
+
+
+def _detect_columns(cells: Sequence) -> Optional[Tuple[int, int]]:
+    """识别表头，返回 (名称列, 报价列)；不是表头时返回 None"""
+    normalized = [str(cell).strip().lower().replace(" ", "") if cell is not None else "" for cell in cells]
+    name_column = next((i for i, cell in enumerate(normalized) if cell in NAME_HEADERS), None)
+    price_column = next((i for i, cell in enumerate(normalized) if cell in PRICE_HEADERS), None)
+    if name_column is None and price_column is None:
+        return None
+    if name_column is None or price_column is None:
+        raise ValueError("表头需要同时包含单位名称列和报价列")
+    return name_column, price_column
+
+
+def collect_rows(rows: Iterable[Sequence]) -> BidderColumns:
+    """
+    逐行校验并累积投标单位
+
+    首个非空行如果是表头则按表头定位列，否则默认第 1 列为单位名称、第 2 列为报价
+    """
+    columns = BidderColumns()
+    name_column, price_column = 0, 1
+    header_checked = False
+
+    for line_number, cells in enumerate(rows, 1):
+        if cells is None or _is_blank(cells):
+            continue
+        if not header_checked:
+            header_checked = True
+            detected = _detect_columns(cells)
+            if detected is not None:
+                name_column, price_column = detected
+                continue
+
+        columns.total_rows += 1
+        if columns.total_rows > IMPORT_MAX_ROWS:
+            raise ValueError(f"数据行数超过上限 {IMPORT_MAX_ROWS}")
+
+        name = cells[name_column] if name_column < len(cells) else None
+        name = str(name).strip() if name is not None else ""
+        if not name:
+            columns.add_error(line_number, "单位名称为空")
+            continue
+        try:
+            price = parse_price(cells[price_column] if price_column < len(cells) else None)
+        except ValueError as e:
+            columns.add_error(line_number, str(e))
+            continue
+
+        columns.names.append(name)
+        columns.prices.append(price)
+
+    return columns
+
+
+def _detect_encoding(stream: BinaryIO) -> str:
+    """根据文件开头的样本检测编码（UTF-8 或 GB18030），检测后回到文件开头"""
+    sample = stream.read(ENCODING_SAMPLE_BYTES)
+    stream.seek(0)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        # final=False：样本末尾被截断的多字节字符不视为错误
+        decoder.decode(sample, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+
+def iter_csv_rows(stream: BinaryIO, encoding: Optional[str] = None) -> Iterator[List[str]]:
+    """逐行读取 CSV"""
+    encoding = encoding or _detect_encoding(stream)
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        # 不关闭底层文件，由调用方负责
+        text.detach()
+
+
+def iter_xlsx_rows(stream: BinaryIO) -> Iterator[tuple]:
+    """以只读模式逐行读取 XLSX 的第一个工作表"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("解析 XLSX 文件需要安装 openpyxl")
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_table_rows(stream: BinaryIO, filename: str, encoding: Optional[str] = None) -> Iterator[Sequence]:
+    """按文件扩展名选择解析方式"""
+    suffix = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if suffix in ("xlsx", "xlsm"):
+        return iter_xlsx_rows(stream)
+    if suffix in ("csv", "txt", ""):
+        return iter_csv_rows(stream, encoding)
+    raise ValueError(f"不支持的文件类型: .{suffix}（仅支持 CSV 和 XLSX）")
+
+
+def collect_table(stream: BinaryIO, filename: str, encoding: Optional[str] = None) -> BidderColumns:
+    """
+    解析表格文件
+
+    编码只按文件开头的样本识别：样本之后才出现 GB18030 字符时，UTF-8 解码会在中途失败，
+    此时按 GB18030 从头重新解析
+    """
+    try:
+        return collect_rows(iter_table_rows(stream, filename, encoding))
+    except UnicodeDecodeError:
+        if encoding is not None:
+            raise ValueError(f"文件不是 {encoding} 编码")
+    stream.seek(0)
+    try:
+        return collect_rows(iter_table_rows(stream, filename, "gb18030"))
+    except UnicodeDecodeError:
+        raise ValueError("无法识别文件编码（支持 UTF-8 / GB18030），请通过 encoding 参数指定")
+
+
+def calculate_from_table(
+    stream: BinaryIO,
+    filename: str,
+    config: ScoringConfig,
+    rank_method: RankMethod = "ordinal",
+    tie_breaker: TieBreaker = "index",
+    encoding: Optional[str] = None,
+) -> ImportCalculationResult:
+    """解析表格文件并直接计算评分"""
+    columns = collect_table(stream, filename, encoding)
+    result = score_columns(
+        config,
+        columns.names,
+        np.frombuffer(columns.prices, dtype=np.float64),
+        rank_method,
+        tie_breaker
+    )
+    return ImportCalculationResult(
+        benchmark_price=result.benchmark_price,
+        results=result.results,
+        total_rows=columns.total_rows,
+        valid_rows=len(columns.names),
+        errors=columns.errors,
+        errors_truncated=columns.error_count > len(columns.errors)
+    )
@@ -1,6 +1,9 @@
-from typing import List
+from typing import List, Optional, Tuple
 from pydantic import BaseModel
 
+from core.metrics import metrics
+from .ranking import RankMethod, TieBreaker, assign_ranks
+
 
 class OutlierRule(BaseModel):
     """去极值规则"""
@@ -39,6 +42,8 @@ class CalculationRequest(BaseModel):
     """计算请求"""
     config: ScoringConfig
     bidders: List[Bidder]
+    rank_method: RankMethod = "ordinal"  # 排名方式："ordinal"（顺序）、"competition"（竞争）或 "dense"（密集）
+    tie_breaker: TieBreaker = "index"  # 并列时的次级排序："index"（原始顺序）、"price_low" 或 "price_high"
 
 
 class BidderResult(BaseModel):
@@ -57,6 +62,81 @@ class CalculationResult(BaseModel):
     results: List[BidderResult]  # 结果列表
 
 
+class SectionCalculationRequest(CalculationRequest):
+    """单个标段的计算请求"""
+    section: str = ""  # 标段名称/编号
+
+
+class SectionCalculationResult(CalculationResult):
+    """单个标段的计算结果"""
+    section: str = ""  # 标段名称/编号
+
+
+class BatchCalculationRequest(BaseModel):
+    """多标段批量计算请求"""
+    sections: List[SectionCalculationRequest]
+
+
+class BatchCalculationResult(BaseModel):
+    """多标段批量计算结果"""
+    sections: List[SectionCalculationResult]
+
+
+# 投标单位数量达到该阈值时，calculate_scores 默认使用向量化引擎
+VECTORIZE_THRESHOLD = 64
+
+# 计算耗时按投标单位数量分档统计（档位上限，最后一档不设上限）
+BIDDER_COUNT_BUCKETS = (15, 63, 255, 1023)
+
+calculation_duration = metrics.histogram(
+    "bidding_calculate_seconds",
+    "评分计算耗时（秒），按投标单位数量分档和计算引擎",
+    ("bidders", "engine")
+)
+
+
+def bidder_count_bucket(bidder_count: int) -> str:
+    """投标单位数量所在的分档标签，如 16-63、1024+"""
+    lower = 0
+    for upper in BIDDER_COUNT_BUCKETS:
+        if bidder_count <= upper:
+            return f"{lower}-{upper}"
+        lower = upper + 1
+    return f"{lower}+"
+
+
+def match_outlier_rule(outlier_rules: List[OutlierRule], bidder_count: int) -> Optional[OutlierRule]:
+    """
+    查找与投标单位数量匹配的去极值规则
+    
+    按 max_count 升序排序（None 放在最后），再按 min_count 升序排序，
+    优先匹配范围更小的规则
+    """
+    sorted_rules = sorted(
+        outlier_rules,
+        key=lambda x: (x.max_count if x.max_count is not None else float('inf'), x.min_count)
+    )
+    for rule in sorted_rules:
+        # 判断是否在区间内：> min_count 且 (<= max_count 或 max_count 为空)
+        if bidder_count > rule.min_count:
+            if rule.max_count is None or bidder_count <= rule.max_count:
+                return rule
+    return None
+
+
+def trim_bounds(rule: Optional[OutlierRule], bidder_count: int) -> Tuple[int, int]:
+    """
+    计算去极值后有效报价在升序报价中的区间 [lo, hi)
+    
+    与逐个弹出的语义一致：先去掉最高价，再从剩余报价中去掉最低价
+    """
+    if rule is None:
+        return 0, bidder_count
+    hi = bidder_count - min(max(rule.remove_high, 0), bidder_count)
+    lo = min(max(rule.remove_low, 0), hi)
+    return lo, hi
+
+
 def calculate_scores(request: CalculationRequest) -> CalculationResult:
     """
     计算评分
@@ -68,12 +148,25 @@ def calculate_scores(request: CalculationRequest) -> CalculationResult:
        - 报价 > 基准价：线性扣分
        - 报价 < 基准价：根据区间规则加分或扣分
     """
+    bidder_count = len(request.bidders)
+    engine = "vectorized" if bidder_count >= VECTORIZE_THRESHOLD else "rowwise"
+    with calculation_duration.time(bidders=bidder_count_bucket(bidder_count), engine=engine):
+        return _calculate_scores(request)
+
+
+def _calculate_scores(request: CalculationRequest) -> CalculationResult:
+    """calculate_scores 的计算过程（不含耗时统计）"""
     config = request.config
     bidders = request.bidders
     
     if not bidders:
         return CalculationResult(benchmark_price=0.0, results=[])
     
+    # 投标单位较多时走 NumPy 向量化引擎（结果与下方逐行计算完全一致）
+    if len(bidders) >= VECTORIZE_THRESHOLD:
+        from .engine import calculate_scores_vectorized
+        return calculate_scores_vectorized(request)
+    
     # 提取所有报价
     prices = [bidder.price for bidder in bidders]
     prices_sorted = sorted(prices)
@@ -82,19 +175,12 @@ def calculate_scores(request: CalculationRequest) -> CalculationResult:
     valid_prices = prices_sorted.copy()
     bidder_count = len(bidders)
     
-    # 找到匹配的去极值规则（按 max_count 升序排序，优先匹配范围更小的规则）
-    matched_rule = None
-    # 先按 max_count 升序排序（None 放在最后），再按 min_count 升序排序
-    sorted_rules = sorted(
-        config.outlier_rules,
-        key=lambda x: (x.max_count if x.max_count is not None else float('inf'), x.min_count)
-    )
-    for rule in sorted_rules:
-        # 判断是否在区间内：> min_count 且 (<= max_count 或 max_count 为空)
-        if bidder_count > rule.min_count:
-            if rule.max_count is None or bidder_count <= rule.max_count:
-                matched_rule = rule
-                break
+    # 获取编译后的配置（规则表已排序，相同配置复用缓存）
+    from .compiled import compile_config
+    compiled = compile_config(config)
+    
+    # 找到匹配的去极值规则
+    matched_rule = compiled.outlier_table.lookup(bidder_count)
     
     if matched_rule:
         # 去掉最高价
@@ -125,23 +211,21 @@ def calculate_scores(request: CalculationRequest) -> CalculationResult:
         if price > benchmark_price:
             # 报价高于基准价：根据高价区间规则处理
             abs_deviation = abs(deviation)
-            for rule in config.high_price_rules:
-                if rule.min_dev <= abs_deviation < rule.max_dev:
-                    if rule.type == "add":
-                        score = config.base_score + (abs_deviation * rule.factor)
-                    elif rule.type == "deduct":
-                        score = config.base_score - (abs_deviation * rule.factor)
-                    break
+            rule = compiled.high_price_table.lookup(abs_deviation)
+            if rule is not None:
+                if rule.type == "add":
+                    score = config.base_score + (abs_deviation * rule.factor)
+                elif rule.type == "deduct":
+                    score = config.base_score - (abs_deviation * rule.factor)
         elif price < benchmark_price:
             # 报价低于基准价：根据低价区间规则处理
             abs_deviation = abs(deviation)
-            for rule in config.low_price_rules:
-                if rule.min_dev <= abs_deviation < rule.max_dev:
-                    if rule.type == "add":
-                        score = config.base_score + (abs_deviation * rule.factor)
-                    elif rule.type == "deduct":
-                        score = config.base_score - (abs_deviation * rule.factor)
-                    break
+            rule = compiled.low_price_table.lookup(abs_deviation)
+            if rule is not None:
+                if rule.type == "add":
+                    score = config.base_score + (abs_deviation * rule.factor)
+                elif rule.type == "deduct":
+                    score = config.base_score - (abs_deviation * rule.factor)
         # 如果 price == benchmark_price，保持基准分不变
         
         # 确保得分在合理范围内：使用配置的极值限制
@@ -156,23 +240,64 @@ def calculate_scores(request: CalculationRequest) -> CalculationResult:
             index=index  # 保存原始索引，用于前端匹配
         ))
     
-    # 按得分降序排序，设置排名
-    results_sorted = sorted(results, key=lambda x: x.score, reverse=True)
-    for i, result in enumerate(results_sorted, 1):
-        result.rank = i
-    
-    # 按原始索引排序，保持与输入顺序一致
-    results_by_index = sorted(results, key=lambda x: x.index)
-    # 更新排名信息
-    for result in results_by_index:
-        # 从排序后的结果中查找对应的排名
-        for sorted_result in results_sorted:
-            if sorted_result.index == result.index:
-                result.rank = sorted_result.rank
-                break
+    # 按得分降序一次排序，设置排名（results 已按原始索引排列）
+    ranks = assign_ranks(
+        [result.score for result in results],
+        prices,
+        request.rank_method,
+        request.tie_breaker
+    ).tolist()
+    for result, rank in zip(results, ranks):
+        result.rank = rank
     
     return CalculationResult(
         benchmark_price=round(benchmark_price, 2),
-        results=results_by_index
+        results=results
     )
 
+
+def calculate_batch(request: BatchCalculationRequest) -> BatchCalculationResult:
+    """
+    批量计算多个标段的评分
+    
+    每个标段独立计算，结果顺序与请求中的标段顺序一致
+    """
+    from .engine import calculate_scores_vectorized
+    
+    sections = []
+    for position, section in enumerate(request.sections):
+        try:
+            with calculation_duration.time(
+                bidders=bidder_count_bucket(len(section.bidders)), engine="vectorized"
+            ):
+                result = calculate_scores_vectorized(section)
+        except Exception as e:
+            raise ValueError(f"标段 {section.section or position + 1}: {e}") from e
+        sections.append(SectionCalculationResult(
+            section=section.section,
+            benchmark_price=result.benchmark_price,
+            results=result.results
+        ))
+    
+    return BatchCalculationResult(sections=sections)
+
+
+def warm_up() -> None:
+    """
+    预热计算路径（应用启动时调用）
+
+    分别以少量和大量投标单位各计算一次，提前完成模块导入、配置编译和 NumPy 初始化，
+    避免首个请求承担这些开销。直接调用 _calculate_scores，预热不计入 bidding_calculate_seconds
+    """
+    config = ScoringConfig(
+        k_factor=1.0,
+        base_score=100,
+        outlier_rules=[OutlierRule(min_count=5, remove_high=1, remove_low=1)],
+        high_price_rules=[IntervalRule(min_dev=0, max_dev=100, type="deduct", factor=1)],
+        low_price_rules=[IntervalRule(min_dev=0, max_dev=100, type="deduct", factor=0.5)],
+    )
+    for count in (8, VECTORIZE_THRESHOLD):
+        _calculate_scores(CalculationRequest(
+            config=config,
+            bidders=[Bidder(name=f"warmup-{i}", price=100 + i) for i in range(count)]
+        ))
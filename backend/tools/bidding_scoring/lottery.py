@@ -0,0 +1,229 @@
+"""
+K值抽签评估
+
+开标时从公布的候选值中随机抽取 K值（有时还包括基准分）。
+对同一组投标单位一次性评估全部候选配置：
+- 报价只排序一次，相同的去极值区间只求一次均值
+- 偏离度和得分以 候选配置数 × 投标单位数 的矩阵一次计算，
+  区间规则相同的候选配置共用一次规则查找
+每个候选配置的结果与单独调用 calculate_scores 完全一致
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel
+
+from .logic import ScoringConfig, Bidder, BidderResult
+from .compiled import compile_config, config_fingerprint
+from .ranking import RankMethod, TieBreaker, assign_ranks
+
+
+class LotteryRequest(BaseModel):
+    """K值抽签评估请求"""
+    bidders: List[Bidder]
+    config: Optional[ScoringConfig] = None  # 基础配置，与 k_factors / base_scores 组合生成候选配置
+    k_factors: List[float] = []  # 候选 K值
+    base_scores: List[float] = []  # 候选基准分
+    configs: List[ScoringConfig] = []  # 直接指定的候选配置
+    weights: Optional[List[float]] = None  # 各候选配置被抽中的权重（默认等概率）
+    rank_method: RankMethod = "ordinal"  # 排名方式，同 CalculationRequest
+    tie_breaker: TieBreaker = "index"  # 并列时的次级排序，同 CalculationRequest
+    include_results: bool = True  # 是否返回每个候选配置的逐单位结果
+
+
+class LotteryCandidateResult(BaseModel):
+    """单个候选配置的计算结果"""
+    k_factor: float  # K值
+    base_score: float  # 基准分
+    weight: float  # 抽中概率
+    benchmark_price: float  # 基准价
+    results: List[BidderResult]  # 结果列表（include_results 为 False 时为空）
+
+
+class LotteryBidderSummary(BaseModel):
+    """投标单位在全部候选配置下的汇总统计"""
+    name: str  # 单位名称
+    price: float  # 报价
+    index: int  # 原始索引
+    expected_score: float  # 期望得分
+    min_score: float  # 最低得分
+    max_score: float  # 最高得分
+    expected_rank: float  # 期望排名
+    best_rank: int  # 最好排名
+    worst_rank: int  # 最差排名
+    win_probability: float  # 排名第一的概率
+
+
+class LotteryResult(BaseModel):
+    """K值抽签评估结果"""
+    candidates: List[LotteryCandidateResult]
+    summary: List[LotteryBidderSummary]
+
+
+def expand_candidates(request: LotteryRequest) -> List[ScoringConfig]:
+    """生成候选配置列表：直接指定的配置 + 基础配置与候选 K值/基准分的组合"""
+    candidates = list(request.configs)
+    if request.config is not None:
+        k_factors = request.k_factors or [request.config.k_factor]
+        base_scores = request.base_scores or [request.config.base_score]
+        for k_factor in k_factors:
+            for base_score in base_scores:
+                candidates.append(request.config.model_copy(
+                    update={"k_factor": k_factor, "base_score": base_score}
+                ))
+    elif request.k_factors or request.base_scores:
+        raise ValueError("指定候选 K值或基准分时需要提供基础配置 config")
+    if not candidates:
+        raise ValueError("没有候选配置")
+    return candidates
+
+
+def score_candidates(
+    candidates: List[ScoringConfig],
+    prices: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    按全部候选配置计算基准价、偏离度和得分
+
+    返回 (基准价[N], 偏离度[N, M], 得分[N, M])，均未四舍五入
+    """
+    bidder_count = len(prices)
+    prices_sorted = np.sort(prices)
+    compiled_list = [compile_config(candidate) for candidate in candidates]
+
+    # 相同去极值区间的有效报价均值只计算一次（顺序累加，与逐行实现一致）
+    window_means: Dict[Tuple[int, int], float] = {}
+    benchmarks = np.empty(len(candidates), dtype=np.float64)
+    for row, compiled in enumerate(compiled_list):
+        bounds = compiled.trim_bounds(bidder_count)
+        if bounds not in window_means:
+            lo, hi = bounds
+            if hi > lo:
+                window_means[bounds] = sum(prices_sorted[lo:hi].tolist()) / (hi - lo)
+            else:
+                window_means[bounds] = sum(prices.tolist()) / bidder_count
+        benchmarks[row] = window_means[bounds] * compiled.k_factor
+
+    if np.any(benchmarks == 0):
+        raise ZeroDivisionError("float division by zero")
+
+    deviation = ((prices[None, :] - benchmarks[:, None]) / benchmarks[:, None]) * 100
+    abs_deviation = np.abs(deviation)
+    base_scores = np.array([compiled.base_score for compiled in compiled_list], dtype=np.float64)
+    scores = np.repeat(base_scores[:, None], bidder_count, axis=1)
+
+    # K值和基准分之外的规则相同的候选配置共用一次规则查找
+    groups: Dict[str, List[int]] = {}
+    for row, candidate in enumerate(candidates):
+        key = config_fingerprint(candidate.model_copy(update={"k_factor": 0.0, "base_score": 0.0}))
+        groups.setdefault(key, []).append(row)
+
+    for rows in groups.values():
+        compiled = compiled_list[rows[0]]
+        rows = np.asarray(rows)
+        group_scores = scores[rows]
+        group_prices = np.broadcast_to(prices, group_scores.shape)
+        group_benchmarks = benchmarks[rows][:, None]
+        group_base = base_scores[rows][:, None]
+        compiled.high_price_table.apply(group_scores, abs_deviation[rows], group_prices > group_benchmarks, group_base)
+        compiled.low_price_table.apply(group_scores, abs_deviation[rows], group_prices < group_benchmarks, group_base)
+        scores[rows] = np.maximum(compiled.min_score, np.minimum(compiled.max_score, group_scores))
+
+    return benchmarks, deviation, scores
+
+
+def evaluate_lottery(request: LotteryRequest) -> LotteryResult:
+    """
+    K值抽签评估
+
+    返回每个候选配置的计算结果，以及各投标单位按抽中概率加权的汇总统计
+    """
+    candidates = expand_candidates(request)
+    bidders = request.bidders
+
+    if request.weights is not None:
+        if len(request.weights) != len(candidates):
+            raise ValueError(f"权重数量（{len(request.weights)}）与候选配置数量（{len(candidates)}）不一致")
+        weights = np.asarray(request.weights, dtype=np.float64)
+        if np.any(weights < 0) or weights.sum() <= 0:
+            raise ValueError("权重必须为非负数且不能全为 0")
+        weights = weights / weights.sum()
+    else:
+        weights = np.full(len(candidates), 1 / len(candidates))
+
+    if not bidders:
+        return LotteryResult(
+            candidates=[
+                LotteryCandidateResult(
+                    k_factor=candidate.k_factor,
+                    base_score=candidate.base_score,
+                    weight=float(weight),
+                    benchmark_price=0.0,
+                    results=[]
+                )
+                for candidate, weight in zip(candidates, weights.tolist())
+            ],
+            summary=[]
+        )
+
+    prices = np.fromiter((bidder.price for bidder in bidders), dtype=np.float64, count=len(bidders))
+    benchmarks, deviation, scores = score_candidates(candidates, prices)
+
+    # 四舍五入使用 Python round，与 calculate_scores 保持一致
+    rounded_scores = [[round(value, 2) for value in row] for row in scores.tolist()]
+    ranks = np.vstack([
+        assign_ranks(row, prices, request.rank_method, request.tie_breaker)
+        for row in rounded_scores
+    ])
+    score_matrix = np.asarray(rounded_scores, dtype=np.float64)
+
+    candidate_results = []
+    for row, candidate in enumerate(candidates):
+        results = []
+        if request.include_results:
+            row_deviation = deviation[row].tolist()
+            row_ranks = ranks[row].tolist()
+            results = [
+                BidderResult.model_construct(
+                    name=bidder.name,
+                    price=bidder.price,
+                    deviation=round(row_deviation[index], 2),
+                    score=rounded_scores[row][index],
+                    rank=row_ranks[index],
+                    index=index,
+                )
+                for index, bidder in enumerate(bidders)
+            ]
+        candidate_results.append(LotteryCandidateResult(
+            k_factor=candidate.k_factor,
+            base_score=candidate.base_score,
+            weight=float(weights[row]),
+            benchmark_price=round(float(benchmarks[row]), 2),
+            results=results
+        ))
+
+    expected_scores = (weights @ score_matrix).tolist()
+    expected_ranks = (weights @ ranks).tolist()
+    win_probabilities = (weights @ (ranks == 1)).tolist()
+    min_scores = score_matrix.min(axis=0).tolist()
+    max_scores = score_matrix.max(axis=0).tolist()
+    best_ranks = ranks.min(axis=0).tolist()
+    worst_ranks = ranks.max(axis=0).tolist()
+
+    summary = [
+        LotteryBidderSummary(
+            name=bidder.name,
+            price=bidder.price,
+            index=index,
+            expected_score=round(expected_scores[index], 4),
+            min_score=min_scores[index],
+            max_score=max_scores[index],
+            expected_rank=round(expected_ranks[index], 4),
+            best_rank=best_ranks[index],
+            worst_rank=worst_ranks[index],
+            win_probability=win_probabilities[index]
+        )
+        for index, bidder in enumerate(bidders)
+    ]
+
+    return LotteryResult(candidates=candidate_results, summary=summary)
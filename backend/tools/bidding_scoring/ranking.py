@@ -0,0 +1,85 @@
+"""
+排名计算
+
+一次排序完成排名（O(n log n)），支持多种并列处理方式：
+- ordinal: 顺序排名，并列者按次级排序键依次排名（1, 2, 3, 4）
+- competition: 竞争排名，并列者同名次，后续名次跳过（1, 2, 2, 4）
+- dense: 密集排名，并列者同名次，后续名次连续（1, 2, 2, 3）
+
+次级排序键（tie_breaker）：
+- index: 按原始顺序（默认，与历史行为一致）
+- price_low: 报价低者优先
+- price_high: 报价高者优先
+使用报价作为次级排序键时，只有得分和报价都相同才视为并列
+"""
+from typing import Literal, Sequence, get_args
+
+import numpy as np
+
+RankMethod = Literal["ordinal", "competition", "dense"]
+TieBreaker = Literal["index", "price_low", "price_high"]
+
+RANK_METHODS = get_args(RankMethod)
+TIE_BREAKERS = get_args(TieBreaker)
+
+
+def validate_rank_options(rank_method: str, tie_breaker: str) -> None:
+    """校验排名方式和次级排序键（请求模型已由 Pydantic 校验，供直接调用的函数使用）"""
+    if rank_method not in RANK_METHODS:
+        raise ValueError(f"不支持的排名方式: {rank_method}（可选 {', '.join(RANK_METHODS)}）")
+    if tie_breaker not in TIE_BREAKERS:
+        raise ValueError(f"不支持的并列处理方式: {tie_breaker}（可选 {', '.join(TIE_BREAKERS)}）")
+
+
+def rank_order(scores: np.ndarray, prices: np.ndarray, tie_breaker: TieBreaker = "index") -> np.ndarray:
+    """
+    返回按名次排列的原始索引（得分降序，再按次级排序键）
+    """
+    if tie_breaker == "index":
+        return np.argsort(-scores, kind="stable")
+    secondary = prices if tie_breaker == "price_low" else -prices
+    # lexsort 以最后一个键为主键，且为稳定排序（完全相同时保持原始顺序）
+    return np.lexsort((secondary, -scores))
+
+
+def assign_ranks(
+    scores: Sequence[float],
+    prices: Sequence[float],
+    rank_method: RankMethod = "ordinal",
+    tie_breaker: TieBreaker = "index",
+) -> np.ndarray:
+    """
+    计算每个投标单位的排名，返回与输入顺序一致的排名数组
+
+    scores 应为最终展示的（已四舍五入的）得分，保证排名与展示一致
+    """
+    validate_rank_options(rank_method, tie_breaker)
+
+    scores = np.asarray(scores, dtype=np.float64)
+    count = len(scores)
+    ranks = np.empty(count, dtype=np.int64)
+    if count == 0:
+        return ranks
+
+    prices = np.asarray(prices, dtype=np.float64)
+    order = rank_order(scores, prices, tie_breaker)
+
+    if rank_method == "ordinal":
+        ranks[order] = np.arange(1, count + 1)
+        return ranks
+
+    # 标记每个并列组的起点
+    sorted_scores = scores[order]
+    group_start = np.empty(count, dtype=bool)
+    group_start[0] = True
+    group_start[1:] = sorted_scores[1:] != sorted_scores[:-1]
+    if tie_breaker != "index":
+        sorted_prices = prices[order]
+        group_start[1:] |= sorted_prices[1:] != sorted_prices[:-1]
+
+    if rank_method == "dense":
+        ranks[order] = np.cumsum(group_start)
+    else:
+        positions = np.where(group_start, np.arange(1, count + 1), 0)
+        ranks[order] = np.maximum.accumulate(positions)
+    return ranks
@@ -1,40 +1,167 @@
 """
 报价评分计算器路由
 """
-from fastapi import APIRouter, HTTPException
-from .logic import CalculationRequest, CalculationResult, calculate_scores
-from core.tool_registry import tool_registry
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Header
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from .logic import (
+    CalculationRequest,
+    CalculationResult,
+    BatchCalculationRequest,
+    BatchCalculationResult,
+    ScoringConfig,
+    calculate_batch,
+)
+from .simulation import SimulationRequest, SimulationResult, simulate_async
+from .solver import SolverRequest, SolverResult, solve_optimal_price
+from .lottery import LotteryRequest, LotteryResult, evaluate_lottery
+from .importer import ImportCalculationResult, calculate_from_table
+from .ranking import RankMethod, TieBreaker
+from .cache import cached_calculation_response
 
 router = APIRouter(prefix="/api/tools/bidding/scoring", tags=["报价评分计算器"])
 
 
 @router.post("/calculate", response_model=CalculationResult)
-async def calculate(request: CalculationRequest):
+async def calculate(
+    request: CalculationRequest,
+    if_none_match: str | None = Header(None)
+):
     """
     计算评分
     
-    接收配置和投标单位列表，返回计算结果
+    接收配置和投标单位列表，返回计算结果；
+    相同请求的结果会被缓存，响应携带 ETag，If-None-Match 匹配时返回 304
     """
     try:
-        result = calculate_scores(request)
+        return await cached_calculation_response(request, if_none_match)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"计算失败: {str(e)}")
+
+
+@router.post("/calculate-batch", response_model=BatchCalculationResult)
+async def calculate_batch_sections(request: BatchCalculationRequest):
+    """
+    批量计算多个标段的评分
+    
+    一次请求提交多个标段（各自的配置和投标单位列表），按标段顺序返回计算结果；
+    计算在线程池中进行，不阻塞事件循环
+    """
+    try:
+        result = await run_in_threadpool(calculate_batch, request)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"计算失败: {str(e)}")
 
 
-# 注册工具
-def register_tool():
-    """注册工具到全局注册表"""
-    tool_registry.register_tool(
-        tool_id="bidding_scoring",
-        name="报价评分计算器",
-        description="工程招标报价评分计算工具，支持自定义评分规则和批量计算",
-        router=router,
-        category="bidding",
-        path="/tools/bidding/scoring"
-    )
+@router.post("/calculate-upload", response_model=ImportCalculationResult)
+async def calculate_upload(
+    file: UploadFile = File(..., description="投标单位表格（CSV 或 XLSX，列：单位名称、报价）"),
+    config: str = Form(..., description="评分配置（ScoringConfig 的 JSON）"),
+    rank_method: RankMethod = Form("ordinal"),
+    tie_breaker: TieBreaker = Form("index"),
+    encoding: str | None = Form(None, description="CSV 编码（默认自动识别 UTF-8 / GB18030）"),
+):
+    """
+    上传表格计算评分
+    
+    逐行解析 CSV / XLSX 文件并直接计算评分，无需先转换为 JSON；
+    格式错误的行会在 errors 中列出，不影响其余行的计算
+    """
+    try:
+        scoring_config = ScoringConfig.model_validate_json(config)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"评分配置格式错误: {str(e)}")
+    
+    try:
+        result = await run_in_threadpool(
+            calculate_from_table,
+            file.file,
+            file.filename or "",
+            scoring_config,
+            rank_method,
+            tie_breaker,
+            encoding
+        )
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"计算失败: {str(e)}")
+    finally:
+        await file.close()
+
 
+@router.post("/lottery", response_model=LotteryResult)
+async def calculate_lottery(request: LotteryRequest):
+    """
+    K值抽签评估
+    
+    对同一组投标单位一次评估全部候选配置（候选 K值/基准分），
+    返回每个候选配置的结果以及期望排名、最差排名等汇总统计，
+    计算在线程池中进行，不阻塞事件循环
+    """
+    try:
+        result = await run_in_threadpool(evaluate_lottery, request)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"计算失败: {str(e)}")
 
-# 自动注册
-register_tool()
 
+@router.post("/simulate", response_model=SimulationResult)
+async def simulate_win_probability(request: SimulationRequest):
+    """
+    中标概率模拟
+    
+    按竞争对手报价分布进行蒙特卡洛模拟，返回我方报价排名第一的概率、期望得分和排名分布
+    """
+    try:
+        result = await simulate_async(request)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"模拟失败: {str(e)}")
+
+
+@router.post("/optimal-price", response_model=SolverResult)
+async def optimal_price(request: SolverRequest):
+    """
+    最优报价求解
+    
+    竞争对手报价固定时，求使我方得分最高（或确保排名第一）的报价及报价区间，
+    求解在线程池中进行，不阻塞事件循环
+    """
+    try:
+        result = await run_in_threadpool(solve_optimal_price, request)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"求解失败: {str(e)}")
+
+
+# 保持向后兼容：保留旧的 API 端点（不带前缀）
+legacy_router = APIRouter(tags=["报价评分计算器"])
+
+
+@legacy_router.post("/api/calculate", response_model=CalculationResult)
+async def calculate_legacy_v1(
+    request: CalculationRequest,
+    if_none_match: str | None = Header(None)
+):
+    """
+    计算评分（旧端点，保持兼容）
+    """
+    try:
+        return await cached_calculation_response(request, if_none_match)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"计算失败: {str(e)}")
+
+
+@legacy_router.post("/calculate", response_model=CalculationResult)
+async def calculate_legacy_v2(
+    request: CalculationRequest,
+    if_none_match: str | None = Header(None)
+):
+    """
+    计算评分（旧端点，保持兼容）
+    """
+    try:
+        return await cached_calculation_response(request, if_none_match)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"计算失败: {str(e)}")
@@ -0,0 +1,249 @@
+"""
+中标概率蒙特卡洛模拟
+
+在竞争对手报价不确定的情况下，按当前评分配置模拟大量开标场景，
+估计我方报价排名第一的概率、期望得分和排名分布。
+
+每批试验以矩阵形式一次性计算（行 = 一次试验，列 = 投标单位），
+试验数较多时拆分为多个批次分发到进程池并行计算，最后合并统计量。
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from .logic import ScoringConfig
+from .compiled import compile_config
+from .engine import benchmark_prices_matrix, round_scores, score_prices
+
+# 每个批次的试验数（控制单批内存占用）
+SIMULATION_CHUNK_TRIALS = 20000
+# 试验数不超过该值时直接在当前进程计算，避免进程间通信开销
+SIMULATION_INPROCESS_TRIALS = 50000
+# 单次请求允许的最大试验数
+SIMULATION_MAX_TRIALS = 1000000
+# 进程池大小（默认 CPU 核数）
+SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", "0")) or (os.cpu_count() or 1)
+
+
+class PriceDistribution(BaseModel):
+    """竞争对手报价分布"""
+    name: str = ""  # 竞争对手名称
+    type: Literal["normal", "uniform", "empirical", "fixed"]  # 正态、均匀、经验样本（有放回抽样）或固定报价
+    mean: Optional[float] = None  # 正态分布均值
+    std: Optional[float] = None  # 正态分布标准差
+    low: Optional[float] = None  # 均匀分布下限；正态分布截断下限（可选，默认 0，避免抽到负报价）
+    high: Optional[float] = None  # 均匀分布上限；正态分布截断上限（可选）
+    samples: Optional[List[float]] = None  # 经验报价样本（有放回抽样）
+    price: Optional[float] = None  # 固定报价
+
+
+class SimulationRequest(BaseModel):
+    """模拟请求"""
+    config: ScoringConfig
+    own_price: float  # 我方报价
+    competitors: List[PriceDistribution]  # 竞争对手报价分布
+    trials: int = 100000  # 试验次数
+    seed: Optional[int] = None  # 随机种子（用于复现结果）
+
+
+class SimulationResult(BaseModel):
+    """模拟结果"""
+    trials: int  # 实际试验次数
+    win_probability: float  # 排名第一的概率（含并列第一）
+    outright_win_probability: float  # 单独排名第一的概率（无并列）
+    expected_score: float  # 期望得分
+    score_std: float  # 得分标准差
+    min_score: float  # 最低得分
+    max_score: float  # 最高得分
+    expected_rank: float  # 期望排名
+    expected_benchmark_price: float  # 期望基准价
+    rank_histogram: Dict[int, int]  # 排名分布（排名 -> 次数）
+    rank_probabilities: Dict[int, float]  # 排名概率（排名 -> 概率）
+
+
+def validate_distribution(distribution: PriceDistribution) -> None:
+    """校验报价分布参数"""
+    label = distribution.name or distribution.type
+    if distribution.type == "normal":
+        if distribution.mean is None or distribution.std is None:
+            raise ValueError(f"{label}: 正态分布需要提供 mean 和 std")
+        if distribution.std < 0:
+            raise ValueError(f"{label}: 标准差不能为负数")
+        if distribution.low is not None and distribution.high is not None and distribution.low > distribution.high:
+            raise ValueError(f"{label}: 截断下限不能大于上限")
+        if distribution.low is None and distribution.high is not None and distribution.high < 0:
+            raise ValueError(f"{label}: 截断上限不能为负数")
+    elif distribution.type == "uniform":
+        if distribution.low is None or distribution.high is None:
+            raise ValueError(f"{label}: 均匀分布需要提供 low 和 high")
+        if distribution.low > distribution.high:
+            raise ValueError(f"{label}: 均匀分布下限不能大于上限")
+    elif distribution.type == "empirical":
+        if not distribution.samples:
+            raise ValueError(f"{label}: 经验分布需要提供 samples")
+    elif distribution.price is None:
+        raise ValueError(f"{label}: 固定报价需要提供 price")
+
+
+def sample_prices(distribution: PriceDistribution, trials: int, rng: np.random.Generator) -> np.ndarray:
+    """按分布抽取 trials 个报价"""
+    if distribution.type == "normal":
+        prices = rng.normal(distribution.mean, distribution.std, trials)
+        low = distribution.low if distribution.low is not None else 0.0
+        return np.clip(prices, low, distribution.high)
+    if distribution.type == "uniform":
+        return rng.uniform(distribution.low, distribution.high, trials)
+    if distribution.type == "empirical":
+        return rng.choice(np.asarray(distribution.samples, dtype=np.float64), size=trials, replace=True)
+    return np.full(trials, distribution.price, dtype=np.float64)
+
+
+def simulate_chunk(
+    config_data: dict,
+    own_price: float,
+    competitors_data: List[dict],
+    trials: int,
+    seed_sequence: np.random.SeedSequence,
+) -> dict:
+    """
+    计算一个批次的试验并返回可合并的统计量
+
+    参数均为可序列化对象，便于在进程池中执行
+    """
+    config = ScoringConfig.model_validate(config_data)
+    competitors = [PriceDistribution.model_validate(item) for item in competitors_data]
+    compiled = compile_config(config)
+    rng = np.random.default_rng(seed_sequence)
+
+    # 第 0 列为我方报价，其余列为竞争对手报价
+    price_matrix = np.empty((trials, len(competitors) + 1), dtype=np.float64)
+    price_matrix[:, 0] = own_price
+    for column, distribution in enumerate(competitors, 1):
+        price_matrix[:, column] = sample_prices(distribution, trials, rng)
+
+    benchmarks = benchmark_prices_matrix(compiled, price_matrix)
+    _, scores = score_prices(compiled, price_matrix, benchmarks[:, None])
+    scores = round_scores(scores)
+
+    own_scores = scores[:, 0]
+    competitor_scores = scores[:, 1:]
+    higher = (competitor_scores > own_scores[:, None]).sum(axis=1)
+    tied = (competitor_scores == own_scores[:, None]).sum(axis=1)
+    # 竞争排名：得分严格高于我方的单位数 + 1
+    ranks = higher + 1
+
+    return {
+        "trials": trials,
+        "wins": int(np.count_nonzero(higher == 0)),
+        "outright_wins": int(np.count_nonzero((higher == 0) & (tied == 0))),
+        "score_sum": float(own_scores.sum()),
+        "score_sq_sum": float(np.square(own_scores).sum()),
+        "score_min": float(own_scores.min()),
+        "score_max": float(own_scores.max()),
+        "rank_sum": int(ranks.sum()),
+        "benchmark_sum": float(benchmarks.sum()),
+        "rank_counts": np.bincount(ranks, minlength=len(competitors) + 2)[1:].tolist(),
+    }
+
+
+def merge_chunks(chunks: List[dict]) -> SimulationResult:
+    """合并各批次统计量"""
+    trials = sum(chunk["trials"] for chunk in chunks)
+    score_sum = sum(chunk["score_sum"] for chunk in chunks)
+    score_sq_sum = sum(chunk["score_sq_sum"] for chunk in chunks)
+    expected_score = score_sum / trials
+    variance = max(score_sq_sum / trials - expected_score ** 2, 0.0)
+
+    rank_counts = np.sum([chunk["rank_counts"] for chunk in chunks], axis=0).tolist()
+    rank_histogram = {rank: count for rank, count in enumerate(rank_counts, 1) if count}
+
+    return SimulationResult(
+        trials=trials,
+        win_probability=sum(chunk["wins"] for chunk in chunks) / trials,
+        outright_win_probability=sum(chunk["outright_wins"] for chunk in chunks) / trials,
+        expected_score=round(expected_score, 4),
+        score_std=round(variance ** 0.5, 4),
+        min_score=min(chunk["score_min"] for chunk in chunks),
+        max_score=max(chunk["score_max"] for chunk in chunks),
+        expected_rank=round(sum(chunk["rank_sum"] for chunk in chunks) / trials, 4),
+        expected_benchmark_price=round(sum(chunk["benchmark_sum"] for chunk in chunks) / trials, 2),
+        rank_histogram=rank_histogram,
+        rank_probabilities={rank: count / trials for rank, count in rank_histogram.items()},
+    )
+
+
+def _plan_chunks(request: SimulationRequest) -> List[tuple]:
+    """校验请求并拆分批次，返回每个批次的参数"""
+    if request.trials < 1 or request.trials > SIMULATION_MAX_TRIALS:
+        raise ValueError(f"试验次数应在 1 到 {SIMULATION_MAX_TRIALS} 之间")
+    for distribution in request.competitors:
+        validate_distribution(distribution)
+
+    config_data = request.config.model_dump()
+    competitors_data = [distribution.model_dump() for distribution in request.competitors]
+    chunk_sizes = [SIMULATION_CHUNK_TRIALS] * (request.trials // SIMULATION_CHUNK_TRIALS)
+    if request.trials % SIMULATION_CHUNK_TRIALS:
+        chunk_sizes.append(request.trials % SIMULATION_CHUNK_TRIALS)
+    # 每个批次使用独立的随机数流，结果与批次的执行位置无关
+    seeds = np.random.SeedSequence(request.seed).spawn(len(chunk_sizes))
+
+    return [
+        (config_data, request.own_price, competitors_data, size, seed)
+        for size, seed in zip(chunk_sizes, seeds)
+    ]
+
+
+def simulate(request: SimulationRequest) -> SimulationResult:
+    """在当前进程中运行模拟"""
+    return merge_chunks([simulate_chunk(*args) for args in _plan_chunks(request)])
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_simulation_pool() -> ProcessPoolExecutor:
+    """获取（必要时创建）模拟进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 使用 spawn 启动子进程，避免 fork 继承 Web 进程中的线程和锁状态
+            _pool = ProcessPoolExecutor(
+                max_workers=SIMULATION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_simulation_pool() -> None:
+    """关闭模拟进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+async def simulate_async(request: SimulationRequest) -> SimulationResult:
+    """
+    运行模拟（异步）
+
+    试验数较少时在线程中计算；否则将批次分发到进程池并行计算。
+    两种方式都不会阻塞事件循环
+    """
+    plan = _plan_chunks(request)
+    loop = asyncio.get_running_loop()
+
+    if request.trials <= SIMULATION_INPROCESS_TRIALS:
+        chunks = await loop.run_in_executor(None, lambda: [simulate_chunk(*args) for args in plan])
+    else:
+        pool = get_simulation_pool()
+        chunks = await asyncio.gather(*(loop.run_in_executor(pool, simulate_chunk, *args) for args in plan))
+
+    return merge_chunks(list(chunks))
@@ -0,0 +1,321 @@
+"""
+最优报价求解
+
+竞争对手报价固定时，我方报价 x 对基准价的影响是分段线性的：
+去极值后的有效报价窗口中，x 只在落入窗口时参与均值，因此
+
+    B(x) = K * (S + clip(x, L, U)) / w
+
+其中 L、U 为窗口边界对应的竞争对手报价，S 为窗口内其余报价之和，w 为有效报价数量。
+各单位的得分只在偏离度跨过区间规则边界（含得分截断点）时改变形式，
+这些断点都可以解析求出：
+- 我方偏离度跨过阈值 t：x = (1 ± t/100) * B(x)，在每个基准价分段内为线性方程
+- 竞争对手偏离度跨过阈值 t：B(x) = P / (1 ± t/100)，由 B 的单调性反解 x
+- 相邻断点之间各单位的得分形如 C + D * P / B(x)，我方与某竞争对手得分相等的点
+  同样是线性方程的根
+只需在这些断点及其相邻的报价单位上计算得分和排名，无需网格搜索。
+"""
+import math
+from typing import List, Literal, Optional, Tuple, get_args
+
+import numpy as np
+from pydantic import BaseModel
+
+from .logic import ScoringConfig, Bidder, CalculationRequest
+from .compiled import CompiledScoringConfig, CompiledIntervalTable, compile_config
+from .engine import round_scores, score_prices, calculate_scores_vectorized
+
+SolverObjective = Literal["max_score", "rank_first"]
+
+SOLVER_OBJECTIVES = get_args(SolverObjective)
+# 单次矩阵计算的最大元素数（控制内存占用）
+SOLVER_CHUNK_ELEMENTS = 2000000
+
+
+class SolverRequest(BaseModel):
+    """最优报价求解请求"""
+    config: ScoringConfig
+    competitor_prices: List[float]  # 竞争对手报价（固定）
+    objective: SolverObjective = "max_score"  # 求解目标："max_score"（得分最高）或 "rank_first"（确保排名第一）
+    price_min: Optional[float] = None  # 报价搜索下限（默认为竞争对手最低价的 50%）
+    price_max: Optional[float] = None  # 报价搜索上限（默认为竞争对手最高价的 150%）
+    price_step: float = 0.01  # 报价最小单位
+
+
+class PriceInterval(BaseModel):
+    """报价区间"""
+    start: float  # 区间起点（含）
+    end: float  # 区间终点（含）
+    best_score: float  # 区间内最高得分
+
+
+class SolverResult(BaseModel):
+    """最优报价求解结果"""
+    feasible: bool  # 是否找到满足目标的报价
+    best_price: Optional[float]  # 推荐报价
+    best_score: Optional[float]  # 推荐报价的得分
+    rank: Optional[int]  # 推荐报价的排名（并列时取并列名次）
+    benchmark_price: Optional[float]  # 推荐报价下的基准价
+    intervals: List[PriceInterval]  # 满足目标的报价区间（max_score：得分最高的区间；rank_first：排名第一的区间）
+    breakpoints: int  # 解析断点数量
+
+
+class BenchmarkModel:
+    """基准价关于我方报价的分段线性模型 B(x) = K * (S + clip(x, L, U)) / w"""
+
+    __slots__ = ("k_factor", "rest_sum", "width", "lower", "upper")
+
+    def __init__(self, compiled: CompiledScoringConfig, competitors_sorted: np.ndarray):
+        count = len(competitors_sorted)
+        lo, hi = compiled.trim_bounds(count + 1)
+        self.k_factor = compiled.k_factor
+        if hi > lo:
+            self.width = hi - lo
+            self.rest_sum = float(competitors_sorted[lo:hi - 1].sum())
+            self.lower = float(competitors_sorted[lo - 1]) if lo >= 1 else -math.inf
+            self.upper = float(competitors_sorted[hi - 1]) if hi - 1 < count else math.inf
+        else:
+            # 去极值后无有效报价时使用全部报价的均值
+            self.width = count + 1
+            self.rest_sum = float(competitors_sorted.sum())
+            self.lower = -math.inf
+            self.upper = math.inf
+
+    def value(self, prices: np.ndarray) -> np.ndarray:
+        """计算基准价"""
+        return self.k_factor * (self.rest_sum + np.clip(prices, self.lower, self.upper)) / self.width
+
+    def coefficients(self, prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """返回所在分段内 B(x) = alpha + beta * x 的系数"""
+        inside = (prices >= self.lower) & (prices <= self.upper)
+        beta = np.where(inside, self.k_factor / self.width, 0.0)
+        alpha = np.where(inside, self.k_factor * self.rest_sum / self.width, self.value(prices))
+        return alpha, beta
+
+    def inverse(self, targets: np.ndarray) -> np.ndarray:
+        """反解 B(x) = target，只返回落在线性分段内的解（其余为 NaN）"""
+        if self.k_factor == 0:
+            return np.full(np.shape(targets), np.nan)
+        prices = targets * self.width / self.k_factor - self.rest_sum
+        return np.where((prices >= self.lower) & (prices <= self.upper), prices, np.nan)
+
+    def fixed_points(self, ratios: np.ndarray) -> np.ndarray:
+        """求解 x = r * B(x)（我方偏离度等于 (r - 1) * 100 的报价）"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            below = ratios * self.value(np.asarray(self.lower))
+            below = np.where(below < self.lower, below, np.nan)
+            middle = ratios * self.k_factor * self.rest_sum / (self.width - ratios * self.k_factor)
+            middle = np.where((middle >= self.lower) & (middle <= self.upper), middle, np.nan)
+            above = ratios * self.value(np.asarray(self.upper))
+            above = np.where(above > self.upper, above, np.nan)
+        return np.concatenate([below, middle, above])
+
+
+def _deviation_thresholds(table: CompiledIntervalTable, compiled: CompiledScoringConfig) -> np.ndarray:
+    """偏离度断点：区间规则边界及得分触及上下限时的偏离度"""
+    thresholds = list(table.edges)
+    for rule in table.segment_rules:
+        if rule is None or rule.factor == 0:
+            continue
+        if rule.type == "add":
+            thresholds.append((compiled.max_score - compiled.base_score) / rule.factor)
+        elif rule.type == "deduct":
+            thresholds.append((compiled.base_score - compiled.min_score) / rule.factor)
+    values = np.asarray(thresholds, dtype=np.float64)
+    return values[np.isfinite(values) & (values >= 0)]
+
+
+def _deviation_ratios(compiled: CompiledScoringConfig) -> np.ndarray:
+    """报价与基准价之比的断点 r = 1 ± t/100（含 r = 1）"""
+    high = 1 + _deviation_thresholds(compiled.high_price_table, compiled) / 100
+    low = 1 - _deviation_thresholds(compiled.low_price_table, compiled) / 100
+    ratios = np.concatenate([[1.0], high, low[low > 0]])
+    return np.unique(ratios)
+
+
+def _linear_score_coefficients(
+    compiled: CompiledScoringConfig,
+    prices: np.ndarray,
+    benchmarks: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    在断点之间，得分可写为 C + D * P / B，返回系数 C、D（prices 每行对应一个基准价）
+    """
+    deviation = ((prices - benchmarks) / benchmarks) * 100
+    abs_deviation = np.abs(deviation)
+    signs = np.sign(deviation)
+
+    signed_factor = np.zeros(prices.shape, dtype=np.float64)
+    for table, side in ((compiled.high_price_table, deviation > 0), (compiled.low_price_table, deviation < 0)):
+        segment_count = len(table.segment_rules)
+        if segment_count == 0:
+            continue
+        index = np.searchsorted(table.edge_array, abs_deviation, side="right") - 1
+        in_range = side & (index >= 0) & (index < segment_count)
+        index = np.clip(index, 0, segment_count - 1)
+        hit = in_range & table.segment_active[index]
+        signed_factor[hit] = table.segment_factor[index[hit]]
+
+    slope = signed_factor * signs * 100
+    constant = compiled.base_score - slope
+    unclamped = compiled.base_score + signed_factor * abs_deviation
+    for clamped, value in ((unclamped > compiled.max_score, compiled.max_score),
+                           (unclamped < compiled.min_score, compiled.min_score)):
+        constant = np.where(clamped, value, constant)
+        slope = np.where(clamped, 0.0, slope)
+    return constant, slope
+
+
+def _crossing_points(
+    compiled: CompiledScoringConfig,
+    model: BenchmarkModel,
+    competitors: np.ndarray,
+    events: np.ndarray,
+) -> np.ndarray:
+    """在相邻断点之间求我方与各竞争对手得分相等的报价"""
+    if len(events) < 2 or len(competitors) == 0:
+        return np.empty(0)
+
+    starts, ends = events[:-1], events[1:]
+    roots = []
+    piece_chunk = max(1, SOLVER_CHUNK_ELEMENTS // (len(competitors) + 1))
+    for offset in range(0, len(starts), piece_chunk):
+        start = starts[offset:offset + piece_chunk]
+        end = ends[offset:offset + piece_chunk]
+        middle = (start + end) / 2
+        alpha, beta = model.coefficients(middle)
+        benchmarks = (alpha + beta * middle)[:, None]
+
+        prices = np.empty((len(middle), len(competitors) + 1), dtype=np.float64)
+        prices[:, 0] = middle
+        prices[:, 1:] = competitors
+        constant, slope = _linear_score_coefficients(compiled, prices, benchmarks)
+
+        # (C0 - Cj) * (alpha + beta * x) + D0 * x - Dj * Pj = 0
+        gap = constant[:, :1] - constant[:, 1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            root = (slope[:, 1:] * competitors - gap * alpha[:, None]) / (gap * beta[:, None] + slope[:, :1])
+        inside = np.isfinite(root) & (root > start[:, None]) & (root < end[:, None])
+        roots.append(root[inside])
+    return np.concatenate(roots) if roots else np.empty(0)
+
+
+def evaluate_own_prices(
+    compiled: CompiledScoringConfig,
+    model: BenchmarkModel,
+    competitors: np.ndarray,
+    own_prices: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """批量计算我方在各候选报价下的得分（四舍五入后）和竞争排名"""
+    scores = np.empty(len(own_prices), dtype=np.float64)
+    ranks = np.empty(len(own_prices), dtype=np.int64)
+    chunk = max(1, SOLVER_CHUNK_ELEMENTS // (len(competitors) + 1))
+    for offset in range(0, len(own_prices), chunk):
+        prices_own = own_prices[offset:offset + chunk]
+        prices = np.empty((len(prices_own), len(competitors) + 1), dtype=np.float64)
+        prices[:, 0] = prices_own
+        prices[:, 1:] = competitors
+        _, chunk_scores = score_prices(compiled, prices, model.value(prices_own)[:, None])
+        chunk_scores = round_scores(chunk_scores)
+        scores[offset:offset + chunk] = chunk_scores[:, 0]
+        ranks[offset:offset + chunk] = (chunk_scores[:, 1:] > chunk_scores[:, :1]).sum(axis=1) + 1
+    return scores, ranks
+
+
+def _merge_intervals(prices: np.ndarray, scores: np.ndarray, selected: np.ndarray) -> List[PriceInterval]:
+    """将连续满足条件的候选报价合并为区间"""
+    intervals = []
+    start = None
+    for position, chosen in enumerate(selected.tolist() + [False]):
+        if chosen and start is None:
+            start = position
+        elif not chosen and start is not None:
+            intervals.append(PriceInterval(
+                start=float(prices[start]),
+                end=float(prices[position - 1]),
+                best_score=float(scores[start:position].max())
+            ))
+            start = None
+    return intervals
+
+
+def solve_optimal_price(request: SolverRequest) -> SolverResult:
+    """
+    求解最优报价
+
+    max_score：使我方得分最高的报价；rank_first：排名第一的报价中得分最高者。
+    得分相同时优先推荐较高的报价
+    """
+    if request.price_step <= 0:
+        raise ValueError("报价最小单位必须大于 0")
+
+    competitors = np.sort(np.asarray(request.competitor_prices, dtype=np.float64))
+    if len(competitors) == 0 and (request.price_min is None or request.price_max is None):
+        raise ValueError("没有竞争对手报价时需要指定 price_min 和 price_max")
+    price_min = request.price_min if request.price_min is not None else float(competitors[0]) * 0.5
+    price_max = request.price_max if request.price_max is not None else float(competitors[-1]) * 1.5
+    if price_min > price_max:
+        raise ValueError("报价搜索下限不能大于上限")
+
+    compiled = compile_config(request.config)
+    model = BenchmarkModel(compiled, competitors)
+
+    # 解析断点：基准价分段边界、我方偏离度断点、竞争对手偏离度断点
+    ratios = _deviation_ratios(compiled)
+    events = [np.array([model.lower, model.upper, price_min, price_max]), model.fixed_points(ratios)]
+    if request.objective == "rank_first" and len(competitors):
+        events.append(model.inverse(np.outer(competitors, 1 / ratios).ravel()))
+    events = np.concatenate(events)
+    events = np.unique(events[np.isfinite(events) & (events >= price_min) & (events <= price_max)])
+    breakpoints = len(events)
+
+    if request.objective == "rank_first":
+        crossings = _crossing_points(compiled, model, competitors, events)
+        breakpoints += len(crossings)
+        events = np.unique(np.concatenate([events, crossings]))
+
+    # 在断点、断点两侧相邻报价单位以及断点之间的中点上计算
+    step = request.price_step
+    middles = (events[:-1] + events[1:]) / 2
+    grid = np.floor(np.concatenate([events, middles]) / step)
+    candidates = np.concatenate([grid - 1, grid, grid + 1, grid + 2]) * step
+    candidates = np.round(candidates, 10)
+    candidates = np.unique(candidates[(candidates >= price_min) & (candidates <= price_max)])
+    if len(candidates) == 0:
+        raise ValueError("搜索范围内没有可用的报价")
+
+    scores, ranks = evaluate_own_prices(compiled, model, competitors, candidates)
+
+    if request.objective == "max_score":
+        selected = scores == scores.max()
+    else:
+        selected = ranks == 1
+    feasible = bool(selected.any())
+    if feasible:
+        pool = np.flatnonzero(selected)
+    else:
+        pool = np.flatnonzero(ranks == ranks.min())
+    # 得分最高者优先，其次报价较高者
+    best = pool[np.lexsort((candidates[pool], scores[pool]))[-1]]
+    best_price = float(candidates[best])
+
+    # 使用精确评分流程复核推荐报价
+    exact = calculate_scores_vectorized(CalculationRequest(
+        config=request.config,
+        bidders=[Bidder(name="own", price=best_price)] + [
+            Bidder(name=f"competitor_{index}", price=price)
+            for index, price in enumerate(request.competitor_prices, 1)
+        ],
+        rank_method="competition"
+    ))
+    own_result = exact.results[0]
+
+    return SolverResult(
+        feasible=feasible,
+        best_price=best_price,
+        best_score=own_result.score,
+        rank=own_result.rank,
+        benchmark_price=exact.benchmark_price,
+        intervals=_merge_intervals(candidates, scores, selected) if feasible else [],
+        breakpoints=breakpoints
+    )
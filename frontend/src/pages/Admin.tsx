@@ -36,6 +36,7 @@ interface Summary {
 const Admin: React.FC = () => {
   const [toolStats, setToolStats] = useState<ToolStats[]>([]);
   const [accessRecords, setAccessRecords] = useState<AccessRecord[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [summary, setSummary] = useState<Summary | null>(null);
   const [loading, setLoading] = useState(false);
   const [days, setDays] = useState(7);
@@ -58,15 +59,16 @@ const Admin: React.FC = () => {
     }
   };
 
-  // 获取访问记录
-  const fetchAccessRecords = async (toolId?: string) => {
+  // 获取访问记录（传入游标时追加下一页）
+  const fetchAccessRecords = async (cursor?: string) => {
     try {
       const params: any = { limit: 100 };
-      if (toolId) {
-        params.tool_id = toolId;
+      if (cursor) {
+        params.cursor = cursor;
       }
       const response = await api.get('/api/admin/stats/access', { params });
-      setAccessRecords(response.data);
+      setAccessRecords((records) => (cursor ? [...records, ...response.data] : response.data));
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       // 获取访问记录失败时静默处理
     }
@@ -206,7 +208,7 @@ const Admin: React.FC = () => {
             <Card>
               <Statistic
                 title="统计周期"
-                value={`${summary?.period_days || 0} 天`}
+                value={summary?.period_days ? `${summary.period_days} 天` : '全部'}
                 valueStyle={{ color: '#fa8c16' }}
               />
             </Card>
@@ -226,6 +228,7 @@ const Admin: React.FC = () => {
               <Select.Option value={30}>最近30天</Select.Option>
               <Select.Option value={90}>最近90天</Select.Option>
               <Select.Option value={365}>最近一年</Select.Option>
+              <Select.Option value={0}>全部</Select.Option>
             </Select>
           }
           style={{ marginBottom: '24px' }}
@@ -271,7 +274,14 @@ const Admin: React.FC = () => {
         </Card>
 
         {/* 访问记录 */}
-        <Card title="访问记录">
+        <Card
+          title="访问记录"
+          extra={
+            nextCursor && (
+              <Button onClick={() => fetchAccessRecords(nextCursor)}>加载更多</Button>
+            )
+          }
+        >
           <Table
             columns={columns}
             dataSource={accessRecords}